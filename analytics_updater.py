@@ -1,34 +1,35 @@
 import os
 import requests
-from googleapiclient.discovery import build # We'll need this later
-import pickle
 from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote
 from dotenv import load_dotenv
+from networks import DATA_DIR
 
 # Load environment variables from .env file
 load_dotenv()
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 VIDEO_DB_ID = os.getenv("NOTION_VIDEO_DB_ID") # This is your VIDEO database
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY") # Public key for the videos.list statistics sweep (optional)
 
-# --- Define TOKEN_DIR relative to this script's location ---
+# --- Define TOKEN_DIR in the network's data directory (see networks.py) ---
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
-TOKEN_DIR = os.path.join(SCRIPT_DIR, "tokens")
+TOKEN_DIR = os.path.join(DATA_DIR, "tokens")
 # --- End TOKEN_DIR definition ---
 
 # Channel map (can be useful, or we can just rely on Channel ID from Notion)
-CHANNELS = {
-    "All The Smoke": "UC2ozVs4pg2K3uFLw6-0ayCQ",
-    "KG Certified": "UCa9W_cPwwbDlwBwHOd1YWoQ",
-    "Morning Kombat": "UC9Qy3sHrr5wil-rkYcmcNcw",
-    "All The Smoke Fight": "UCFPoJNd0d4k1H9A6UOlikcg",
-    "Ring Champs": "UCBX_Qx_Hx5QTuEL72YVyn_A",
-    "San Antonio Spurs": "UCEZHE-0CoHqeL1LGFa2EmQw",
-    "Killswitch": "UCbwGkD8-Fbxun7zgzfC5kjg",
-    "The Late Run": "UCcZ6iVdTPU5g4pN3MaIbruw",
-    "Michael Easter": "UC-3foA4PyACqvubjyrlzIcg",
-    "Anik & Florian": "UCDqSRXkx0E58VdH__Y8expQ",
-    "No Such Thing": "UCFRiYABu5iXlkEF5ZCZd6wQ"
-}
+import channels
+import notion_scan
+import notion_wal
+import circuit_breaker
+import log
+import content_owner
+import detail_fetcher
+import metrics_store
+import credential_pool
+import sharding
+from channels import CHANNELS
+
+logger = log.get_logger("analytics")
 
 def load_token(channel_id):
     """Loads a token for a given channel_id."""
@@ -37,116 +38,230 @@ def load_token(channel_id):
         channel_id = channel_id.strip().replace('\n', '').replace('\r', '').replace('\t', '')
     
     # --- BEGIN DEBUG PRINTS ---
-    print(f"  DEBUG load_token: Received channel_id: '{channel_id}'")
-    print(f"  DEBUG load_token: Channel ID length: {len(channel_id) if channel_id else 0}")
+    logger.debug(f"  DEBUG load_token: Received channel_id: '{channel_id}'")
+    logger.debug(f"  DEBUG load_token: Channel ID length: {len(channel_id) if channel_id else 0}")
     token_filename = f"token_{channel_id}.pickle"
-    print(f"  DEBUG load_token: Constructed token_filename: '{token_filename}'")
+    logger.debug(f"  DEBUG load_token: Constructed token_filename: '{token_filename}'")
     # Get absolute path for TOKEN_DIR for clarity in debugging
     # abs_token_dir = os.path.abspath(TOKEN_DIR) # TOKEN_DIR is now already absolute or reliably relative
     token_path = os.path.join(TOKEN_DIR, token_filename) # Use the new TOKEN_DIR
-    print(f"  DEBUG load_token: Checking absolute token_path: '{token_path}'")
-    print(f"  DEBUG load_token: Script SCRIPT_DIR: '{SCRIPT_DIR}'") # Print SCRIPT_DIR for checking
-    print(f"  DEBUG load_token: Script CWD: '{os.getcwd()}'")
+    logger.debug(f"  DEBUG load_token: Checking absolute token_path: '{token_path}'")
+    logger.debug(f"  DEBUG load_token: Script SCRIPT_DIR: '{SCRIPT_DIR}'") # Print SCRIPT_DIR for checking
+    logger.debug(f"  DEBUG load_token: Script CWD: '{os.getcwd()}'")
     # --- END DEBUG PRINTS ---
 
     if not os.path.exists(token_path):
-        print(f"⚠️ No token found for channel_id '{channel_id}' at {token_path}")
+        log.sampled(logger, f"No token for {channel_id}", log.WARNING, f"⚠️ No token found for channel_id '{channel_id}' at {token_path}")
         # List available tokens to help debug
-        if os.path.exists(TOKEN_DIR):
+        if os.path.exists(TOKEN_DIR) and logger.isEnabledFor(log.DEBUG):
             available_tokens = [f for f in os.listdir(TOKEN_DIR) if f.startswith('token_') and f.endswith('.pickle')]
-            print(f"  Available tokens in {TOKEN_DIR}: {available_tokens}")
+            logger.debug(f"  Available tokens in {TOKEN_DIR}: {available_tokens}")
         return None
     try:
-        with open(token_path, "rb") as token_file:
-            creds = pickle.load(token_file)
-            print(f"  ✅ Token loaded successfully for channel_id '{channel_id}'")
-            return creds
+        creds = credential_pool.load_credentials(channel_id)
+        logger.debug(f"  ✅ Token loaded successfully for channel_id '{channel_id}'")
+        return creds
     except Exception as e:
-        print(f"❌ Error loading token for channel_id '{channel_id}': {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error loading token for channel_id '{channel_id}': {e}")
         return None
 
-def get_videos_from_notion():
-    """Fetches all video entries from the Notion database."""
+# Only these properties are needed to drive the updater (see filter_properties below);
+# the current Views/Likes/Comments let the statistics sweep skip unchanged pages
+VIDEO_QUERY_PROPERTIES = ["Video ID", "Channel ID", "Video Title", "Date Published", "Views", "Likes", "Comments"]
+NOTION_VERSION = "2026-03-11"
+_property_ids = None
+
+
+def fetch_video_db_schema(headers):
+    """
+    The video database's {property name: property} schema. Newer Notion-Versions
+    keep the properties on the database's data source(s) rather than the database
+    object; the first data source's schema is used then.
+    """
+    response = requests.get(f"https://api.notion.com/v1/databases/{VIDEO_DB_ID}", headers=headers)
+    response.raise_for_status()
+    database = response.json()
+    if "properties" in database or not database.get("data_sources"):
+        return database.get("properties", {})
+    data_source_id = database["data_sources"][0]["id"]
+    response = requests.get(f"https://api.notion.com/v1/data_sources/{data_source_id}", headers=headers)
+    response.raise_for_status()
+    return response.json().get("properties", {})
+
+
+def get_video_property_ids():
+    """
+    Resolves VIDEO_QUERY_PROPERTIES to Notion property IDs (filter_properties takes IDs).
+    Returns an empty list if the lookup fails, which disables the projection (with a
+    warning, since every query then transfers full pages).
+    """
+    global _property_ids
+    if _property_ids is None:
+        headers = {
+            "Authorization": f"Bearer {NOTION_TOKEN}",
+            "Notion-Version": NOTION_VERSION,
+        }
+        try:
+            properties = fetch_video_db_schema(headers)
+            missing = [name for name in VIDEO_QUERY_PROPERTIES if name not in properties]
+            if len(missing) == len(VIDEO_QUERY_PROPERTIES):
+                print(f"⚠️ No properties in the Notion schema under Notion-Version {NOTION_VERSION}; "
+                      f"the query projection is disabled and full pages will be fetched.")
+                _property_ids = []
+            else:
+                if missing:
+                    print(f"⚠️ Notion database has no {', '.join(missing)} property; it's left out of the query projection.")
+                # IDs come back percent-encoded; requests re-encodes them as query params
+                _property_ids = [unquote(properties[name]["id"]) for name in VIDEO_QUERY_PROPERTIES if name in properties]
+        except (requests.exceptions.RequestException, KeyError, IndexError, ValueError) as e:
+            print(f"⚠️ Could not resolve Notion property IDs under Notion-Version {NOTION_VERSION}; "
+                  f"the query projection is disabled and full pages will be fetched: {e}")
+            _property_ids = []
+    return _property_ids
+
+
+def check_projection(page, property_ids):
+    """Warns once if Notion returned properties outside the projection (filter_properties ignored)."""
+    extra = set(page.get("properties", {})) - set(VIDEO_QUERY_PROPERTIES)
+    if property_ids and extra:
+        print(f"⚠️ Notion ignored filter_properties under Notion-Version {NOTION_VERSION} "
+              f"(got {len(extra)} unrequested properties); full pages are being fetched.")
+
+
+def build_video_query_filter(published_after=None, channel_ids=None):
+    """Notion query filter for videos published after a datetime and/or belonging to some channels."""
+    conditions = []
+    if published_after:
+        conditions.append({"property": "Date Published", "date": {"after": published_after.isoformat()}})
+    if channel_ids:
+        channel_conditions = [{"property": "Channel ID", "rich_text": {"equals": cid}} for cid in channel_ids]
+        conditions.append(channel_conditions[0] if len(channel_conditions) == 1 else {"or": channel_conditions})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"and": conditions}
+
+
+def get_videos_from_notion(published_after=None, channel_ids=None, partitioned=False):
+    """
+    Yields video entries from the Notion database.
+    The date cutoff and channel filter are applied by Notion, and only the
+    properties in VIDEO_QUERY_PROPERTIES are transferred.
+    partitioned=True splits the read into one query per channel (plus one for
+    everything else) and walks them concurrently; results arrive in no particular order.
+    """
     if not VIDEO_DB_ID or not NOTION_TOKEN:
         print("❌ Notion DB ID or Token not configured. Cannot fetch videos.")
-        return []
+        return
 
     url = f"https://api.notion.com/v1/databases/{VIDEO_DB_ID}/query"
     headers = {
         "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": "2026-03-11",
+        "Notion-Version": NOTION_VERSION,
         "Content-Type": "application/json"
     }
-    
-    all_videos = []
-    has_more = True
-    start_cursor = None
-
-    print("⬇️ Fetching videos from Notion...")
-    while has_more:
-        payload = {}
-        if start_cursor:
-            payload["start_cursor"] = start_cursor
-        
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status() # Raise an exception for HTTP errors
-            data = response.json()
-            
-            for page in data.get("results", []):
-                video_id_prop = page.get("properties", {}).get("Video ID", {}).get("rich_text", [])
-                channel_id_prop = page.get("properties", {}).get("Channel ID", {}).get("rich_text", [])
-                title_prop = page.get("properties", {}).get("Video Title", {}).get("title", [])
-                date_published_prop = page.get("properties", {}).get("Date Published", {}).get("date", {})
-
-                video_id = video_id_prop[0]["plain_text"] if video_id_prop else None
-                # Strip whitespace from channel_id read from Notion and normalize it
-                # Handle potential whitespace, newlines, or other formatting issues
-                channel_id_text = channel_id_prop[0]["plain_text"] if channel_id_prop and channel_id_prop[0].get("plain_text") else None
-                # Strip all whitespace (spaces, tabs, newlines) and ensure it's a clean channel ID
-                channel_id = channel_id_text.strip().replace('\n', '').replace('\r', '').replace('\t', '') if channel_id_text else None
-                
-                title = title_prop[0]["plain_text"] if title_prop else "Unknown Title"
-                # Get the start date from the date object, it's in ISO format
-                published_at_iso = date_published_prop.get("start") if date_published_prop else None
-
-                if video_id: # Only process if we have a YouTube Video ID
-                    all_videos.append({
-                        "notion_page_id": page["id"],
-                        "video_id": video_id,
-                        "channel_id": channel_id, # This is crucial
-                        "title": title,
-                        "published_at_iso": published_at_iso # Store the publish date
-                    })
-            
-            start_cursor = data.get("next_cursor")
-            has_more = bool(start_cursor)
-            if has_more:
-                print(f"   Fetched {len(data.get('results', []))} videos, more available...")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ HTTP Error querying Notion: {e} - {response.text if 'response' in locals() else 'No response details'}")
-            return [] # Stop if there's an error
-        except Exception as e:
-            print(f"❌ Exception querying Notion: {e}")
-            return [] # Stop if there's an error
-            
-    print(f"✅ Found {len(all_videos)} videos in Notion database.")
-    return all_videos
+    property_ids = get_video_property_ids()
+    query_params = [("filter_properties", prop_id) for prop_id in property_ids]
+    payload = {"page_size": 100}
+
+    if partitioned:
+        # The catch-all partition only makes sense when reading every channel
+        partition_filters = build_partition_filters(published_after, channel_ids or list(CHANNELS.values()),
+                                                    include_remainder=not channel_ids)
+        print(f"⬇️ Fetching videos from Notion ({len(partition_filters)} partitions in parallel)...")
+        pages = notion_scan.scan_partitions(url, headers, partition_filters, payload=payload, params=query_params)
+    else:
+        query_filter = build_video_query_filter(published_after, channel_ids)
+        if query_filter:
+            payload["filter"] = query_filter
+        print("⬇️ Fetching videos from Notion...")
+        pages = notion_scan.query_pages(url, headers, payload, params=query_params)
+
+    found = 0
+    progress = log.Progress(logger, "Videos fetched from Notion")
+    try:
+        for index, page in enumerate(pages):
+            if index == 0:
+                check_projection(page, property_ids)
+            video = parse_video_page(page)
+            if video:
+                found += 1
+                progress.tick()
+                yield video
+    except (requests.exceptions.RequestException, notion_scan.IncompleteScan) as e:
+        log.flush()
+        print(f"❌ Error querying Notion, not updating from an incomplete read: {e}")
+        raise
+
+    log.flush()
+    print(f"✅ Found {found} videos in Notion database.")
+
+
+def build_partition_filters(published_after, channel_ids, include_remainder=True):
+    """
+    One filter per channel plus a remainder partition for videos with no Channel ID.
+    The remainder doesn't exclude the listed channels one by one: that filter would grow
+    with the registry past Notion's compound-filter limits. Videos whose Channel ID is
+    set but not registered aren't read by a partitioned scan (an unpartitioned query,
+    e.g. with LIFETIME_STATS=0, still reads them).
+    """
+    date_condition = [{"property": "Date Published", "date": {"after": published_after.isoformat()}}] if published_after else []
+    filters = []
+    for cid in channel_ids:
+        conditions = date_condition + [{"property": "Channel ID", "rich_text": {"equals": cid}}]
+        filters.append(conditions[0] if len(conditions) == 1 else {"and": conditions})
+    if include_remainder:
+        remainder = date_condition + [{"property": "Channel ID", "rich_text": {"is_empty": True}}]
+        filters.append(remainder[0] if len(remainder) == 1 else {"and": remainder})
+    return filters
+
+
+def parse_video_page(page):
+    """Extracts the fields the updater needs from a Notion page. Returns None if it has no Video ID."""
+    video_id_prop = page.get("properties", {}).get("Video ID", {}).get("rich_text", [])
+    channel_id_prop = page.get("properties", {}).get("Channel ID", {}).get("rich_text", [])
+    title_prop = page.get("properties", {}).get("Video Title", {}).get("title", [])
+    date_published_prop = page.get("properties", {}).get("Date Published", {}).get("date", {})
+
+    video_id = video_id_prop[0]["plain_text"] if video_id_prop else None
+    # Strip whitespace from channel_id read from Notion and normalize it
+    # Handle potential whitespace, newlines, or other formatting issues
+    channel_id_text = channel_id_prop[0]["plain_text"] if channel_id_prop and channel_id_prop[0].get("plain_text") else None
+    # Strip all whitespace (spaces, tabs, newlines) and ensure it's a clean channel ID
+    channel_id = channel_id_text.strip().replace('\n', '').replace('\r', '').replace('\t', '') if channel_id_text else None
+
+    title = title_prop[0]["plain_text"] if title_prop else "Unknown Title"
+    # Get the start date from the date object, it's in ISO format
+    published_at_iso = date_published_prop.get("start") if date_published_prop else None
+    # Lifetime stats as currently stored in Notion (None when empty)
+    notion_stats = {key: page.get("properties", {}).get(name, {}).get("number")
+                    for key, name in (("views", "Views"), ("likes", "Likes"), ("comments", "Comments"))}
+
+    if not video_id: # Only process if we have a YouTube Video ID
+        return None
+    return {
+        "notion_page_id": page["id"],
+        "video_id": video_id,
+        "channel_id": channel_id, # This is crucial
+        "title": title,
+        "published_at_iso": published_at_iso, # Store the publish date
+        "notion_stats": notion_stats
+    }
+
+def analytics_wal_key(video_id, kind="analytics"):
+    """One write of each kind ("analytics" or "stats") per video per UTC day; see notion_wal.py."""
+    return f"{kind}:{video_id}:{datetime.now(timezone.utc).strftime('%Y-%m-%d')}"
 
-def update_video_in_notion(notion_page_id, analytics_data):
-    """Updates a video's Notion page with new analytics data."""
+
+def update_video_in_notion(notion_page_id, analytics_data, wal_key=None):
+    """
+    Queues an update of a video's Notion page with new analytics data.
+    The write goes through the Notion WAL, so it survives a crash before it's applied.
+    """
     if not NOTION_TOKEN:
         print("❌ Notion Token not configured. Cannot update page.")
         return False
 
     url = f"https://api.notion.com/v1/pages/{notion_page_id}"
-    headers = {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": "2026-03-11",
-        "Content-Type": "application/json"
-    }
 
     properties_to_update = {}
 
@@ -195,30 +310,26 @@ def update_video_in_notion(notion_page_id, analytics_data):
     # --- End Mapping ---
 
     if not properties_to_update:
-        print(f"  ℹ️ No relevant analytics data found in YouTube response to update Notion page {notion_page_id}.")
+        logger.debug(f"  ℹ️ No relevant analytics data found in YouTube response to update Notion page {notion_page_id}.")
         return False
 
     payload = {"properties": properties_to_update}
     video_title_for_log = analytics_data.get("title", notion_page_id) # Use title if available for logging
 
-    try:
-        response = requests.patch(url, headers=headers, json=payload)
-        response.raise_for_status()
-        print(f"  ✅ Notion page for '{video_title_for_log}' ({notion_page_id}) updated successfully with {len(properties_to_update)} new analytics fields.")
-        return True
-    except requests.exceptions.RequestException as e:
-        print(f"  ❌ HTTP Error updating Notion page {notion_page_id}: {e} - {response.text}")
-        return False
-    except Exception as e:
-        print(f"  ❌ Exception updating Notion page {notion_page_id}: {e}")
-        return False
+    key = wal_key or notion_wal.update_key(notion_page_id, payload)
+    label = f"'{video_title_for_log}' ({notion_page_id}) updated with {len(properties_to_update)} analytics fields."
+    if notion_wal.submit(key, "PATCH", url, payload, label=label):
+        logger.debug(f"  📝 Queued Notion update for '{video_title_for_log}' ({len(properties_to_update)} fields).")
+    else:
+        logger.debug(f"  ⏭️ Notion update for '{video_title_for_log}' already in the WAL.")
+    return True
 
 # Placeholder for the YouTube Analytics API fetching function
 def fetch_video_analytics_from_youtube(creds, channel_id_for_api_context, video_id_to_filter, start_date_str, end_date_str):
     """Fetches analytics for a specific video using the YouTube Analytics API."""
     # print(f"📈 (Placeholder) Fetching YouTube Analytics for video {video_id} from {start_date_str} to {end_date_str}")
     try:
-        youtube_analytics = build('youtubeAnalytics', 'v2', credentials=creds)
+        youtube_analytics = credential_pool.service('youtubeAnalytics', 'v2', credentials=creds)
 
         # Define a comprehensive list of metrics we'd like to try and fetch.
         # Not all metrics may be available for all videos/channels or date ranges.
@@ -268,7 +379,7 @@ def fetch_video_analytics_from_youtube(creds, channel_id_for_api_context, video_
         # metrics_str = ",".join(metrics_list_core + metrics_list_revenue + metrics_list_impressions_specific)
         # Or, one by one.
 
-        print(f" querying YouTube Analytics for video {video_id_to_filter} (Channel Context: {channel_id_for_api_context}) from {start_date_str} to {end_date_str} with metrics: {metrics_str}...")
+        logger.debug(f" querying YouTube Analytics for video {video_id_to_filter} (Channel Context: {channel_id_for_api_context}) from {start_date_str} to {end_date_str} with metrics: {metrics_str}...")
 
         response = youtube_analytics.reports().query(
             ids=f'channel=={channel_id_for_api_context}', # Context for the data (which channel owns it)
@@ -296,63 +407,270 @@ def fetch_video_analytics_from_youtube(creds, channel_id_for_api_context, video_
                     continue 
                 analytics_results[header_name] = row_data[i]
             
-            print(f"  📊 Analytics fetched for {video_id_to_filter}: {len(analytics_results)} metrics.")
+            logger.debug(f"  📊 Analytics fetched for {video_id_to_filter}: {len(analytics_results)} metrics.")
+            circuit_breaker.record_success(channel_id_for_api_context, circuit_breaker.ANALYTICS)
             # print(f"  Analytics data: {analytics_results}") # For debugging
             return analytics_results
         else:
-            print(f"  ℹ️ No analytics rows returned from YouTube for video {video_id_to_filter}. The video might be too new, have no data for the period, or there was an issue.")
+            logger.debug(f"  ℹ️ No analytics rows returned from YouTube for video {video_id_to_filter}. The video might be too new, have no data for the period, or there was an issue.")
             return {} # Return empty dict if no data
 
     except Exception as e:
+        circuit_breaker.record_failure(channel_id_for_api_context, circuit_breaker.ANALYTICS, e)
         if "quota" in str(e).lower() or ("HttpError 403" in str(e) and "quota" in str(e).lower()):
-            print(f"  🟡 YouTube API quota likely exceeded while fetching analytics for video {video_id_to_filter}: {e}")
+            log.sampled(logger, "Analytics quota exceeded", log.WARNING, f"  🟡 YouTube API quota likely exceeded while fetching analytics for video {video_id_to_filter}: {e}")
         elif "HttpError 403" in str(e) and "does not have permission" in str(e).lower():
-            print(f"  🔴 Permission denied for video {video_id_to_filter}. The token for channel {channel_id_for_api_context} may not have access to this video's analytics or the required scopes (yt-analytics.readonly, yt-analytics-monetary.readonly). Details: {e}")
+            # Not learned as a channel capability: one video the token can't see says nothing about the channel
+            log.sampled(logger, "Analytics permission denied", log.ERROR, f"  🔴 Permission denied for video {video_id_to_filter}. The token for channel {channel_id_for_api_context} may not have access to this video's analytics or the required scopes (yt-analytics.readonly, yt-analytics-monetary.readonly). Details: {e}")
         elif "HttpError 400" in str(e) and "invalidFilters" in str(e).lower():
-            print(f"  ❌ Invalid filter for video {video_id_to_filter}. This video ID might not belong to channel {channel_id_for_api_context} or is incorrect. Details: {e}")
+            log.sampled(logger, "Analytics invalid filter", log.ERROR, f"  ❌ Invalid filter for video {video_id_to_filter}. This video ID might not belong to channel {channel_id_for_api_context} or is incorrect. Details: {e}")
         else:
-            print(f"  ❌ Error fetching YouTube Analytics for video {video_id_to_filter}: {e}")
+            log.sampled(logger, "Analytics error", log.ERROR, f"  ❌ Error fetching YouTube Analytics for video {video_id_to_filter}: {e}")
         return None # Indicate an error or significant issue
 
 
-def run_analytics_updater(update_all=False):
-    print(f"🚀 Starting YouTube Analytics Updater at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')}")
+# Metrics requested per video (same set fetch_video_analytics_from_youtube uses)
+VIDEO_METRICS = "views,estimatedMinutesWatched,averageViewDuration,averageViewPercentage,likes,comments,subscribersGained,subscribersLost,shares"
 
-    videos_in_notion = get_videos_from_notion()
-    if not videos_in_notion:
-        print("🏁 No videos found in Notion or error fetching. Exiting.")
-        return
 
-    # Filter to recent videos for daily runs (older videos' metrics barely change)
-    if not update_all:
-        DAILY_LOOKBACK_DAYS = 90
-        cutoff = datetime.now(timezone.utc) - timedelta(days=DAILY_LOOKBACK_DAYS)
-        total_before = len(videos_in_notion)
-        videos_in_notion = [
-            v for v in videos_in_notion
-            if v["published_at_iso"] and
-               datetime.fromisoformat(v["published_at_iso"].replace("Z", "+00:00")) > cutoff
-        ]
-        print(f"📋 Daily mode: updating {len(videos_in_notion)} videos from last {DAILY_LOOKBACK_DAYS} days (skipped {total_before - len(videos_in_notion)} older videos)")
+def analytics_start_date(published_at_iso):
+    """Notion publish date (ISO timestamp or YYYY-MM-DD) -> YYYY-MM-DD, or None if unparseable."""
+    try:
+        return datetime.fromisoformat(published_at_iso.replace("Z", "+00:00")).strftime('%Y-%m-%d')
+    except ValueError:
+        try:
+            datetime.strptime(published_at_iso, '%Y-%m-%d')
+            return published_at_iso
+        except ValueError:
+            return None
+
+
+def prefetch_content_owner_analytics(videos):
+    """
+    Content-owner mode: fetches lifetime metrics for all videos in a few dimensions=video reports.
+    One date range from the oldest publish date covers every video (days before a
+    video's publish date contribute nothing). Returns {video_id: metrics} (see content_owner.video_metrics).
+    """
+    start_dates = [analytics_start_date(v["published_at_iso"]) for v in videos if v["published_at_iso"]]
+    start_dates = [d for d in start_dates if d]
+    if not start_dates:
+        return {}
+    end_date_str = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    video_ids = [v["video_id"] for v in videos]
+    print(f"📊 Content-owner mode: fetching analytics for {len(video_ids)} videos in {-(-len(video_ids) // content_owner.VIDEO_FILTER_CHUNK)} report(s)...")
+    return content_owner.video_metrics(video_ids, min(start_dates), end_date_str, VIDEO_METRICS)
+
+
+def stored_video_totals(conn, coverage, channel_id, video_data):
+    """
+    Per-video totals from the Reporting API metrics store (see reporting_ingest.py),
+    or None when the store doesn't cover the video's whole life (published before ingestion began).
+    """
+    if conn is None:
+        return None
+    if channel_id not in coverage:
+        coverage[channel_id] = metrics_store.coverage_start(conn, channel_id)
+    published = analytics_start_date(video_data["published_at_iso"] or "")
+    if not coverage[channel_id] or not published or published < coverage[channel_id]:
+        return None
+    return metrics_store.video_totals(conn, [video_data["video_id"]]).get(video_data["video_id"])
+
+
+# --- Two-tier refresh ---
+# Tier 1: every video's lifetime Views/Likes/Comments from videos.list?part=statistics
+# (50 videos per quota unit). Tier 2: the per-video Analytics report (watch time,
+# avg view %, subs), only for recent videos and ones whose views moved noticeably.
+LIFETIME_STATS = os.getenv("LIFETIME_STATS", "1") != "0"
+DEEP_REFRESH_DAYS = 90     # Videos younger than this always get the Analytics report
+CHANGE_MIN_VIEWS = 100     # Older videos qualify when views grew by at least this many...
+CHANGE_MIN_RATIO = 0.01    # ...and by at least this fraction of what Notion has
+
+
+def fetch_lifetime_stats(videos):
+    """
+    Tier 1: lifetime statistics for every video, in full 50-ID videos.list batches.
+    Returns {video_id: {"views", "likes", "comments"}}; empty if quota ran out or no credential is available.
+    """
+    ids_by_channel = {}
+    for video_data in videos:
+        ids_by_channel.setdefault(video_data["channel_id"] or "", []).append(video_data["video_id"])
+    creds = None
+    if not YOUTUBE_API_KEY:
+        token_channel = next((cid for cid in CHANNELS.values() if channels.has_token(cid)), None)
+        creds = credential_pool.get_credentials(token_channel) if token_channel else None
+
+    items_by_channel = detail_fetcher.fetch_details_for_channels(
+        ids_by_channel, api_key=YOUTUBE_API_KEY, creds=creds, part="statistics")
+    if items_by_channel is None:
+        print("🟡 Quota hit during the statistics sweep; falling back to age-based selection only.")
+        return {}
+
+    lifetime_stats = {}
+    for items in items_by_channel.values():
+        for item in items:
+            statistics = item.get("statistics", {})
+            # likeCount/commentCount are missing when hidden or disabled
+            lifetime_stats[item["id"]] = {key: int(statistics[field]) for key, field in
+                                          (("views", "viewCount"), ("likes", "likeCount"), ("comments", "commentCount"))
+                                          if field in statistics}
+    return lifetime_stats
+
+
+def needs_deep_refresh(video_data, lifetime_stats, cutoff_date):
+    """Tier 2 selection: recent videos, videos Notion has no views for, and videos whose views moved noticeably."""
+    published = analytics_start_date(video_data["published_at_iso"] or "")
+    if not published or published >= cutoff_date:
+        return True  # Recent, or no usable date (the Analytics path reports why it skips those)
+    previous = video_data["notion_stats"]["views"]
+    current = (lifetime_stats or {}).get("views")
+    if previous is None:
+        return current is not None
+    if current is None:
+        return False
+    return current - previous >= max(CHANGE_MIN_VIEWS, previous * CHANGE_MIN_RATIO)
+
+
+def stats_changed(video_data, lifetime_stats):
+    return any(video_data["notion_stats"].get(key) != value for key, value in lifetime_stats.items())
+
+
+def apply_lifetime_stats(videos, lifetime_stats):
+    """Tier 1 writes: Views/Likes/Comments for videos whose values moved. Returns (updated, unchanged)."""
+    updated = unchanged = 0
+    for video_data in videos:
+        stats = lifetime_stats.get(video_data["video_id"])
+        if not stats or not stats_changed(video_data, stats):
+            unchanged += 1
+            continue
+        wal_key = analytics_wal_key(video_data["video_id"], kind="stats")
+        if notion_wal.has(wal_key):
+            continue
+        if update_video_in_notion(video_data["notion_page_id"], {**stats, "title": video_data["title"]}, wal_key):
+            updated += 1
+    return updated, unchanged
+
+
+def run_analytics_updater(update_all=False, shard=None):
+    print(f"🚀 Starting YouTube Analytics Updater at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')}")
+
+    # A shard only reads its own channels' videos (videos from unregistered channels are left to unsharded runs)
+    shard_channel_ids = None
+    if shard is not None:
+        shard_channel_ids = list(sharding.filter_channels(CHANNELS, shard).values())
+        print(f"🧩 Sharded run: {sharding.describe(shard)} ({len(shard_channel_ids)} channels)")
+        if not shard_channel_ids:
+            print("🏁 No channels in this shard. Exiting.")
+            return
+
+    # Updates fetched by an interrupted run are applied from the WAL, not fetched again
+    notion_wal.replay()
+
+    # Daily runs sweep every video's lifetime statistics (tier 1) and run the Analytics
+    # report only for selected ones (tier 2). With LIFETIME_STATS=0 they only read the
+    # last DEEP_REFRESH_DAYS of videos, with the cutoff applied by the Notion query itself
+    if update_all:
+        videos_in_notion = get_videos_from_notion(channel_ids=shard_channel_ids, partitioned=True)
+        print(f"📋 Full mode (--all): updating all videos")
+    elif LIFETIME_STATS:
+        videos_in_notion = get_videos_from_notion(channel_ids=shard_channel_ids, partitioned=True)
+        print(f"📋 Daily mode: statistics for all videos, Analytics for recent or changed ones")
     else:
-        print(f"📋 Full mode (--all): updating all {len(videos_in_notion)} videos")
+        cutoff = datetime.now(timezone.utc) - timedelta(days=DEEP_REFRESH_DAYS)
+        videos_in_notion = get_videos_from_notion(published_after=cutoff, channel_ids=shard_channel_ids)
+        print(f"📋 Daily mode: updating videos from last {DEEP_REFRESH_DAYS} days")
+
+    # Read the whole catalog before writing anything: a failed read raises here, not halfway through the updates
+    videos_in_notion = list(videos_in_notion)
+
+    lifetime_stats = {}
+    stats_updated = stats_unchanged = 0
+    if LIFETIME_STATS:
+        lifetime_stats = fetch_lifetime_stats(videos_in_notion)
+        if not update_all:
+            cutoff_date = (datetime.now(timezone.utc) - timedelta(days=DEEP_REFRESH_DAYS)).strftime('%Y-%m-%d')
+            deep, stats_only = [], []
+            for video_data in videos_in_notion:
+                selected = needs_deep_refresh(video_data, lifetime_stats.get(video_data["video_id"]), cutoff_date)
+                (deep if selected else stats_only).append(video_data)
+            print(f"📋 {len(deep)} video(s) selected for the Analytics report, {len(stats_only)} get statistics only.")
+            stats_updated, stats_unchanged = apply_lifetime_stats(stats_only, lifetime_stats)
+            videos_in_notion = deep
 
     updated_count = 0
     skipped_no_channel_id = 0
     skipped_no_token = 0
-
+    skipped_known_failing = 0
+    skipped_in_wal = 0
+    skipped_circuit_open = 0
+    deep_written = set()  # Video IDs whose Analytics update was written (or queued) this run
+
+    # Videos fully covered by ingested Reporting API files need no Analytics query
+    store_conn = metrics_store.connect() if os.path.exists(metrics_store.DB_PATH) else None
+    store_coverage = {}
+    updated_from_store = 0
+
+    owner_analytics = None
+    if content_owner.ENABLED:
+        owner_analytics = prefetch_content_owner_analytics(videos_in_notion)
+
+    # One progress line per LOG_PROGRESS_EVERY videos; the per-video lines are debug level
+    progress = log.Progress(logger, "Videos processed", total=len(videos_in_notion))
+    processed_count = 0
     for video_data in videos_in_notion:
-        print(f"\nProcessing: {video_data['title']} (Video ID: {video_data['video_id']})")
+        processed_count += 1
+        progress.tick()
+        logger.debug(f"\nProcessing: {video_data['title']} (Video ID: {video_data['video_id']})")
         
         if not video_data["channel_id"]:
-            print(f"  🟡 Skipping - Missing Channel ID in Notion for this video.")
+            log.sampled(logger, "Missing Channel ID", log.WARNING, f"  🟡 Skipping {video_data['video_id']} - Missing Channel ID in Notion for this video.")
             skipped_no_channel_id += 1
             continue
 
         # Normalize channel_id before using it (in case it wasn't normalized when read from Notion)
         channel_id_normalized = video_data["channel_id"].strip().replace('\n', '').replace('\r', '').replace('\t', '')
-        print(f"  Channel ID from Notion: '{video_data['channel_id']}' (normalized: '{channel_id_normalized}')")
+        logger.debug(f"  Channel ID from Notion: '{video_data['channel_id']}' (normalized: '{channel_id_normalized}')")
+
+        wal_key = analytics_wal_key(video_data["video_id"])
+        if notion_wal.has(wal_key):
+            logger.debug(f"  ⏭️ Skipping - today's analytics for this video are already in the Notion WAL.")
+            skipped_in_wal += 1
+            deep_written.add(video_data["video_id"])
+            continue
+
+        # Same-day lifetime counts from the sweep win over the Analytics totals, which lag a few days
+        video_stats = lifetime_stats.get(video_data["video_id"], {})
+
+        stored_totals = stored_video_totals(store_conn, store_coverage, channel_id_normalized, video_data)
+        if stored_totals:
+            logger.debug(f"  📦 Using Reporting API totals from the metrics store.")
+            if update_video_in_notion(video_data["notion_page_id"], {**stored_totals, **video_stats}, wal_key):
+                updated_count += 1
+                updated_from_store += 1
+                deep_written.add(video_data["video_id"])
+            continue
+
+        if owner_analytics is not None:
+            # Already fetched network-wide; a missing entry means its report failed
+            analytics_data = owner_analytics.get(video_data["video_id"])
+            if analytics_data is None:
+                logger.debug(f"  Skipping Notion update for {video_data['video_id']} due to YouTube API error.")
+            elif analytics_data and update_video_in_notion(video_data["notion_page_id"], {**analytics_data, **video_stats}, wal_key):
+                updated_count += 1
+                deep_written.add(video_data["video_id"])
+            elif not analytics_data:
+                logger.debug(f"  ℹ️ No analytics data returned from YouTube for video {video_data['video_id']}.")
+            continue
         
+        if channels.has_token(channel_id_normalized) and not channels.is_capable(channel_id_normalized, channels.ANALYTICS):
+            logger.debug(f"  ⏭️ Skipping - Analytics access for channel {channel_id_normalized} is known to fail (see state/channel_capabilities.json).")
+            skipped_known_failing += 1
+            continue
+
+        # Quiet skip: the breaker printed one line when it opened, the summary prints another
+        if not circuit_breaker.allow(channel_id_normalized, circuit_breaker.ANALYTICS):
+            skipped_circuit_open += 1
+            continue
+
         creds = load_token(channel_id_normalized)
         if not creds:
             # This message is already printed by load_token
@@ -363,52 +681,73 @@ def run_analytics_updater(update_all=False):
         video_data["channel_id"] = channel_id_normalized
         
         if not video_data["published_at_iso"]:
-            print(f"  🟡 Skipping - Missing Published Date in Notion for video {video_data['video_id']}. Cannot determine analytics start date.")
+            log.sampled(logger, "Missing Published Date", log.WARNING, f"  🟡 Skipping - Missing Published Date in Notion for video {video_data['video_id']}. Cannot determine analytics start date.")
             continue
 
         # Use video's publish date as start_date for analytics
-        try:
-            # Convert ISO publish date to YYYY-MM-DD for API
-            # The date from Notion should be like YYYY-MM-DDTHH:MM:SS.sssZ or YYYY-MM-DD
-            start_date_dt = datetime.fromisoformat(video_data["published_at_iso"].replace("Z", "+00:00"))
-            start_date_str = start_date_dt.strftime('%Y-%m-%d')
-        except ValueError:
-            # If it's already YYYY-MM-DD from Notion (for an all-day event, less likely for YouTube publish)
-            try:
-                datetime.strptime(video_data["published_at_iso"], '%Y-%m-%d') # Validate format
-                start_date_str = video_data["published_at_iso"]
-            except ValueError:
-                print(f"  🔴 Skipping - Invalid Published Date format in Notion for video {video_data['video_id']}: {video_data['published_at_iso']}")
-                continue
+        # The date from Notion should be like YYYY-MM-DDTHH:MM:SS.sssZ or YYYY-MM-DD
+        start_date_str = analytics_start_date(video_data["published_at_iso"])
+        if not start_date_str:
+            log.sampled(logger, "Invalid Published Date", log.WARNING, f"  🔴 Skipping - Invalid Published Date format in Notion for video {video_data['video_id']}: {video_data['published_at_iso']}")
+            continue
 
         end_date_str = datetime.now(timezone.utc).strftime('%Y-%m-%d')
         
         # --- DEBUG: Print date range being used --- 
-        print(f"  DEBUG: Raw published_at_iso from Notion: '{video_data['published_at_iso']}'")
-        print(f"  DEBUG: Querying analytics from {start_date_str} to {end_date_str}")
+        logger.debug(f"  DEBUG: Raw published_at_iso from Notion: '{video_data['published_at_iso']}'")
+        logger.debug(f"  DEBUG: Querying analytics from {start_date_str} to {end_date_str}")
         # --- END DEBUG --- 
 
         # Pass channel_id for API context, then video_id to filter by
         analytics_data = fetch_video_analytics_from_youtube(creds, video_data["channel_id"], video_data["video_id"], start_date_str, end_date_str)
 
         if analytics_data is None: # Indicates a significant error like quota or permission
-            print(f"  Skipping Notion update for {video_data['video_id']} due to YouTube API error.")
+            logger.debug(f"  Skipping Notion update for {video_data['video_id']} due to YouTube API error.")
             continue # Move to the next video
         
         if analytics_data: # If we got some data (even if it's an empty dict for no rows)
-            if update_video_in_notion(video_data["notion_page_id"], analytics_data):
+            if update_video_in_notion(video_data["notion_page_id"], {**analytics_data, **video_stats}, wal_key):
                 updated_count +=1
+                deep_written.add(video_data["video_id"])
         else:
-            print(f"  ℹ️ No analytics data returned from YouTube for video {video_data['video_id']}.")
+            logger.debug(f"  ℹ️ No analytics data returned from YouTube for video {video_data['video_id']}.")
+
+    progress.done()
+
+    # Deep videos whose Analytics update failed or was skipped still get today's statistics
+    if lifetime_stats:
+        missed = [video_data for video_data in videos_in_notion
+                  if video_data["video_id"] not in deep_written
+                  and not notion_wal.has(analytics_wal_key(video_data["video_id"]))]
+        if missed:
+            missed_updated, missed_unchanged = apply_lifetime_stats(missed, lifetime_stats)
+            stats_updated += missed_updated
+            stats_unchanged += missed_unchanged
+            logger.info(f"📊 Statistics-only fallback for {len(missed)} video(s) without an Analytics update: {missed_updated} written")
+
+    notion_wal.drain()
+    log.report_suppressed()
+    log.flush()
+
+    if not processed_count and not stats_updated + stats_unchanged:
+        print("🏁 No videos found in Notion or error fetching. Exiting.")
+        return
 
     print(f"\n--- Analytics Updater Summary ---")
-    print(f"✅ Videos updated in Notion: {updated_count}")
+    print(f"📋 Videos processed: {processed_count}")
+    print(f"✅ Videos updated in Notion: {updated_count} ({updated_from_store} from the Reporting API store)")
+    print(f"✅ Statistics-only updates: {stats_updated} ({stats_unchanged} unchanged, not written)")
     print(f"🟡 Videos skipped (missing Channel ID in Notion): {skipped_no_channel_id}")
     print(f"🟡 Videos skipped (missing auth token): {skipped_no_token}")
+    print(f"🟡 Videos skipped (channel Analytics access known to fail): {skipped_known_failing}")
+    print(f"⏭️ Videos skipped (already in the Notion WAL today): {skipped_in_wal}")
+    print(f"🔌 Videos skipped (channel circuit open after repeated auth failures): {skipped_circuit_open}")
+    circuit_breaker.summary()
+    channels.save_capabilities()
     print(f"🏁 Analytics Updater finished at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
 
 if __name__ == "__main__":
     import sys
     update_all = "--all" in sys.argv
-    run_analytics_updater(update_all=update_all)
\ No newline at end of file
+    run_analytics_updater(update_all=update_all, shard=sharding.parse_shard(sys.argv))
\ No newline at end of file
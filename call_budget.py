@@ -0,0 +1,72 @@
+"""
+Per-process cap on YouTube API calls: one network's quota budget (see networks.py).
+
+A network's own YOUTUBE_API_KEY only separates the key-based Data API calls.
+OAuth calls (Analytics, and Data API calls made with a channel token) are
+charged to the Cloud project of client_secrets, which every network shares. A
+budget keeps one network from spending that shared quota for the others.
+
+Every request through yt_rest and http_cache.get_json spends one call (the Data
+API reads used here cost one unit each). Once YOUTUBE_CALL_BUDGET calls are
+spent, further calls fail without reaching the API, the way a real quotaExceeded
+does: yt_rest requests raise BudgetExhausted (its message reads as a quota error,
+so channels.is_auth_error() doesn't treat it as a token problem), and
+http_cache.get_json returns a quotaExceeded error body.
+The googleapiclient fallback (YT_REST=0) is not counted.
+
+Unset or 0 means no budget (calls are still counted for the report).
+"""
+
+import os
+import threading
+
+BUDGET = int(os.getenv("YOUTUBE_CALL_BUDGET", "0") or 0)
+
+# report() line; the networks supervisor reads it back to carry the remaining budget forward
+REPORT_PREFIX = "📟 YouTube API calls:"
+
+_lock = threading.Lock()
+_spent = 0
+_refused = 0
+
+
+class BudgetExhausted(Exception):
+    """Raised by spend() instead of making a call once the budget is spent."""
+
+
+def spend(calls=1):
+    """Counts a call about to be made; raises BudgetExhausted if the budget is already spent."""
+    global _spent, _refused
+    with _lock:
+        if BUDGET and _spent + calls > BUDGET:
+            _refused += calls
+            first = _refused == calls
+        else:
+            _spent += calls
+            return
+    if first:
+        print(f"💸 YouTube call budget of {BUDGET} spent — skipping further API calls this run.")
+    raise BudgetExhausted(f"quotaExceeded: call budget of {BUDGET} spent for this network")
+
+
+def spent():
+    with _lock:
+        return _spent
+
+
+def report():
+    """Prints the calls spent (and refused) in this process."""
+    with _lock:
+        used, refused = _spent, _refused
+    budget = f" of {BUDGET}" if BUDGET else ""
+    print(f"{REPORT_PREFIX} {used}{budget} spent, {refused} refused")
+
+
+def parse_report(line):
+    """Calls spent from a report() line, or None for any other line."""
+    if REPORT_PREFIX not in line:
+        return None
+    try:
+        return int(line.split(REPORT_PREFIX, 1)[1].split()[0])
+    except (IndexError, ValueError):
+        return None
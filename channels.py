@@ -0,0 +1,160 @@
+"""
+Central channel registry shared by every pipeline script.
+
+The static registry (channel ID, client start date, page metadata) lives in
+channels.json. Per-channel capabilities (token present, Analytics scope works,
+channel is monetized) are learned from previous runs and stored in
+state/channel_capabilities.json, so scripts can skip calls that are known to fail.
+
+A capability that failed is skipped until RECHECK_DAYS have passed, then it is
+probed again on the next run (so a re-authorized token or newly monetized
+channel is picked up automatically).
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+import content_owner
+from networks import DATA_DIR
+
+REGISTRY_PATH = os.path.join(DATA_DIR, "channels.json")
+CAPABILITIES_PATH = os.path.join(DATA_DIR, "state", "channel_capabilities.json")
+TOKEN_DIR = os.path.join(DATA_DIR, "tokens")
+
+# How long a learned failure is trusted before the call is attempted again
+RECHECK_DAYS = 7
+
+# Capabilities tracked per channel
+ANALYTICS = "analytics"  # yt-analytics.readonly works for this channel's token
+REVENUE = "revenue"      # monetary scope granted and channel is monetized
+
+
+def load_registry(path=REGISTRY_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["channels"]
+
+
+REGISTRY = load_registry()
+
+# name -> channel ID for every channel the pipelines track (same shape the scripts always used)
+CHANNELS = {c["name"]: c["id"] for c in REGISTRY if c.get("tracked", True)}
+
+# name -> client start date (backfills never go earlier than this)
+CLIENT_START = {c["name"]: c["start"] for c in REGISTRY if c.get("tracked", True)}
+
+
+def get_channel(name):
+    """Returns the registry entry for a channel name, or None."""
+    for channel in REGISTRY:
+        if channel["name"] == name:
+            return channel
+    return None
+
+
+def channel_name_for_id(channel_id):
+    for channel in REGISTRY:
+        if channel["id"] == channel_id:
+            return channel["name"]
+    return None
+
+
+def token_path(channel_id):
+    return os.path.join(TOKEN_DIR, f"token_{channel_id}.pickle")
+
+
+def has_token(channel_id):
+    return os.path.exists(token_path(channel_id))
+
+
+# --- Learned capabilities ---
+
+_lock = threading.Lock()
+_capabilities = None
+_dirty = set()
+
+
+def _load_capabilities():
+    if os.path.exists(CAPABILITIES_PATH):
+        try:
+            with open(CAPABILITIES_PATH, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read {CAPABILITIES_PATH}, starting fresh: {e}")
+    return {}
+
+
+def _get_capabilities():
+    global _capabilities
+    if _capabilities is None:
+        _capabilities = _load_capabilities()
+    return _capabilities
+
+
+def is_capable(channel_id, capability):
+    """
+    Returns False if the call is known to fail for this channel:
+    no token on disk (and no content-owner token covering it), or the capability
+    failed within the last RECHECK_DAYS.
+    Unknown capabilities are assumed to work (so they get probed).
+    """
+    if not has_token(channel_id) and not content_owner.ENABLED:
+        return False
+    with _lock:
+        entry = _get_capabilities().get(channel_id, {}).get(capability)
+    if not entry or entry.get("ok"):
+        return True
+    try:
+        checked = datetime.fromisoformat(entry["checked"])
+    except (KeyError, ValueError):
+        return True
+    return (datetime.now(timezone.utc) - checked).days >= RECHECK_DAYS
+
+
+def record_outcome(channel_id, capability, ok, detail=""):
+    """Records whether a capability worked for a channel on this run."""
+    with _lock:
+        channel_caps = _get_capabilities().setdefault(channel_id, {})
+        previous = channel_caps.get(capability, {})
+        if ok and previous.get("ok"):
+            return  # Nothing new to learn
+        channel_caps[capability] = {
+            "ok": bool(ok),
+            "checked": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "detail": str(detail)[:200],
+        }
+        _dirty.add((channel_id, capability))
+    if not ok and previous.get("ok", True):
+        name = channel_name_for_id(channel_id) or channel_id
+        print(f"📝 Learned: {name} lacks '{capability}' — skipping it for {RECHECK_DAYS} days. ({str(detail)[:120]})")
+
+
+def is_auth_error(error):
+    """True for errors that mean the token/scope/channel can't do this call (not quota or transient)."""
+    text = str(error).lower()
+    if "quota" in text or "ratelimit" in text:
+        return False
+    return any(marker in text for marker in (
+        "httperror 401", "httperror 403", "forbidden", "insufficient", "does not have permission",
+        "invalid_grant", "unauthorized", "token has been expired or revoked",
+    ))
+
+
+def save_capabilities():
+    """Merges this run's learned outcomes into state/channel_capabilities.json."""
+    with _lock:
+        if not _dirty:
+            return
+        on_disk = _load_capabilities()
+        for channel_id, capability in _dirty:
+            on_disk.setdefault(channel_id, {})[capability] = _capabilities[channel_id][capability]
+        for channel in REGISTRY:
+            if channel.get("id") in on_disk:
+                on_disk[channel["id"]]["token"] = {"ok": has_token(channel["id"])}
+        os.makedirs(os.path.dirname(CAPABILITIES_PATH), exist_ok=True)
+        tmp_path = CAPABILITIES_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(on_disk, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, CAPABILITIES_PATH)
+        _dirty.clear()
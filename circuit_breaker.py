@@ -0,0 +1,95 @@
+"""
+Run-scoped circuit breaker per (channel, endpoint).
+
+A channel whose token was revoked or lacks a scope fails every call the same
+way: analytics_updater used to try each of its videos and print a 403
+diagnostic for each, and main.py repeated it for each of its queries. Here,
+after THRESHOLD consecutive auth/permission failures (channels.is_auth_error)
+for one channel and endpoint, the circuit opens: the remaining calls for that
+pair are skipped for the rest of the process and one summary line is printed.
+Quota and transient errors don't count, and a success closes the count again.
+
+This complements the learned capabilities in channels.py, which remember
+failures across runs; the breaker only stops the damage inside one run.
+"""
+
+import os
+import threading
+
+import channels
+
+THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "3"))
+
+# Endpoints guarded so far (revenue needs its own scope, so it trips separately)
+ANALYTICS = "youtubeAnalytics.reports.query"
+REVENUE = "youtubeAnalytics.reports.query:revenue"
+
+_lock = threading.Lock()
+_failures = {}  # (channel_id, endpoint) -> consecutive auth failures
+_open = {}      # (channel_id, endpoint) -> {"error": str, "skipped": int}
+
+
+class CircuitOpen(Exception):
+    """Raised by call() instead of calling an endpoint whose circuit is open."""
+
+
+def allow(channel_id, endpoint):
+    """False (and counts a skipped call) if the circuit for this channel and endpoint is open."""
+    with _lock:
+        state = _open.get((channel_id, endpoint))
+        if state is None:
+            return True
+        state["skipped"] += 1
+        return False
+
+
+def record_success(channel_id, endpoint):
+    with _lock:
+        _failures.pop((channel_id, endpoint), None)
+
+
+def record_failure(channel_id, endpoint, error):
+    """Counts an auth/permission failure; returns True if this one opened the circuit."""
+    if not channels.is_auth_error(error):
+        return False
+    key = (channel_id, endpoint)
+    with _lock:
+        if key in _open:
+            return False
+        _failures[key] = _failures.get(key, 0) + 1
+        if _failures[key] < THRESHOLD:
+            return False
+        _open[key] = {"error": str(error)[:160], "skipped": 0}
+    name = channels.channel_name_for_id(channel_id) or channel_id
+    print(f"🔌 Circuit open for {name} / {endpoint} after {THRESHOLD} auth failures — skipping its remaining calls this run.")
+    return True
+
+
+def call(channel_id, endpoint, fn):
+    """Runs fn() through the breaker: raises CircuitOpen when open, records the outcome otherwise."""
+    if not allow(channel_id, endpoint):
+        raise CircuitOpen(f"circuit open for {channel_id} / {endpoint}")
+    try:
+        result = fn()
+    except Exception as e:
+        record_failure(channel_id, endpoint, e)
+        raise
+    record_success(channel_id, endpoint)
+    return result
+
+
+def summary():
+    """Prints one line per open circuit. Returns {(channel_id, endpoint): skipped calls}."""
+    with _lock:
+        opened = {key: dict(state) for key, state in _open.items()}
+    for (channel_id, endpoint), state in sorted(opened.items()):
+        name = channels.channel_name_for_id(channel_id) or channel_id
+        print(f"🔌 {name} / {endpoint}: circuit open, {state['skipped']} call(s) skipped. Opened by: {state['error']}")
+    return {key: state["skipped"] for key, state in opened.items()}
+
+
+def reset():
+    """Closes every circuit (long-running processes call this between runs)."""
+    with _lock:
+        _failures.clear()
+        _open.clear()
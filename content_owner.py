@@ -0,0 +1,130 @@
+"""
+Content-owner (CMS) mode for YouTube Analytics.
+
+Normally every channel is queried on its own with ids=channel==<id> and its own
+token in tokens/. When YOUTUBE_CONTENT_OWNER_ID is set, reports are instead run
+once for the whole network with ids=contentOwner==<id>, broken down by
+dimensions=channel,day (or video) and filtered to the tracked channels, using
+a single CMS token (tokens/token_content_owner.pickle). The number of queries
+per run then no longer grows with the number of channels.
+
+Callers ask for one channel at a time; the network-wide report behind it is
+fetched once per (metrics, date range) and shared.
+"""
+
+import os
+import threading
+
+import run_cache
+import credential_pool
+
+TOKEN_PATH = credential_pool.token_path("content_owner")
+
+CONTENT_OWNER_ID = os.getenv("YOUTUBE_CONTENT_OWNER_ID", "").strip()
+ENABLED = bool(CONTENT_OWNER_ID)
+
+PAGE_SIZE = 10000        # Rows per report page (followed with startIndex)
+CHANNEL_FILTER_CHUNK = 100  # Channel IDs per filters=channel==a,b,... query
+VIDEO_FILTER_CHUNK = 200    # Video IDs per filters=video==a,b,... query
+
+_lock = threading.Lock()
+_network_reports = {}
+
+
+def clear_cache():
+    """Forgets memoized network reports (long-running processes call this between runs)."""
+    with _lock:
+        _network_reports.clear()
+
+
+def load_credentials():
+    """The CMS token from the shared credential pool. Returns None (with a warning) if it's missing."""
+    creds = credential_pool.get_credentials("content_owner")
+    if creds is None:
+        print(f"⚠️ Content-owner mode is on but no token found at {TOKEN_PATH}")
+    return creds
+
+
+def query(metrics, dimensions, start_date, end_date, filters=None, sort=None):
+    """
+    Runs one content-owner report, following startIndex pagination.
+    Returns (column_names, rows). Raises on API errors like reports().query().execute().
+    """
+    creds = load_credentials()
+    if creds is None:
+        raise RuntimeError("content-owner token missing")
+    youtube_analytics = credential_pool.service("youtubeAnalytics", "v2", credentials=creds)
+
+    columns, rows = [], []
+    start_index = 1
+    while True:
+        params = {
+            "ids": f"contentOwner=={CONTENT_OWNER_ID}",
+            "startDate": start_date,
+            "endDate": end_date,
+            "metrics": metrics,
+            "dimensions": dimensions,
+            "filters": filters,
+            "sort": sort,
+            "maxResults": PAGE_SIZE,
+            "startIndex": start_index,
+        }
+        response = run_cache.cached("youtubeAnalytics.reports.query", params,
+                                    lambda: youtube_analytics.reports().query(
+                                        **{k: v for k, v in params.items() if v is not None}).execute())
+        columns = [header["name"] for header in response.get("columnHeaders", [])] or columns
+        page = response.get("rows", [])
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return columns, rows
+        start_index += PAGE_SIZE
+
+
+def _network_report(metrics, start_date, end_date, network_ids):
+    """channel,day report for every tracked channel, grouped as {channel_id: [[day, *metrics], ...]}."""
+    key = (metrics, start_date, end_date, tuple(sorted(network_ids)))
+    with _lock:
+        if key in _network_reports:
+            return _network_reports[key]
+
+    by_channel = {channel_id: [] for channel_id in network_ids}
+    ids = sorted(network_ids)
+    for i in range(0, len(ids), CHANNEL_FILTER_CHUNK):
+        chunk = ids[i:i + CHANNEL_FILTER_CHUNK]
+        _, rows = query(metrics, "channel,day", start_date, end_date,
+                        filters=f"channel=={','.join(chunk)}", sort="day")
+        for row in rows:
+            by_channel.setdefault(row[0], []).append(row[1:])
+
+    with _lock:
+        _network_reports[key] = by_channel
+    return by_channel
+
+
+def channel_day_rows(channel_id, start_date, end_date, metrics, network_ids):
+    """
+    Same rows a per-channel dimensions=day query returns ([day, *metrics], by day),
+    served from the network-wide report for this metrics/date range.
+    """
+    return _network_report(metrics, start_date, end_date, network_ids).get(channel_id, [])
+
+
+def video_metrics(video_ids, start_date, end_date, metrics):
+    """
+    Per-video totals via dimensions=video, VIDEO_FILTER_CHUNK videos per query.
+    Returns {video_id: {metric: value}}; queried videos without data map to {},
+    and videos in a chunk that failed are left out.
+    """
+    results = {}
+    ids = list(dict.fromkeys(video_ids))
+    for i in range(0, len(ids), VIDEO_FILTER_CHUNK):
+        chunk = ids[i:i + VIDEO_FILTER_CHUNK]
+        try:
+            columns, rows = query(metrics, "video", start_date, end_date, filters=f"video=={','.join(chunk)}")
+        except Exception as e:
+            print(f"❌ Content-owner video report failed for {len(chunk)} videos starting with {chunk[0]}: {e}")
+            continue
+        results.update({video_id: {} for video_id in chunk})
+        for row in rows:
+            results[row[0]] = {name: value for name, value in zip(columns[1:], row[1:])}
+    return results
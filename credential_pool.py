@@ -0,0 +1,62 @@
+"""
+Process-wide pool of OAuth credentials and Google API service objects.
+
+Every script used to unpickle tokens/token_<channel_id>.pickle and call
+build() each time it needed a client. When the scripts run together in one
+process (see pipeline.py) the pool loads each token once and hands out service
+objects built once per thread — googleapiclient services aren't thread-safe,
+so each worker thread gets its own. The endpoints the pipeline uses are served
+by yt_rest's lightweight clients; googleapiclient is only imported for others.
+"""
+
+import os
+import pickle
+import threading
+
+import yt_rest
+from networks import DATA_DIR
+
+TOKEN_DIR = os.path.join(DATA_DIR, "tokens")
+
+_lock = threading.Lock()
+_credentials = {}  # channel_id -> creds (missing tokens aren't cached, so one added later is found)
+_local = threading.local()
+
+
+def token_path(channel_id):
+    return os.path.join(TOKEN_DIR, f"token_{channel_id}.pickle")
+
+
+def load_credentials(channel_id):
+    """Returns the channel's credentials (loaded once per process). Raises FileNotFoundError if there's no token."""
+    with _lock:
+        if channel_id not in _credentials:
+            with open(token_path(channel_id), "rb") as f:
+                _credentials[channel_id] = pickle.load(f)
+        return _credentials[channel_id]
+
+
+def get_credentials(channel_id):
+    """Like load_credentials(), but returns None if there's no token."""
+    try:
+        return load_credentials(channel_id)
+    except FileNotFoundError:
+        return None
+
+
+def service(api, version, credentials=None, developerKey=None):
+    """build() with the same arguments, cached per thread and per credential."""
+    cache = getattr(_local, "services", None)
+    if cache is None:
+        cache = _local.services = {}
+    key = (api, version, id(credentials) if credentials is not None else None, developerKey)
+    if key not in cache:
+        if yt_rest.supports(api, version):
+            build = yt_rest.build
+        else:
+            from googleapiclient.discovery import build
+        if credentials is not None:
+            cache[key] = build(api, version, credentials=credentials, cache_discovery=False)
+        else:
+            cache[key] = build(api, version, developerKey=developerKey, cache_discovery=False)
+    return cache[key]
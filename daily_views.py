@@ -1,40 +1,39 @@
 """
-Fetches daily view totals for all network channels and writes to public/daily-views.json.
+Fetches daily view totals for all network channels and writes to public/daily-views.json
+(plus the rolling-window summaries in public/rollups.json, see rollups.py).
 
 Usage:
   python daily_views.py              # Fetch last 7 days (daily mode)
   python daily_views.py --backfill   # Fetch history back to each channel's client start date
+  python daily_views.py --shard 0/4  # Only this shard's channels, written to public/partials/ (see merge_outputs.py)
 """
 
 import os
 import sys
 import json
-import pickle
+import bisect
 from datetime import datetime, timedelta
 
 import requests
-from googleapiclient.discovery import build
+import channels
+import run_cache
+import http_cache
+import content_owner
+import credential_pool
+import sharding
+import rollups
+from networks import DATA_DIR
 
 # --- CONFIGURATION ---
 YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY", "")
 
 # Channel ID and client start date (backfill won't go earlier than this)
 CHANNELS = {
-    "All The Smoke":       {"id": "UC2ozVs4pg2K3uFLw6-0ayCQ", "start": "2025-03-01"},
-    "KG Certified":        {"id": "UCa9W_cPwwbDlwBwHOd1YWoQ", "start": "2025-03-01"},
-    "Morning Kombat":      {"id": "UC9Qy3sHrr5wil-rkYcmcNcw", "start": "2025-03-01"},
-    "All The Smoke Fight":  {"id": "UCFPoJNd0d4k1H9A6UOlikcg", "start": "2025-03-01"},
-    "Ring Champs":         {"id": "UCBX_Qx_Hx5QTuEL72YVyn_A", "start": "2025-03-01"},
-    "Killswitch":          {"id": "UCbwGkD8-Fbxun7zgzfC5kjg", "start": "2025-03-01"},
-    "The Late Run":        {"id": "UCcZ6iVdTPU5g4pN3MaIbruw", "start": "2025-03-01"},
-    "San Antonio Spurs":   {"id": "UCEZHE-0CoHqeL1LGFa2EmQw", "start": "2025-06-01"},
-    "Michael Easter":      {"id": "UC-3foA4PyACqvubjyrlzIcg", "start": "2025-03-01"},
-    "Anik & Florian":      {"id": "UCDqSRXkx0E58VdH__Y8expQ", "start": "2025-03-01"},
-    "No Such Thing":       {"id": "UCFRiYABu5iXlkEF5ZCZd6wQ", "start": "2025-03-01"},
+    name: {"id": channel_id, "start": channels.CLIENT_START[name]}
+    for name, channel_id in channels.CHANNELS.items()
 }
 
-SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
-OUTPUT_PATH = os.path.join(SCRIPT_DIR, "public", "daily-views.json")
+OUTPUT_PATH = os.path.join(DATA_DIR, "public", "daily-views.json")
 
 
 def load_existing_data():
@@ -47,12 +46,7 @@ def load_existing_data():
 
 def load_token(channel_id):
     """Load OAuth credentials for a channel, return None if unavailable."""
-    token_path = os.path.join(SCRIPT_DIR, "tokens", f"token_{channel_id}.pickle")
-    try:
-        with open(token_path, "rb") as f:
-            return pickle.load(f)
-    except FileNotFoundError:
-        return None
+    return credential_pool.get_credentials(channel_id)
 
 
 def fetch_daily_views(creds, channel_id, start_date, end_date):
@@ -60,30 +54,41 @@ def fetch_daily_views(creds, channel_id, start_date, end_date):
     Fetch daily views from YouTube Analytics API.
     Returns dict of {date_str: view_count}.
     Processes in 180-day chunks to stay within API limits.
+    In content-owner mode each chunk is served from one network-wide report (creds unused).
     """
     daily = {}
     chunk_start = datetime.strptime(start_date, "%Y-%m-%d")
     end_dt = datetime.strptime(end_date, "%Y-%m-%d")
 
-    youtube_analytics = build("youtubeAnalytics", "v2", credentials=creds)
+    youtube_analytics = None if content_owner.ENABLED else credential_pool.service("youtubeAnalytics", "v2", credentials=creds)
 
     while chunk_start < end_dt:
         chunk_end = min(chunk_start + timedelta(days=180), end_dt)
         try:
-            response = youtube_analytics.reports().query(
-                ids=f"channel=={channel_id}",
-                startDate=chunk_start.strftime("%Y-%m-%d"),
-                endDate=chunk_end.strftime("%Y-%m-%d"),
-                metrics="views",
-                dimensions="day",
-                sort="day",
-            ).execute()
-
-            for row in response.get("rows", []):
+            if content_owner.ENABLED:
+                rows = content_owner.channel_day_rows(
+                    channel_id, chunk_start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d"), "views",
+                    [info["id"] for info in CHANNELS.values()])
+            else:
+                response = youtube_analytics.reports().query(
+                    ids=f"channel=={channel_id}",
+                    startDate=chunk_start.strftime("%Y-%m-%d"),
+                    endDate=chunk_end.strftime("%Y-%m-%d"),
+                    metrics="views",
+                    dimensions="day",
+                    sort="day",
+                ).execute()
+                rows = response.get("rows", [])
+
+            for row in rows:
                 daily[row[0]] = row[1]
+            channels.record_outcome(channel_id, channels.ANALYTICS, True)
 
         except Exception as e:
             print(f"  Warning: Analytics API error for chunk {chunk_start.date()}–{chunk_end.date()}: {e}")
+            if channels.is_auth_error(e):
+                channels.record_outcome(channel_id, channels.ANALYTICS, False, e)
+                break
 
         chunk_start = chunk_end + timedelta(days=1)
 
@@ -95,17 +100,75 @@ def get_channel_total_views(channel_id):
     if not YOUTUBE_API_KEY:
         return 0
     url = "https://www.googleapis.com/youtube/v3/channels"
-    params = {"part": "statistics", "id": channel_id, "key": YOUTUBE_API_KEY}
+    params = {"part": "statistics", "id": channel_id, "fields": http_cache.FIELDS["channels.statistics"], "key": YOUTUBE_API_KEY}
     try:
-        res = requests.get(url, params=params).json()
+        res = run_cache.cached("youtube.channels.list", params,
+                               lambda: http_cache.get_json("youtube.channels.list", url, params))
         return int(res["items"][0]["statistics"]["viewCount"])
     except (KeyError, IndexError, requests.RequestException):
         return 0
 
 
-def main():
-    backfill = "--backfill" in sys.argv
-    data = load_existing_data()
+def merge_days(daily, updates):
+    """
+    Merges {date: {channel: views}} into the date-sorted daily dict without re-sorting it.
+    New dates after the last known one are appended in order; back-filled ones are
+    spliced in with bisect. Returns the (possibly rebuilt) daily dict.
+    """
+    dates = list(daily)
+    new_dates = sorted(d for d in updates if d not in daily)
+    for date_str, values in updates.items():
+        daily.setdefault(date_str, {}).update(values)
+    if new_dates and dates and new_dates[0] < dates[-1]:
+        for date_str in new_dates:
+            bisect.insort(dates, date_str)
+        return {date_str: daily[date_str] for date_str in dates}
+    for date_str in new_dates:
+        daily[date_str] = daily.pop(date_str)  # Re-append in sorted order
+    return daily
+
+
+def summarize(data, last_updated, touched_dates=None):
+    """
+    Recomputes per-day network totals, date ordering and summary fields in place.
+    With touched_dates, only those days' totals are recomputed and data["daily"]
+    is assumed to be sorted already (see merge_days).
+    """
+    if touched_dates is None:
+        touched_dates = data["daily"]
+        # Sort daily entries by date
+        data["daily"] = dict(sorted(data["daily"].items()))
+
+    # Daily network totals; don't overwrite channel entries — just ensure _total is current
+    for date_str in touched_dates:
+        channel_views = data["daily"][date_str]
+        channel_views["_total"] = sum(v for k, v in channel_views.items() if k != "_total")
+
+    # Summary stats
+    data["last_updated"] = last_updated
+    data["network_total_views"] = sum(
+        ch.get("total_views", 0) for ch in data["channels"].values()
+    )
+
+    # Date range info (first and last keys of the sorted dict)
+    if data["daily"]:
+        data["earliest_date"] = next(iter(data["daily"]))
+        data["latest_date"] = next(reversed(data["daily"]))
+    return data
+
+
+def write_atomic(path, data):
+    """Writes JSON through a temp file + rename, so readers never see a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main(backfill=False, shard=None):
+    # A shard only writes what it fetched; merge_outputs.py folds it into the existing file
+    data = load_existing_data() if shard is None else {"last_updated": None, "channels": {}, "daily": {}}
     today = datetime.utcnow().date()
     end_date = today.isoformat()
 
@@ -113,8 +176,11 @@ def main():
         print(f"Backfill mode: fetching from each channel's client start date to {today}")
     else:
         print(f"Daily mode: fetching last 7 days to {today}")
+    if shard is not None:
+        print(f"Sharded run: {sharding.describe(shard)}")
 
-    for channel_name, channel_info in CHANNELS.items():
+    updates = {}  # date -> {channel: views} fetched this run
+    for channel_name, channel_info in sharding.filter_channels(CHANNELS, shard, lambda info: info["id"]).items():
         channel_id = channel_info["id"]
         client_start = channel_info["start"]
 
@@ -134,52 +200,47 @@ def main():
             "client_start": client_start,
         }
 
-        # Fetch daily views if we have a token
+        # Fetch daily views if we have a working token
+        if channels.has_token(channel_id) and not channels.is_capable(channel_id, channels.ANALYTICS):
+            print(f"  Analytics access known to fail — skipping daily analytics (lifetime total: {total_views:,})")
+            continue
         creds = load_token(channel_id)
-        if creds is None:
+        if creds is None and not content_owner.ENABLED:
             print(f"  No OAuth token — skipping daily analytics (lifetime total: {total_views:,})")
             continue
 
         daily_views = fetch_daily_views(creds, channel_id, start_date, end_date)
         print(f"  Fetched {len(daily_views)} days of data")
 
-        # Merge into existing data
         for date_str, views in daily_views.items():
-            if date_str not in data["daily"]:
-                data["daily"][date_str] = {}
-            data["daily"][date_str][channel_name] = views
+            updates.setdefault(date_str, {})[channel_name] = views
 
-    # Compute daily network totals
-    for date_str in data["daily"]:
-        channel_views = data["daily"][date_str]
-        # Don't overwrite channel entries — just ensure _total is current
-        channel_views["_total"] = sum(v for k, v in channel_views.items() if k != "_total")
+    # Merge into existing data, touching only the fetched dates
+    data["daily"] = merge_days(data["daily"], updates)
 
-    # Sort daily entries by date
-    data["daily"] = dict(sorted(data["daily"].items()))
+    channels.save_capabilities()
 
-    # Summary stats
-    data["last_updated"] = today.isoformat()
-    data["network_total_views"] = sum(
-        ch.get("total_views", 0) for ch in data["channels"].values()
-    )
+    if shard is not None:
+        data["last_updated"] = today.isoformat()
+        partial_path = sharding.partial_path("daily-views", shard)
+        os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+        with open(partial_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        print(f"\nWrote partial {partial_path} ({len(data['channels'])} channels)")
+        return
 
-    # Date range info
-    all_dates = list(data["daily"].keys())
-    if all_dates:
-        data["earliest_date"] = all_dates[0]
-        data["latest_date"] = all_dates[-1]
+    summarize(data, today.isoformat(), touched_dates=updates)
 
     # Write output
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    with open(OUTPUT_PATH, "w") as f:
-        json.dump(data, f, indent=2)
+    write_atomic(OUTPUT_PATH, data)
+
+    rollups.write_rollups(data)
 
-    print(f"\nWrote {OUTPUT_PATH}")
-    print(f"  Dates covered: {len(all_dates)}")
+    print(f"\nWrote {OUTPUT_PATH} and {rollups.OUTPUT_PATH}")
+    print(f"  Dates covered: {len(data['daily'])} ({len(updates)} updated this run)")
     print(f"  Network lifetime views: {data['network_total_views']:,}")
     print(f"  Channels: {len(data['channels'])}")
 
 
 if __name__ == "__main__":
-    main()
+    main(backfill="--backfill" in sys.argv, shard=sharding.parse_shard(sys.argv))
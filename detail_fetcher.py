@@ -0,0 +1,98 @@
+"""
+Network-wide videos.list fetcher.
+
+video_tracker.fetch_video_details batches IDs 50 at a time, but only within one
+channel, so a channel with 3 new videos still costs a whole videos.list call.
+This collects candidate IDs from every channel, packs them into full 50-ID
+batches, fetches the batches concurrently and routes each item back to the
+channel it came from. A typical daily run needs 1-2 calls for the whole network.
+
+videos.list only needs a public credential, so the API key is used when set;
+otherwise any channel's OAuth token works.
+"""
+
+import json
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+import run_cache
+import http_cache
+
+VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+BATCH_SIZE = 50  # videos.list accepts at most 50 IDs per call
+MAX_WORKERS = 4
+DEFAULT_PART = "statistics,snippet,contentDetails"
+PART_FIELDS = {DEFAULT_PART: http_cache.FIELDS["videos"], "statistics": http_cache.FIELDS["videos.statistics"]}
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def pack_batches(ids_by_channel):
+    """Flattens {channel_id: [video_id, ...]} into full 50-ID batches plus a video_id -> channel_id map."""
+    owner = {}
+    for channel_id, video_ids in ids_by_channel.items():
+        for video_id in video_ids:
+            owner.setdefault(video_id, channel_id)
+    all_ids = list(owner)
+    batches = [all_ids[i:i + BATCH_SIZE] for i in range(0, len(all_ids), BATCH_SIZE)]
+    return batches, owner
+
+
+def _session_for(api_key=None, creds=None):
+    if api_key:
+        return requests.Session(), {"key": api_key}
+    from google.auth.transport.requests import AuthorizedSession
+    return AuthorizedSession(creds), {}
+
+
+def _fetch_batch(batch, part, api_key, creds):
+    params = {"part": part, "id": ",".join(batch)}
+    if part in PART_FIELDS:
+        params["fields"] = PART_FIELDS[part]
+
+    def fetch():
+        session, auth_params = _session_for(api_key, creds)
+        body = http_cache.get_json("youtube.videos.list", VIDEOS_URL, {**params, **auth_params}, session=session)
+        error = body.get("error")
+        if error:
+            message = error.get("message", "")
+            if error.get("code") == 403 and "quota" in json.dumps(error).lower():
+                raise QuotaExceeded(message)
+            raise RuntimeError(f"videos.list HTTP {error.get('code')}: {message[:300]}")
+        return body
+
+    return run_cache.cached("youtube.videos.list", params, fetch).get("items", [])
+
+
+def fetch_details_for_channels(ids_by_channel, api_key=None, creds=None, part=DEFAULT_PART, max_workers=MAX_WORKERS):
+    """
+    Fetches videos.list details for every channel's IDs in as few calls as possible.
+    Returns {channel_id: [video items]} (every input channel present), or None if quota was exceeded.
+    """
+    results = {channel_id: [] for channel_id in ids_by_channel}
+    batches, owner = pack_batches(ids_by_channel)
+    if not batches:
+        return results
+    if not api_key and not creds:
+        print("❌ No API key or OAuth token available for videos.list.")
+        return results
+
+    print(f"⬇️ Fetching details for {len(owner)} videos from {len(ids_by_channel)} channels in {len(batches)} videos.list call(s)...")
+    quota_hit = False
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        futures = [pool.submit(_fetch_batch, batch, part, api_key, creds) for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                for item in future.result():
+                    channel_id = owner.get(item.get("id"))
+                    if channel_id:
+                        results[channel_id].append(item)
+            except QuotaExceeded as e:
+                print(f"🟡 YouTube API quota exceeded while fetching video details: {e}")
+                quota_hit = True
+            except Exception as e:
+                print(f"❌ Error fetching details for batch starting with {batch[0]}: {e}")
+
+    return None if quota_hit else results
@@ -0,0 +1,137 @@
+"""
+Renders the static widget pages (one per channel, dashboard.html and index.html)
+from the templates in templates/, the channel registry (channels.json) and the
+channel data in public/data.json.
+
+Each page gets its channel data inlined, so it renders without fetching
+public/data.json. Files are only rewritten when their rendered output changed.
+The "Data updated" footer comes from the entries' "updated" dates (set by
+main.py when a channel's values change), so unchanged data renders unchanged
+pages.
+
+Usage:
+  python generate_pages.py
+"""
+
+import os
+import re
+import json
+import html
+from datetime import datetime
+
+import pytz
+
+from channels import REGISTRY
+from networks import DATA_DIR
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+TEMPLATE_DIR = os.path.join(SCRIPT_DIR, "templates")
+DATA_PATH = os.path.join(DATA_DIR, "public", "data.json")
+
+# One page per registry entry, in registry order (see channels.json for
+# display names, dashboard card titles and local icon files)
+PAGES = REGISTRY
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+def load_template(name):
+    with open(os.path.join(TEMPLATE_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def render(template, context):
+    """Substitutes {{ key }} placeholders. Values are inserted as-is (escape before passing)."""
+    return PLACEHOLDER.sub(lambda m: str(context[m.group(1)]), template)
+
+
+def to_script_json(value):
+    """JSON for inlining inside a <script> block (no '</script>' breakouts)."""
+    return json.dumps(value, separators=(",", ":")).replace("<", "\\u003c")
+
+
+def write_if_changed(path, content):
+    """Writes content to path only if it differs from what's on disk. Returns True if written."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return True
+
+
+def render_channel_page(template, page, channel, updated):
+    icon = page["icon"] or (channel or {}).get("icon", "")
+    return render(template, {
+        "display": html.escape(page["display"]),
+        "icon": html.escape(icon),
+        "channel_json": to_script_json(channel),
+        "updated": updated,
+    })
+
+
+def render_dashboard(template, channel_map, updated):
+    cards = []
+    for page in PAGES:
+        channel = channel_map.get(page["name"])
+        if not channel:
+            continue
+        card = dict(channel)
+        card["display"] = page["dashboard_name"]
+        card["icon"] = page["icon"] or channel.get("icon", "")
+        card["page"] = f"{page['slug']}.html"
+        cards.append(card)
+    return render(template, {"channels_json": to_script_json(cards), "updated": updated})
+
+
+def render_index(template):
+    items = []
+    for page in PAGES:
+        img = f'<img src="{html.escape(page["icon"])}" alt="" /> ' if page["icon"] else ""
+        items.append(
+            f'            <li><a href="{page["slug"]}.html" class="nav-link">{img}'
+            f'{html.escape(page["display"], quote=False)} <span class="arrow">&#8250;</span></a></li>'
+        )
+    return render(template, {"nav_items": "\n".join(items)})
+
+
+def format_updated(entries, data_path):
+    """Newest "updated" date of the entries, for the footer (data.json's mtime for entries without one)."""
+    dates = [entry["updated"] for entry in entries if entry and entry.get("updated")]
+    if dates:
+        day = datetime.strptime(max(dates), "%Y-%m-%d")
+    else:
+        day = datetime.fromtimestamp(os.path.getmtime(data_path), pytz.timezone("US/Eastern"))
+    return day.strftime("%B %-d, %Y")
+
+
+def generate_pages(output_dir=DATA_DIR, data_path=DATA_PATH):
+    """Renders every page in one pass. Returns the list of files that were (re)written."""
+    with open(data_path, "r") as f:
+        data = json.load(f)
+    channel_map = {ch["name"]: ch for ch in data}
+
+    channel_template = load_template("channel.html")
+    outputs = {}
+    for page in PAGES:
+        channel = channel_map.get(page["name"])
+        # Channels without data (or a date) show the data file's newest date
+        updated = format_updated([channel] if channel and channel.get("updated") else data, data_path)
+        outputs[f"{page['slug']}.html"] = render_channel_page(channel_template, page, channel, updated)
+    outputs["dashboard.html"] = render_dashboard(load_template("dashboard.html"), channel_map, format_updated(data, data_path))
+    outputs["index.html"] = render_index(load_template("index.html"))
+
+    written = []
+    for filename, content in outputs.items():
+        if write_if_changed(os.path.join(output_dir, filename), content):
+            written.append(filename)
+    return written
+
+
+if __name__ == "__main__":
+    written = generate_pages()
+    if written:
+        print(f"📄 Wrote {len(written)} page(s): {', '.join(written)}")
+    else:
+        print("✅ All pages up to date.")
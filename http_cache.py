@@ -0,0 +1,138 @@
+"""
+ETag cache for YouTube Data API responses, shared by main.py, daily_views.py
+and video_tracker.py.
+
+Data API resources carry an `etag`. The last body and its etag are kept per
+request under .cache/http/; the next request for the same resource sends
+If-None-Match and, on 304 Not Modified, the stored body is returned without
+re-downloading or re-parsing it.
+
+Unlike run_cache (one run only), entries live across runs — the workflows keep
+.cache/http/ with actions/cache. The FIELDS masks below trim every response to
+what the callers read; callers sharing a mask also share run_cache entries.
+"""
+
+import os
+import json
+import time
+import threading
+
+import requests
+
+import run_cache
+import call_budget
+from networks import DATA_DIR
+
+CACHE_ROOT = os.path.join(DATA_DIR, ".cache", "http")
+ENABLED = os.getenv("HTTP_CACHE", "1") != "0"
+
+# Entries not revalidated for this long are removed on first write
+STALE_ENTRY_SECONDS = 30 * 24 * 60 * 60
+
+# Partial-response masks (etag is always kept so the next request can be conditional)
+FIELDS = {
+    "channels.statistics": "etag,items(statistics(subscriberCount,viewCount,videoCount))",
+    "channels.snippet": "etag,items(snippet(thumbnails(default(url),high(url))))",
+    "playlistItems": "etag,nextPageToken,items(snippet(title,thumbnails(default(url))),contentDetails(videoId,videoPublishedAt))",
+    "videos": "etag,items(id,snippet(title,publishedAt,thumbnails(high(width,height))),contentDetails(duration),statistics)",
+    "videos.statistics": "etag,items(id,statistics(viewCount,likeCount,commentCount))",
+}
+
+_pruned = False
+_prune_lock = threading.Lock()
+
+
+def _entry_path(endpoint, params):
+    return os.path.join(CACHE_ROOT, run_cache.cache_key(endpoint, params) + ".json")
+
+
+def load(endpoint, params):
+    """Returns the stored {"etag", "body"} for a request, or None."""
+    if not ENABLED:
+        return None
+    try:
+        with open(_entry_path(endpoint, params), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store(endpoint, params, body, etag=None):
+    """Keeps a successful response body for later conditional requests. Bodies without an etag are skipped."""
+    etag = etag or (body.get("etag") if isinstance(body, dict) else None)
+    if not ENABLED or not etag or (isinstance(body, dict) and "error" in body):
+        return
+    _prune_stale_entries()
+    path = _entry_path(endpoint, params)
+    os.makedirs(CACHE_ROOT, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"endpoint": endpoint, "etag": etag, "body": body}, f)
+    os.replace(tmp_path, path)
+
+
+def touch(endpoint, params):
+    """Marks an entry as just revalidated (keeps it from being pruned)."""
+    try:
+        os.utime(_entry_path(endpoint, params))
+    except OSError:
+        pass
+
+
+def get_json(endpoint, url, params, session=None, timeout=30):
+    """
+    GET url with If-None-Match when a previous body is stored.
+    Returns the parsed body — the stored one on 304. Raises requests exceptions like requests.get.
+    """
+    cached = load(endpoint, params)
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    try:
+        call_budget.spend()
+    except call_budget.BudgetExhausted as e:
+        # Returned like the API's own quota error: requests-based callers read errors from the body
+        return {"error": {"code": 403, "message": str(e), "errors": [{"reason": "quotaExceeded"}]}}
+    response = (session or requests).get(url, params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        touch(endpoint, params)
+        return cached["body"]
+    body = response.json()
+    if response.status_code == 200:
+        store(endpoint, params, body, response.headers.get("ETag"))
+    return body
+
+
+def execute(endpoint, params, request):
+    """
+    Executes a googleapiclient or yt_rest request conditionally.
+    Returns the stored body when the API answers 304; other HttpErrors propagate.
+    """
+    cached = load(endpoint, params)
+    if cached:
+        request.headers["If-None-Match"] = cached["etag"]
+    try:
+        body = request.execute()
+    except Exception as e:  # googleapiclient's or yt_rest's HttpError, both carry .resp.status
+        if cached and getattr(getattr(e, "resp", None), "status", None) == 304:
+            touch(endpoint, params)
+            return cached["body"]
+        raise
+    store(endpoint, params, body)
+    return body
+
+
+def _prune_stale_entries():
+    global _pruned
+    with _prune_lock:
+        if _pruned:
+            return
+        _pruned = True
+    if not os.path.isdir(CACHE_ROOT):
+        return
+    now = time.time()
+    for name in os.listdir(CACHE_ROOT):
+        path = os.path.join(CACHE_ROOT, name)
+        try:
+            if now - os.path.getmtime(path) > STALE_ENTRY_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,147 @@
+"""
+Leveled logging for the hot loops, without a stdout write per item.
+
+The per-video loops used to print several lines per item. On --all runs that
+was tens of thousands of synchronous writes to the Actions log. Loggers from
+get_logger() instead:
+
+  - filter by level (LOG_LEVEL=DEBUG brings the per-item detail back; default INFO);
+  - hand records to a queue that one background thread writes out, so the loop
+    never blocks on stdout (flush() waits for it, e.g. before a summary);
+  - can sample a message type (sampled()): the first SAMPLE_FIRST occurrences of
+    a kind are logged, then one in every SAMPLE_EVERY, and report_suppressed()
+    prints how many of each kind were held back;
+  - can report progress (Progress): one line per N items or per PROGRESS_SECONDS,
+    with the rate and an ETA when the total is known.
+
+Messages are written as-is (no timestamps or level names), so the output reads
+like the print() lines around it.
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from logging import DEBUG, INFO, WARNING, ERROR
+
+LEVEL = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+SAMPLE_FIRST = int(os.getenv("LOG_SAMPLE_FIRST", "5"))
+SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+PROGRESS_EVERY = int(os.getenv("LOG_PROGRESS_EVERY", "500"))
+PROGRESS_SECONDS = 30
+
+ROOT = "youtubenotion"
+
+_lock = threading.Lock()
+_queue = queue.Queue()
+_listener = None
+_sample_counts = {}  # kind -> (logger name, occurrences)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time (it may be swapped after setup)."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def _setup():
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(_queue, handler)
+        _listener.start()
+        root = logging.getLogger(ROOT)
+        root.setLevel(LEVEL)
+        root.addHandler(logging.handlers.QueueHandler(_queue))
+        root.propagate = False
+        atexit.register(shutdown)
+
+
+def get_logger(name):
+    """Logger for one script or component (a child of the package's root logger)."""
+    _setup()
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def flush():
+    """Blocks until every queued record has been written (so print() output after it stays in order)."""
+    _queue.join()
+    sys.stdout.flush()
+
+
+def shutdown():
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        sys.stdout.flush()
+
+
+def sampled(logger, kind, level, message):
+    """Logs a message of a repetitive kind: the first SAMPLE_FIRST, then one in every SAMPLE_EVERY."""
+    with _lock:
+        _, count = _sample_counts.get(kind, (logger.name, 0))
+        count += 1
+        _sample_counts[kind] = (logger.name, count)
+    if count <= SAMPLE_FIRST:
+        logger.log(level, message)
+    elif (count - SAMPLE_FIRST) % SAMPLE_EVERY == 0:
+        logger.log(level, f"{message} (occurrence {count}; similar messages are sampled)")
+
+
+def report_suppressed():
+    """One line per sampled kind with messages held back (on its own logger); resets the counts."""
+    with _lock:
+        counts = dict(_sample_counts)
+        _sample_counts.clear()
+    for kind, (name, count) in sorted(counts.items()):
+        shown = min(count, SAMPLE_FIRST) + max(count - SAMPLE_FIRST, 0) // SAMPLE_EVERY
+        if count > shown:
+            logging.getLogger(name).info(f"🔇 {kind}: {count} occurrence(s), {count - shown} not shown")
+
+
+class Progress:
+    """Counts processed items and logs one progress line per `every` items or PROGRESS_SECONDS."""
+
+    def __init__(self, logger, label, total=None, every=PROGRESS_EVERY):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.every = max(1, every)
+        self.count = 0
+        self.started = self.last_report = time.monotonic()
+
+    def tick(self, n=1):
+        self.count += n
+        now = time.monotonic()
+        if self.count % self.every == 0 or now - self.last_report >= PROGRESS_SECONDS:
+            self.last_report = now
+            self.logger.info(self._line(now))
+
+    def done(self):
+        self.logger.info(self._line(time.monotonic(), final=True))
+
+    def _line(self, now, final=False):
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.count / elapsed
+        line = f"{'🏁' if final else '⏳'} {self.label}: {self.count}"
+        if self.total:
+            line += f"/{self.total} ({self.count / self.total:.0%})"
+        line += f" · {rate:.1f}/s · {elapsed:.0f}s"
+        if self.total and not final and rate > 0:
+            line += f" · ETA {(self.total - self.count) / rate:.0f}s"
+        return line
@@ -2,11 +2,20 @@ import requests
 from datetime import datetime, timedelta
 import pytz
 import os
-
-from googleapiclient.discovery import build
-import pickle
+import sys
 import json
 
+import channels
+import circuit_breaker
+import run_cache
+import http_cache
+import content_owner
+import credential_pool
+import upload_index
+import sharding
+from channels import CHANNELS
+from networks import DATA_DIR
+
 # --- Debug: Print Current Working Directory ---
 print(f"\n--- SCRIPT CWD: {os.getcwd()} ---\n")
 
@@ -15,20 +24,6 @@ YOUTUBE_API_KEY = os.environ["YOUTUBE_API_KEY"]
 NOTION_TOKEN = os.environ["NOTION_TOKEN"]
 NOTION_DATABASE_ID = os.environ["NOTION_DATABASE_ID"]
 
-CHANNELS = {
-    "All The Smoke": "UC2ozVs4pg2K3uFLw6-0ayCQ",
-    "KG Certified": "UCa9W_cPwwbDlwBwHOd1YWoQ",
-    "Morning Kombat": "UC9Qy3sHrr5wil-rkYcmcNcw",
-    "All The Smoke Fight": "UCFPoJNd0d4k1H9A6UOlikcg",
-    "Ring Champs": "UCBX_Qx_Hx5QTuEL72YVyn_A",
-    "San Antonio Spurs": "UCEZHE-0CoHqeL1LGFa2EmQw",
-    "Killswitch": "UCbwGkD8-Fbxun7zgzfC5kjg",
-    "The Late Run": "UCcZ6iVdTPU5g4pN3MaIbruw",
-    "Michael Easter": "UC-3foA4PyACqvubjyrlzIcg",
-    "Anik & Florian": "UCDqSRXkx0E58VdH__Y8expQ",
-    "No Such Thing": "UCFRiYABu5iXlkEF5ZCZd6wQ"
-}
-
 # --- HELPERS ---
 def get_channel_stats(channel_id):
     """
@@ -39,9 +34,11 @@ def get_channel_stats(channel_id):
     params = {
         "part": "statistics",
         "id": channel_id,
+        "fields": http_cache.FIELDS["channels.statistics"],
         "key": YOUTUBE_API_KEY
     }
-    res = requests.get(url, params=params).json()
+    res = run_cache.cached("youtube.channels.list", params,
+                           lambda: http_cache.get_json("youtube.channels.list", url, params))
 
     try:
         stats = res["items"][0]["statistics"]
@@ -62,17 +59,12 @@ def get_analytics(channel_id, start_date, end_date):
     NOTE: This function is largely superseded by get_advanced_analytics for specific ranges.
     """
     try:
-        # --- MODIFIED TOKEN PATH --- BEGIN
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        token_path = os.path.join(script_dir, "tokens", f"token_{channel_id}.pickle")
-        # --- MODIFIED TOKEN PATH --- END
-        with open(token_path, "rb") as token_file:
-            creds = pickle.load(token_file)
+        creds = credential_pool.load_credentials(channel_id)
     except FileNotFoundError:
         print(f"⚠️ No token found for {channel_id}")
         return {"views_28": 0, "subs_28": 0, "uploads_28": 0}
 
-    youtube_analytics = build("youtubeAnalytics", "v2", credentials=creds)
+    youtube_analytics = credential_pool.service("youtubeAnalytics", "v2", credentials=creds)
 
     try:
         response = youtube_analytics.reports().query(
@@ -103,39 +95,12 @@ def get_analytics(channel_id, start_date, end_date):
 def get_uploads_in_range(channel_id, start_date, end_date, creds):
     """
     Counts the number of videos uploaded by a channel within a specified date range.
-    Uses playlistItems.list (1 unit/call) instead of search.list (100 units/call).
+    Answered from the local upload index (see upload_index.py); the uploads
+    playlist is only paged when the index isn't already current for this run.
     """
-    youtube = build("youtube", "v3", credentials=creds)
-    uploads_playlist_id = channel_id.replace("UC", "UU", 1)
-    upload_count = 0
-    next_page_token = None
-
-    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-    end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-
-    while True:
-        response = youtube.playlistItems().list(
-            part="contentDetails",
-            playlistId=uploads_playlist_id,
-            maxResults=50,
-            pageToken=next_page_token
-        ).execute()
-
-        for item in response.get("items", []):
-            published = item.get("contentDetails", {}).get("videoPublishedAt", "")
-            if published:
-                video_dt = datetime.fromisoformat(published.replace("Z", "+00:00")).replace(tzinfo=None)
-                if start_dt <= video_dt <= end_dt:
-                    upload_count += 1
-                elif video_dt < start_dt:
-                    # Playlist is reverse-chronological, so we can stop early
-                    return upload_count
-
-        next_page_token = response.get("nextPageToken")
-        if not next_page_token:
-            break
-
-    return upload_count
+    youtube = credential_pool.service("youtube", "v3", credentials=creds)
+    upload_index.refresh(youtube, channel_id, since=start_date)
+    return upload_index.count_uploads(channel_id, start_date, end_date)
 
 def find_existing_row(channel_name, date_str):
     """
@@ -202,42 +167,60 @@ def get_revenue_analytics(channel_id, start_date, end_date):
     Fetches estimated revenue and CPM for a given channel and date range
     using the YouTube Analytics API.
     Requires appropriate permissions for the linked Google account.
+    Skipped (None values, so the previous numbers are kept) for channels the registry
+    has learned are not monetized or lack the scope, and while the channel's circuit is open.
     """
+    if not channels.is_capable(channel_id, channels.REVENUE):
+        return {"estimated_revenue": None, "cpm": None}
+
+    creds = None  # Content-owner mode queries through the CMS token instead
     try:
-        # --- MODIFIED TOKEN PATH --- BEGIN
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        token_path = os.path.join(script_dir, "tokens", f"token_{channel_id}.pickle")
-        # --- MODIFIED TOKEN PATH --- END
-        with open(token_path, "rb") as token_file:
-            creds = pickle.load(token_file)
+        if not content_owner.ENABLED:
+            creds = credential_pool.load_credentials(channel_id)
     except FileNotFoundError:
         print(f"⚠️ No token found for {channel_id} for revenue analytics.")
         return {"estimated_revenue": 0, "cpm": 0}
 
-    youtube_analytics = build("youtubeAnalytics", "v2", credentials=creds)
-
     try:
-        response = youtube_analytics.reports().query(
-            ids=f"channel=={channel_id}",
-            startDate=start_date,
-            endDate=end_date,
-            metrics="estimatedRevenue,cpm", # Metrics for revenue and CPM
-            dimensions="day",
-            sort="day"
-        ).execute()
+        if content_owner.ENABLED:
+            rows = content_owner.channel_day_rows(channel_id, start_date, end_date, "estimatedRevenue,cpm",
+                                                  list(CHANNELS.values()))
+        else:
+            youtube_analytics = credential_pool.service("youtubeAnalytics", "v2", credentials=creds)
+            response = circuit_breaker.call(channel_id, circuit_breaker.REVENUE, lambda: youtube_analytics.reports().query(
+                ids=f"channel=={channel_id}",
+                startDate=start_date,
+                endDate=end_date,
+                metrics="estimatedRevenue,cpm", # Metrics for revenue and CPM
+                dimensions="day",
+                sort="day"
+            ).execute())
+            rows = response.get("rows", [])
 
-        rows = response.get("rows", [])
         estimated_revenue = sum(row[1] for row in rows) if rows else 0
         # Calculate simple average CPM if data exists, otherwise 0
         cpm = sum(row[2] for row in rows) / len(rows) if rows else 0
 
+        # No revenue over the trailing year means the channel isn't monetized — stop asking daily
+        window_days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days
+        is_trailing_year = window_days >= 364 and end_date == datetime.utcnow().date().isoformat()
+        if is_trailing_year and not estimated_revenue:
+            channels.record_outcome(channel_id, channels.REVENUE, False, f"no revenue {start_date}..{end_date}")
+        else:
+            channels.record_outcome(channel_id, channels.REVENUE, True)
+
         return {
             "estimated_revenue": estimated_revenue,
             "cpm": cpm
         }
 
+    except circuit_breaker.CircuitOpen:
+        # Skipped quietly: the breaker's summary reports the open circuit once
+        return {"estimated_revenue": None, "cpm": None}
     except Exception as e:
         print(f"⚠️ Failed to get revenue analytics for {channel_id}: {e}")
+        if channels.is_auth_error(e):
+            channels.record_outcome(channel_id, channels.REVENUE, False, e)
         return {"estimated_revenue": 0, "cpm": 0}
 
 def get_channel_icon(channel_id):
@@ -248,9 +231,10 @@ def get_channel_icon(channel_id):
     params = {
         "part": "snippet",
         "id": channel_id,
+        "fields": http_cache.FIELDS["channels.snippet"],
         "key": YOUTUBE_API_KEY
     }
-    res = requests.get(url, params=params).json()
+    res = http_cache.get_json("youtube.channels.list", url, params)
 
     try:
         # Prioritize high quality thumbnail if available, otherwise default
@@ -312,6 +296,9 @@ def upsert_notion_row(channel, stats, analytics, yearly, revenue_28, revenue_pre
         "CPM (2024)": {"number": revenue_yearly["cpm_2024"]}
     }
 
+    # Skipped metrics (None) are left out rather than written as 0
+    properties = {name: value for name, value in properties.items() if value != {"number": None}}
+
     # Add Channel Icon property if a URL is available
     if channel_icon_url:
         properties["Channel Icon"] = {
@@ -355,16 +342,27 @@ def fetch_analytics_for_range(creds, channel_id, start_date, end_date):
     """
     Helper function to fetch views and subscribers for a given date range.
     Used by get_advanced_analytics and get_yearly_analytics.
+    In content-owner mode the rows come from one network-wide report per date range.
     """
-    youtube_analytics = build("youtubeAnalytics", "v2", credentials=creds)
-    response = youtube_analytics.reports().query(
-        ids=f"channel=={channel_id}",
-        startDate=start_date,
-        endDate=end_date,
-        metrics="views,subscribersGained,subscribersLost",
-        dimensions="day",
-        sort="day"
-    ).execute()
+    if content_owner.ENABLED:
+        rows = content_owner.channel_day_rows(channel_id, start_date, end_date,
+                                              "views,subscribersGained,subscribersLost", list(CHANNELS.values()))
+        views = sum(row[1] for row in rows) if rows else 0
+        subs = sum(row[2] - row[3] for row in rows) if rows else 0
+        return views, subs
+
+    params = {
+        "ids": f"channel=={channel_id}",
+        "startDate": start_date,
+        "endDate": end_date,
+        "metrics": "views,subscribersGained,subscribersLost",
+        "dimensions": "day",
+        "sort": "day"
+    }
+    youtube_analytics = credential_pool.service("youtubeAnalytics", "v2", credentials=creds)
+    response = run_cache.cached("youtubeAnalytics.reports.query", params,
+                                lambda: circuit_breaker.call(channel_id, circuit_breaker.ANALYTICS,
+                                                             lambda: youtube_analytics.reports().query(**params).execute()))
 
     rows = response.get("rows", [])
     views = sum(row[1] for row in rows) if rows else 0
@@ -374,22 +372,21 @@ def fetch_analytics_for_range(creds, channel_id, start_date, end_date):
 def get_advanced_analytics(channel_id):
     """
     Fetches detailed analytics for 28-day, previous 28-day, and 365-day periods.
+    Returns None values (keep the previous numbers) when the channel is skipped:
+    Analytics known to fail for it, or its circuit open this run.
     """
+    skipped = dict.fromkeys(["views_28", "subs_28", "uploads_28", "views_prev_28", "subs_prev_28",
+                             "uploads_prev_28", "views_365", "subs_365"])
+    if not channels.is_capable(channel_id, channels.ANALYTICS):
+        return skipped
+
+    creds = None  # Content-owner mode queries through the CMS token instead
     try:
-        # --- MODIFIED TOKEN PATH --- BEGIN
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        token_path = os.path.join(script_dir, "tokens", f"token_{channel_id}.pickle")
-        # --- MODIFIED TOKEN PATH --- END
-        with open(token_path, "rb") as token_file:
-            creds = pickle.load(token_file)
+        if not content_owner.ENABLED:
+            creds = credential_pool.load_credentials(channel_id)
     except FileNotFoundError:
         print(f"⚠️ No token found for {channel_id}")
-        return {
-            "views_28": 0, "subs_28": 0,
-            "views_prev_28": 0, "subs_prev_28": 0,
-            "uploads_28": 0, "uploads_prev_28": 0,
-            "views_365": 0, "subs_365": 0
-        }
+        return skipped
 
     today = datetime.utcnow().date()
     start_28 = (today - timedelta(days=28)).isoformat()
@@ -398,28 +395,18 @@ def get_advanced_analytics(channel_id):
     start_365 = (today - timedelta(days=365)).isoformat()
     today_str = today.isoformat()
 
+    # Only these channel-level reports teach the registry about the channel's Analytics access
     try:
         views_28, subs_28 = fetch_analytics_for_range(creds, channel_id, start_28, today_str)
         views_prev_28, subs_prev_28 = fetch_analytics_for_range(creds, channel_id, start_prev_28, end_prev_28)
-
-        uploads_28 = get_uploads_in_range(channel_id, start_28, today_str, creds)
-        uploads_prev_28 = get_uploads_in_range(channel_id, start_prev_28, end_prev_28, creds)
-
         views_365, subs_365 = fetch_analytics_for_range(creds, channel_id, start_365, today_str)
-
-        return {
-            "views_28": views_28,
-            "subs_28": subs_28,
-            "uploads_28": uploads_28,
-            "views_prev_28": views_prev_28,
-            "subs_prev_28": subs_prev_28,
-            "uploads_prev_28": uploads_prev_28,
-            "views_365": views_365,
-            "subs_365": subs_365
-        }
-
+        channels.record_outcome(channel_id, channels.ANALYTICS, True)
+    except circuit_breaker.CircuitOpen:
+        return skipped
     except Exception as e:
         print(f"⚠️ Analytics fetch failed for {channel_id}: {e}")
+        if channels.is_auth_error(e):
+            channels.record_outcome(channel_id, channels.ANALYTICS, False, e)
         return {
             "views_28": 0, "subs_28": 0,
             "uploads_28": 0,
@@ -428,24 +415,42 @@ def get_advanced_analytics(channel_id):
             "views_365": 0, "subs_365": 0
         }
 
+    # Upload counts come from the Data API (playlist crawl); a failed refresh counts what is indexed
+    try:
+        youtube = credential_pool.service("youtube", "v3", credentials=creds) if creds else credential_pool.service("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+        upload_index.refresh(youtube, channel_id, since=start_prev_28)
+    except Exception as e:
+        print(f"⚠️ Upload index refresh failed for {channel_id}: {e}")
+    uploads_28 = upload_index.count_uploads(channel_id, start_28, today_str)
+    uploads_prev_28 = upload_index.count_uploads(channel_id, start_prev_28, end_prev_28)
+
+    return {
+        "views_28": views_28,
+        "subs_28": subs_28,
+        "uploads_28": uploads_28,
+        "views_prev_28": views_prev_28,
+        "subs_prev_28": subs_prev_28,
+        "uploads_prev_28": uploads_prev_28,
+        "views_365": views_365,
+        "subs_365": subs_365
+    }
+
 def get_yearly_analytics(channel_id):
     """
     Fetches yearly views and subscribers for 2022, 2023, and 2024.
+    Returns None values (keep the previous numbers) when the channel is skipped.
     """
+    skipped = dict.fromkeys(["views_2022", "subs_2022", "views_2023", "subs_2023", "views_2024", "subs_2024"])
+    if not channels.is_capable(channel_id, channels.ANALYTICS):
+        return skipped
+
+    creds = None  # Content-owner mode queries through the CMS token instead
     try:
-        # --- MODIFIED TOKEN PATH --- BEGIN
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        token_path = os.path.join(script_dir, "tokens", f"token_{channel_id}.pickle")
-        # --- MODIFIED TOKEN PATH --- END
-        with open(token_path, "rb") as token_file:
-            creds = pickle.load(token_file)
+        if not content_owner.ENABLED:
+            creds = credential_pool.load_credentials(channel_id)
     except FileNotFoundError:
         print(f"⚠️ No token found for {channel_id}")
-        return {
-            "views_2022": 0, "subs_2022": 0,
-            "views_2023": 0, "subs_2023": 0,
-            "views_2024": 0, "subs_2024": 0
-        }
+        return skipped
 
     def fetch_for_year(year):
         start = f"{year}-01-01"
@@ -466,8 +471,12 @@ def get_yearly_analytics(channel_id):
             "subs_2024": subs_2024
         }
 
+    except circuit_breaker.CircuitOpen:
+        return skipped
     except Exception as e:
         print(f"⚠️ Failed yearly analytics for {channel_id}: {e}")
+        if channels.is_auth_error(e):
+            channels.record_outcome(channel_id, channels.ANALYTICS, False, e)
         return {
             "views_2022": 0, "subs_2022": 0,
             "views_2023": 0, "subs_2023": 0,
@@ -477,14 +486,16 @@ def get_yearly_analytics(channel_id):
 def get_yearly_revenue_analytics(channel_id):
     """
     Fetches yearly estimated revenue and CPM for 2022, 2023, and 2024.
+    Returns None values (keep the previous numbers) when the channel is skipped.
     """
+    if not channels.is_capable(channel_id, channels.REVENUE):
+        return dict.fromkeys(["estimated_revenue_2022", "cpm_2022", "estimated_revenue_2023", "cpm_2023",
+                              "estimated_revenue_2024", "cpm_2024"])
+
+    creds = None  # Content-owner mode queries through the CMS token instead
     try:
-        # --- MODIFIED TOKEN PATH --- BEGIN
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        token_path = os.path.join(script_dir, "tokens", f"token_{channel_id}.pickle")
-        # --- MODIFIED TOKEN PATH --- END
-        with open(token_path, "rb") as token_file:
-            creds = pickle.load(token_file)
+        if not content_owner.ENABLED:
+            creds = credential_pool.load_credentials(channel_id)
     except FileNotFoundError:
         print(f"⚠️ No token found for {channel_id} for yearly revenue analytics.")
         return {
@@ -520,13 +531,48 @@ def get_yearly_revenue_analytics(channel_id):
             "estimated_revenue_2024": 0, "cpm_2024": 0
         }
 
+def load_published(path):
+    """{channel name: entry} from the published data.json (empty if there is none yet)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return {entry["name"]: entry for entry in json.load(f)}
+
+
+def keep_previous(entry, previous):
+    """Fills the entry's skipped (None) values from the channel's previously published entry, or 0."""
+    return {key: previous.get(key, 0) if value is None else value for key, value in entry.items()}
+
+
+def stamp_updated(export_data, previous_path, today):
+    """Sets each entry's "updated" date: carried over from the published file when its values didn't change."""
+    previous = load_published(previous_path)
+    for entry in export_data:
+        old = previous.get(entry["name"], {})
+        unchanged = {k: v for k, v in old.items() if k != "updated"} == entry
+        entry["updated"] = old["updated"] if unchanged and old.get("updated") else today
+
+
 # --- MAIN ---
-if __name__ == "__main__":
+def run_channel_snapshot(shard=None):
+    """
+    Fetches every channel's stats/analytics/revenue, upserts the Notion rows and writes public/data.json.
+    With a shard, only that shard's channels are processed and a partial file is written instead.
+    """
     # Get today's date in 'YYYY-MM-%d' format, adjusted for US/Eastern timezone
     today = datetime.now(pytz.timezone("US/Eastern")).strftime("%Y-%m-%d")
     export_data = []
+    published_path = os.path.join(DATA_DIR, "public", "data.json")
+    published = load_published(published_path)
+
+    if shard is not None:
+        print(f"🧩 Sharded run: {sharding.describe(shard)}")
+    for channel_name, channel_id in sharding.filter_channels(CHANNELS, shard).items():
+        if not channels.is_capable(channel_id, channels.ANALYTICS):
+            print(f"⏭️ {channel_name}: no usable Analytics token — skipping Analytics queries.")
+        elif not channels.is_capable(channel_id, channels.REVENUE):
+            print(f"⏭️ {channel_name}: known unmonetized or missing revenue scope — skipping revenue queries.")
 
-    for channel_name, channel_id in CHANNELS.items():
         # Fetch general channel statistics
         stats = get_channel_stats(channel_id)
         # Fetch advanced analytics (views, subs, uploads for various periods)
@@ -554,8 +600,8 @@ if __name__ == "__main__":
                           revenue_28_days, revenue_prev_28_days, revenue_365_days, yearly_revenue_analytics,
                           channel_icon_url, today)
 
-        # Build export data from the same fetch (no double-fetch)
-        export_data.append({
+        # Build export data from the same fetch (no double-fetch); skipped values keep the published ones
+        export_data.append(keep_previous({
             "name": channel_name,
             "icon": channel_icon_url,
             "views_28": analytics["views_28"],
@@ -576,7 +622,7 @@ if __name__ == "__main__":
             "cpm_2023": yearly_revenue_analytics["cpm_2023"],
             "revenue_2024": yearly_revenue_analytics["estimated_revenue_2024"],
             "cpm_2024": yearly_revenue_analytics["cpm_2024"]
-        })
+        }, published.get(channel_name, {})))
 
         print(f"\n--- Processing: {channel_name} ---")
         print(f"Stats: {stats}")
@@ -589,9 +635,18 @@ if __name__ == "__main__":
         print(f"Channel Icon URL: {channel_icon_url}")
 
     print("\n✅ Finished processing all channels.")
+    circuit_breaker.summary()
+    channels.save_capabilities()
+    upload_index.save()
 
     # Write data.json for widgets (reuses data from above — no double-fetch)
-    os.makedirs("public", exist_ok=True)
-    with open("public/data.json", "w") as f:
+    output_path = published_path if shard is None else sharding.partial_path("data", shard)
+    stamp_updated(export_data, published_path, today)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
         json.dump(export_data, f, indent=2)
-    print(f"📄 Exported data.json for {len(export_data)} channels.")
+    print(f"📄 Exported {output_path} for {len(export_data)} channels.")
+
+
+if __name__ == "__main__":
+    run_channel_snapshot(shard=sharding.parse_shard(sys.argv))
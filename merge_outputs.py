@@ -0,0 +1,111 @@
+"""
+Merges per-shard partial outputs (see sharding.py) into the published files.
+
+  public/partials/data.<i>-of-<N>.json        -> public/data.json
+  public/partials/daily-views.<i>-of-<N>.json -> public/daily-views.json (+ public/rollups.json)
+
+The result only depends on the partials' contents, not on which shard finished
+first: data.json entries are ordered by the channel registry, and daily-views
+partials are folded into the existing file channel by channel, then the touched
+days' totals are recomputed. Channels missing from every partial keep their previous values.
+
+Usage:
+  python merge_outputs.py          # Merge and keep the partials
+  python merge_outputs.py --clean  # Merge, then delete the partials
+"""
+
+import os
+import re
+import sys
+import json
+from datetime import datetime
+
+from channels import REGISTRY
+import daily_views
+import sharding
+import rollups
+from networks import DATA_DIR
+
+DATA_PATH = os.path.join(DATA_DIR, "public", "data.json")
+
+PARTIAL_NAME = re.compile(r"^(?P<kind>[\w-]+)\.(?P<index>\d+)-of-(?P<count>\d+)\.json$")
+
+
+def find_partials(kind, partials_dir=sharding.PARTIALS_DIR):
+    """Returns the partial paths for one output kind, in shard order. Warns about missing shards."""
+    found = {}
+    for name in os.listdir(partials_dir) if os.path.isdir(partials_dir) else []:
+        match = PARTIAL_NAME.match(name)
+        if match and match["kind"] == kind:
+            found[(int(match["count"]), int(match["index"]))] = os.path.join(partials_dir, name)
+    counts = {count for count, _ in found}
+    if len(counts) > 1:
+        print(f"⚠️ {kind}: partials from different shard counts {sorted(counts)} — merging all of them.")
+    for count in counts:
+        missing = [i for i in range(count) if (count, i) not in found]
+        if missing:
+            print(f"⚠️ {kind}: missing shard(s) {missing} of {count} — their channels keep previous values.")
+    return [found[key] for key in sorted(found)]
+
+
+def _load(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def merge_data(partial_paths, existing):
+    """Channel entries from the partials override existing ones; output follows registry order."""
+    by_name = {entry["name"]: entry for entry in existing}
+    for path in partial_paths:
+        for entry in _load(path, []):
+            by_name[entry["name"]] = entry
+    order = {channel["name"]: i for i, channel in enumerate(REGISTRY)}
+    return sorted(by_name.values(), key=lambda entry: (order.get(entry["name"], len(order)), entry["name"]))
+
+
+def merge_daily_views(partial_paths, existing):
+    """Folds each partial's channels and per-day values into the existing data, then recomputes the touched totals."""
+    data = existing
+    last_updated = data.get("last_updated")
+    touched = set()
+    for path in partial_paths:
+        partial = _load(path, {})
+        data["channels"].update(partial.get("channels", {}))
+        data["daily"] = daily_views.merge_days(data["daily"], partial.get("daily", {}))
+        touched.update(partial.get("daily", {}))
+        last_updated = max(filter(None, [last_updated, partial.get("last_updated")]), default=None)
+    data["channels"] = dict(sorted(data["channels"].items()))
+    return daily_views.summarize(data, last_updated or datetime.utcnow().date().isoformat(), touched_dates=touched)
+
+
+def merge_outputs(clean=False):
+    written = []
+
+    data_partials = find_partials("data")
+    if data_partials:
+        merged = merge_data(data_partials, _load(DATA_PATH, []))
+        with open(DATA_PATH, "w") as f:
+            json.dump(merged, f, indent=2)
+        written.append(DATA_PATH)
+        print(f"📄 Merged {len(data_partials)} partial(s) into {DATA_PATH} ({len(merged)} channels)")
+
+    views_partials = find_partials("daily-views")
+    if views_partials:
+        merged = merge_daily_views(views_partials, daily_views.load_existing_data())
+        daily_views.write_atomic(daily_views.OUTPUT_PATH, merged)
+        rollups.write_rollups(merged)
+        written += [daily_views.OUTPUT_PATH, rollups.OUTPUT_PATH]
+        print(f"📄 Merged {len(views_partials)} partial(s) into {daily_views.OUTPUT_PATH} ({len(merged['channels'])} channels)")
+
+    if not written:
+        print("🏁 No partial outputs found.")
+    if clean:
+        for path in data_partials + views_partials:
+            os.remove(path)
+    return written
+
+
+if __name__ == "__main__":
+    merge_outputs(clean="--clean" in sys.argv)
@@ -0,0 +1,244 @@
+"""
+Small HTTP service for dashboards and widgets, serving the published metrics from memory.
+
+Instead of every widget load re-downloading public/data.json, pages can ask this
+server for exactly the slice they render and revalidate it cheaply:
+
+  GET /data.json                          Channel snapshot (same as public/data.json)
+  GET /data.json?channel=A,B              ...only these channels (by name or channel ID)
+  GET /daily-views.json                   Full daily-views file
+  GET /daily?channel=A,B&from=D&to=D      Per-day views for some channels/dates (YYYY-MM-DD, inclusive)
+  GET /rollups.json                       Rolling-window summaries (see rollups.py)
+  GET /healthz                            Liveness + when the files were last loaded
+
+Every response carries a strong ETag (If-None-Match -> 304), Cache-Control and
+Vary: Accept-Encoding, and is gzip- or brotli-compressed when the client accepts it
+(brotli needs the optional `brotli` package). Encoded bodies are cached per
+(path, query, encoding) until the files on disk change; files are re-read when
+their mtime moves, so the pipeline can keep publishing while the server runs.
+
+Usage:
+  python metrics_server.py                 # Listen on 127.0.0.1:8787
+  python metrics_server.py --port 9000 --host 0.0.0.0
+"""
+
+import os
+import sys
+import json
+import gzip
+import bisect
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from channels import CHANNELS
+from networks import DATA_DIR
+
+PUBLIC_DIR = os.path.join(DATA_DIR, "public")
+FILES = {"data": "data.json", "daily": "daily-views.json", "rollups": "rollups.json"}
+
+HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+PORT = int(os.getenv("METRICS_PORT", "8787"))
+CACHE_CONTROL = os.getenv("METRICS_CACHE_CONTROL", "public, max-age=300, must-revalidate")
+MIN_COMPRESS_BYTES = 1024
+MAX_CACHED_RESPONSES = 512
+
+_lock = threading.Lock()
+_state = {"mtimes": {}, "docs": {}, "dates": [], "loaded_at": None}
+_responses = {}  # (path, query, accepted encoding) -> (etag, body, encoding used)
+
+
+def _reload_if_changed():
+    """Re-reads any published file whose mtime changed; drops cached responses when something did."""
+    changed = False
+    for key, name in FILES.items():
+        path = os.path.join(PUBLIC_DIR, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if _state["mtimes"].get(key, -1) == mtime:
+            continue
+        doc = None
+        if mtime is not None:
+            try:
+                with open(path, "r") as f:
+                    doc = json.load(f)
+            except ValueError as e:
+                print(f"⚠️ Could not parse {path}, keeping the previous copy: {e}")
+                continue
+        _state["docs"][key] = doc
+        _state["mtimes"][key] = mtime
+        if key == "daily":
+            _state["dates"] = sorted((doc or {}).get("daily", {}))
+        changed = True
+    if changed:
+        _state["loaded_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        _responses.clear()
+
+
+def _channel_filter(query):
+    """?channel=A,B (names or channel IDs, repeatable) -> set of channel names, or None for all."""
+    names_by_id = {channel_id: name for name, channel_id in CHANNELS.items()}
+    names = [c.strip() for value in query.get("channel", []) for c in value.split(",")]
+    return {names_by_id.get(name, name) for name in names if name} or None
+
+
+def _data_view(query):
+    data = _state["docs"].get("data")
+    if data is None:
+        return None
+    wanted = _channel_filter(query)
+    if wanted is None:
+        return data
+    return [entry for entry in data if entry.get("name") in wanted]
+
+
+def _daily_view(query):
+    """Slice of daily-views: the requested dates (bisected over the sorted index) and channels."""
+    doc = _state["docs"].get("daily")
+    if doc is None:
+        return None
+    dates = _state["dates"]
+    start = bisect.bisect_left(dates, query.get("from", [""])[0]) if "from" in query else 0
+    end = bisect.bisect_right(dates, query.get("to", [""])[0]) if "to" in query else len(dates)
+
+    channels = doc.get("channels", {})
+    wanted = _channel_filter(query)
+    if wanted is not None:
+        channels = {name: info for name, info in channels.items() if name in wanted}
+
+    daily = {}
+    for date_str in dates[start:end]:
+        values = doc["daily"][date_str]
+        if wanted is None:
+            daily[date_str] = values
+        else:
+            row = {name: views for name, views in values.items() if name in wanted}
+            row["_total"] = sum(row.values())
+            daily[date_str] = row
+    return {
+        "last_updated": doc.get("last_updated"),
+        "channels": channels,
+        "from": dates[start] if start < end else None,
+        "to": dates[end - 1] if start < end else None,
+        "daily": daily,
+    }
+
+
+ROUTES = {
+    "/data.json": _data_view,
+    "/daily-views.json": lambda query: _state["docs"].get("daily"),
+    "/daily": _daily_view,
+    "/rollups.json": lambda query: _state["docs"].get("rollups"),
+    "/healthz": lambda query: {"status": "ok", "loaded_at": _state["loaded_at"],
+                               "files": {key: doc is not None for key, doc in _state["docs"].items()}},
+}
+
+
+def _negotiate(accept_encoding):
+    accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def render(path, raw_query, accept_encoding):
+    """Returns (status, etag, encoding, body) for a request; bodies are cached until the files change."""
+    encoding = _negotiate(accept_encoding)
+    query = parse_qs(raw_query)
+    with _lock:
+        _reload_if_changed()
+        key = (path, raw_query, encoding)
+        if key in _responses:
+            etag, body, encoding = _responses[key]
+            return 200, etag, encoding, body
+        view = ROUTES.get(path)
+        if view is None:
+            return 404, None, "identity", b'{"error": "not found"}'
+        document = view(query)
+        if document is None:
+            return 503, None, "identity", b'{"error": "not published yet"}'
+
+        body = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        # Strong validator of the uncompressed representation, suffixed per encoding
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        if len(body) < MIN_COMPRESS_BYTES:
+            encoding = "identity"
+        elif encoding == "br":
+            body = brotli.compress(body, quality=5)
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+        etag = f'"{etag}"' if encoding == "identity" else f'"{etag}-{encoding}"'
+
+        if len(_responses) >= MAX_CACHED_RESPONSES:
+            _responses.pop(next(iter(_responses)))
+        _responses[key] = (etag, body, encoding)
+        return 200, etag, encoding, body
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "metrics-server"
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        url = urlsplit(self.path)
+        status, etag, encoding, body = render(url.path, url.query, self.headers.get("Accept-Encoding"))
+        if status == 200 and etag and etag in [t.strip() for t in (self.headers.get("If-None-Match") or "").split(",")]:
+            self.send_response(304)
+            self._common_headers(etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self._common_headers(etag)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _common_headers(self, etag):
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", CACHE_CONTROL)
+        else:
+            self.send_header("Cache-Control", "no-store")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")  # Widgets are embedded from other origins
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the daemon's log
+
+
+def serve(host=HOST, port=PORT):
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"📡 Serving metrics from {PUBLIC_DIR} on http://{host}:{port} (brotli {'on' if brotli else 'off'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    def option(flag, default):
+        return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+    serve(option("--host", HOST), int(option("--port", PORT)))
@@ -0,0 +1,208 @@
+"""
+Local SQLite store for per-video daily metrics.
+
+Filled by reporting_ingest.py from YouTube Reporting API bulk files. Each
+report covers one day for one source (a channel, or the content owner), so
+ingesting a report replaces that source's rows for that day — a reissued
+report simply supersedes the earlier one.
+
+video_series.py keeps a separate, smaller table with the daily series of each
+channel's top videos from the Analytics API.
+
+The database lives at .cache/metrics.sqlite (override with METRICS_DB); the
+workflows keep it between runs with actions/cache.
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from networks import DATA_DIR
+
+DB_PATH = os.getenv("METRICS_DB") or os.path.join(DATA_DIR, ".cache", "metrics.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_daily (
+    source TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    watch_minutes REAL NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    shares INTEGER NOT NULL DEFAULT 0,
+    subs_gained INTEGER NOT NULL DEFAULT 0,
+    subs_lost INTEGER NOT NULL DEFAULT 0,
+    view_pct_weighted REAL NOT NULL DEFAULT 0,  -- sum(average_view_duration_percentage * views)
+    PRIMARY KEY (video_id, day)
+);
+CREATE INDEX IF NOT EXISTS video_daily_source_day ON video_daily (source, day);
+CREATE INDEX IF NOT EXISTS video_daily_channel_day ON video_daily (channel_id, day);
+
+CREATE TABLE IF NOT EXISTS traffic_daily (
+    source TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    traffic_source TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    watch_minutes REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (video_id, day, traffic_source)
+);
+CREATE INDEX IF NOT EXISTS traffic_daily_source_day ON traffic_daily (source, day);
+
+-- Daily series for each channel's top videos (video_series.py); WITHOUT ROWID keeps it to one B-tree
+CREATE TABLE IF NOT EXISTS video_series (
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    watch_minutes REAL NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    subs_gained INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (channel_id, video_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS reporting_jobs (
+    source TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    PRIMARY KEY (source, report_type)
+);
+
+CREATE TABLE IF NOT EXISTS ingested_reports (
+    report_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    day TEXT,
+    create_time TEXT,
+    row_count INTEGER,
+    ingested_at TEXT
+);
+"""
+
+SERIES_COLUMNS = ["views", "watch_minutes", "likes", "subs_gained"]
+VIDEO_COLUMNS = ["views", "watch_minutes", "likes", "comments", "shares", "subs_gained", "subs_lost", "view_pct_weighted"]
+
+
+def connect(path=DB_PATH):
+    """Opens (and if needed creates) the store. One connection per thread."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def replace_video_day(conn, source, day, rows):
+    """Replaces a source's video_daily rows for one day. rows: {(channel_id, video_id): {column: value}}."""
+    conn.execute("DELETE FROM video_daily WHERE source = ? AND day = ?", (source, day))
+    conn.executemany(
+        f"INSERT OR REPLACE INTO video_daily (source, channel_id, video_id, day, {', '.join(VIDEO_COLUMNS)}) "
+        f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in VIDEO_COLUMNS)})",
+        [(source, channel_id, video_id, day, *(values.get(c, 0) for c in VIDEO_COLUMNS))
+         for (channel_id, video_id), values in rows.items()],
+    )
+
+
+def replace_traffic_day(conn, source, day, rows):
+    """Replaces a source's traffic_daily rows for one day. rows: {(channel_id, video_id, traffic_source): {views, watch_minutes}}."""
+    conn.execute("DELETE FROM traffic_daily WHERE source = ? AND day = ?", (source, day))
+    conn.executemany(
+        "INSERT OR REPLACE INTO traffic_daily (source, channel_id, video_id, day, traffic_source, views, watch_minutes) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(source, channel_id, video_id, day, traffic, values.get("views", 0), values.get("watch_minutes", 0))
+         for (channel_id, video_id, traffic), values in rows.items()],
+    )
+
+
+def upsert_series(conn, channel_id, rows):
+    """Writes video_series rows; rows: [(video_id, day, views, watch_minutes, likes, subs_gained)]. Re-fetched days overwrite."""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO video_series (channel_id, video_id, day, {', '.join(SERIES_COLUMNS)}) "
+        f"VALUES (?, ?, ?, {', '.join('?' for _ in SERIES_COLUMNS)})",
+        [(channel_id, *row) for row in rows],
+    )
+
+
+def prune_series(conn, before_day):
+    """Drops video_series days older than before_day (YYYY-MM-DD)."""
+    conn.execute("DELETE FROM video_series WHERE day < ?", (before_day,))
+
+
+def series_for(conn, channel_id, video_ids, since_day):
+    """Stored days since since_day per video: {video_id: [(day, views, watch_minutes, likes, subs_gained)]}, by day."""
+    series = {video_id: [] for video_id in video_ids}
+    if not series:
+        return series
+    rows = conn.execute(
+        f"SELECT video_id, day, {', '.join(SERIES_COLUMNS)} FROM video_series "
+        f"WHERE channel_id = ? AND day >= ? AND video_id IN ({', '.join('?' for _ in series)}) ORDER BY day",
+        (channel_id, since_day, *series),
+    ).fetchall()
+    for video_id, *values in rows:
+        series[video_id].append(tuple(values))
+    return series
+
+
+def get_job(conn, source, report_type):
+    row = conn.execute("SELECT job_id FROM reporting_jobs WHERE source = ? AND report_type = ?",
+                       (source, report_type)).fetchone()
+    return row[0] if row else None
+
+
+def save_job(conn, source, report_type, job_id):
+    conn.execute("INSERT OR REPLACE INTO reporting_jobs (source, report_type, job_id) VALUES (?, ?, ?)",
+                 (source, report_type, job_id))
+    conn.commit()
+
+
+def is_ingested(conn, report_id):
+    return conn.execute("SELECT 1 FROM ingested_reports WHERE report_id = ?", (report_id,)).fetchone() is not None
+
+
+def mark_ingested(conn, report, job_id, source, report_type, day, row_count):
+    conn.execute(
+        "INSERT OR REPLACE INTO ingested_reports (report_id, job_id, source, report_type, day, create_time, row_count, ingested_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (report["id"], job_id, source, report_type, day, report.get("createTime"), row_count,
+         datetime.now(timezone.utc).isoformat(timespec="seconds")),
+    )
+
+
+def coverage_start(conn, channel_id):
+    """Earliest day with stored data for a channel, or None."""
+    row = conn.execute("SELECT MIN(day) FROM video_daily WHERE channel_id = ?", (channel_id,)).fetchone()
+    return row[0] if row else None
+
+
+def video_totals(conn, video_ids):
+    """
+    Sums every stored day per video, returned under the Analytics API metric names
+    analytics_updater writes to Notion. Videos without stored rows are left out.
+    """
+    totals = {}
+    video_ids = list(video_ids)
+    for i in range(0, len(video_ids), 500):  # Stay under SQLite's host-parameter limit
+        chunk = video_ids[i:i + 500]
+        rows = conn.execute(
+            f"SELECT video_id, SUM(views), SUM(watch_minutes), SUM(likes), SUM(comments), SUM(shares), "
+            f"SUM(subs_gained), SUM(subs_lost), SUM(view_pct_weighted) "
+            f"FROM video_daily WHERE video_id IN ({', '.join('?' for _ in chunk)}) GROUP BY video_id",
+            chunk,
+        ).fetchall()
+        for video_id, views, minutes, likes, comments, shares, gained, lost, pct_weighted in rows:
+            totals[video_id] = {
+                "views": views,
+                "estimatedMinutesWatched": minutes,
+                "averageViewDuration": round(minutes * 60 / views) if views else 0,
+                "averageViewPercentage": round(pct_weighted / views, 2) if views else 0,
+                "likes": likes,
+                "comments": comments,
+                "shares": shares,
+                "subscribersGained": gained,
+                "subscribersLost": lost,
+            }
+    return totals
@@ -0,0 +1,244 @@
+"""
+Several client networks from one deployment, each fully isolated.
+
+A network is one channel registry plus everything that belongs to it: its
+tokens, Notion databases, YouTube API key (and so its own Cloud project
+quota), published files, state and caches. networks.json lists them:
+
+  {"networks": [
+    {"name": "acme",
+     "dir": "networks/acme",                  # channels.json, tokens/, public/, state/, .cache/
+     "env": {"NOTION_TOKEN": "ACME_NOTION_TOKEN",          # variable -> where its value is in our env
+             "NOTION_DATABASE_ID": "ACME_NOTION_DATABASE_ID",
+             "NOTION_VIDEO_DB_ID": "ACME_NOTION_VIDEO_DB_ID",
+             "YOUTUBE_API_KEY": "ACME_YOUTUBE_API_KEY"},
+     "settings": {"YOUTUBE_CONTENT_OWNER_ID": ""},       # Literal, non-secret values
+     "workers": 2,                                        # Optional, see below
+     "budget": 20000}                                     # Optional YouTube API calls per run
+  ]}
+
+Without networks.json there is one network, "default", rooted at the repository
+(the original single-network layout, configured by the plain env vars).
+
+Every script resolves its data paths under DATA_DIR (NETWORK_DIR, or the
+repository), so the scripts themselves don't change per network. The
+supervisor below runs each network's pipeline.py in child processes with only
+that network's configuration in their environment. The scripts keep
+per-process state at module level (credential pool, run/ETag caches, Notion
+WAL, learned capabilities), so separate processes are what keep one network's
+state and secrets away from another's.
+
+Scheduling is round-robin. Each network's pipeline is split into task groups
+(pipeline.task_groups), and each group runs as one child process. At most
+--parallel groups run at once. Whenever a slot frees up, it goes to the next
+network in turn that has a group ready, so a large network doesn't hold every
+slot until it finishes. A network's groups run one at a time, in dependency
+order, and share one run cache (RUN_CACHE_ID). Each running group gets an equal
+share of TOTAL_WORKERS pipeline threads unless the network sets its own
+"workers". Output lines are prefixed with the network name.
+
+Quota: a network's own YOUTUBE_API_KEY only separates key-based Data API calls.
+OAuth and Analytics calls are charged to the client_secrets project, which all
+networks share. A network's "budget" caps the YouTube API calls its run may make
+(see call_budget.py). Each group gets what the earlier ones left. Once it's
+spent, calls fail like quotaExceeded and the network's remaining groups are
+skipped.
+
+Usage:
+  python networks.py list
+  python networks.py run                          # Every network's full pipeline
+  python networks.py run --networks acme,default --parallel 2
+  python networks.py run -- --only daily_views    # Arguments after -- go to pipeline.py
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import call_budget
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_PATH = os.getenv("NETWORKS_CONFIG") or os.path.join(SCRIPT_DIR, "networks.json")
+
+# Root of the current network's data (set for each child process by the supervisor)
+DATA_DIR = os.path.realpath(os.getenv("NETWORK_DIR") or SCRIPT_DIR)
+
+# Per-network configuration; never inherited from the supervisor's own environment
+NETWORK_VARS = [
+    "NOTION_TOKEN", "NOTION_DATABASE_ID", "NOTION_VIDEO_DB_ID", "YOUTUBE_API_KEY",
+    "YOUTUBE_CONTENT_OWNER_ID", "METRICS_DB", "NOTION_WAL_PATH", "YOUTUBE_CALL_BUDGET",
+]
+
+MAX_PARALLEL = int(os.getenv("NETWORK_PARALLEL", "2"))
+TOTAL_WORKERS = int(os.getenv("NETWORK_TOTAL_WORKERS", "8"))
+
+# One run-cache scope per supervisor run, so a network's groups reuse each other's responses
+RUN_CACHE_ID = (os.getenv("RUN_CACHE_ID") or os.getenv("GITHUB_RUN_ID")
+                or f"networks-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}")
+
+_print_lock = threading.Lock()
+
+
+def load_networks(path=CONFIG_PATH):
+    """Network entries from networks.json, or the implicit single "default" network."""
+    if not os.path.exists(path):
+        return [{"name": "default", "dir": SCRIPT_DIR, "env": {name: name for name in NETWORK_VARS}}]
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)["networks"]
+    names = [entry["name"] for entry in entries]
+    if len(set(names)) != len(names):
+        raise SystemExit(f"Duplicate network names in {path}: {names}")
+    for entry in entries:
+        entry["dir"] = os.path.join(SCRIPT_DIR, entry.get("dir", os.path.join("networks", entry["name"])))
+    return entries
+
+
+def child_env(network):
+    """The supervisor's environment minus every network's config, plus this network's."""
+    # Unmapped ones are set empty, so a stray .env (load_dotenv doesn't override) can't fill them in
+    env = {key: value for key, value in os.environ.items() if key not in NETWORK_VARS}
+    env.update(dict.fromkeys(NETWORK_VARS, ""))
+    for name, source in network.get("env", {}).items():
+        if os.getenv(source) is not None:
+            env[name] = os.environ[source]
+    env.update({name: str(value) for name, value in network.get("settings", {}).items()})
+    env.update({"NETWORK": network["name"], "NETWORK_DIR": network["dir"], "PYTHONUNBUFFERED": "1",
+                "RUN_CACHE_ID": RUN_CACHE_ID})
+    return env
+
+
+def run_group(network, group, pipeline_args, workers, budget):
+    """Runs one task group of a network's pipeline, streaming its output. Returns (exit code, seconds, calls spent)."""
+    name = network["name"]
+    started = time.monotonic()
+    command = [sys.executable, os.path.join(SCRIPT_DIR, "pipeline.py"), "--only", ",".join(group),
+               "--workers", str(network.get("workers", workers)), *pipeline_args]
+    env = child_env(network)
+    if budget is not None:
+        env["YOUTUBE_CALL_BUDGET"] = str(budget)
+    with _print_lock:
+        print(f"▶️ [{name}] {', '.join(group)} started in {network['dir']}")
+    spent = 0
+    process = subprocess.Popen(command, cwd=network["dir"], env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        spent = call_budget.parse_report(line) or spent
+        with _print_lock:
+            print(f"[{name}] {line}", end="")
+    code = process.wait()
+    elapsed = time.monotonic() - started
+    with _print_lock:
+        print(f"{'✅' if code == 0 else '❌'} [{name}] {', '.join(group)} exited {code} in {elapsed:.1f}s")
+    return code, elapsed, spent
+
+
+def run_networks(networks, pipeline_args=(), parallel=MAX_PARALLEL):
+    """
+    Runs every network's pipeline, one task group per child process, at most
+    `parallel` at once. Slots are handed out round-robin. Returns
+    {name: (exit code, seconds)}, where the exit code is the worst of its groups.
+    """
+    import pipeline
+
+    pipeline_args = list(pipeline_args)
+    groups = pipeline.task_groups(pipeline.select_tasks(pipeline_args))
+    # --only/--skip were resolved into the groups; --workers is set per network
+    for flag in ("--only", "--skip", "--workers"):
+        if flag in pipeline_args:
+            del pipeline_args[pipeline_args.index(flag):pipeline_args.index(flag) + 2]
+
+    parallel = max(1, min(parallel, len(networks)))
+    workers = max(1, TOTAL_WORKERS // parallel)
+    state = {
+        network["name"]: {"network": network, "groups": list(groups), "running": False,
+                          "code": 0, "seconds": 0.0, "spent": 0}
+        for network in networks
+    }
+    for name, network_state in state.items():
+        if not os.path.exists(os.path.join(network_state["network"]["dir"], "channels.json")):
+            print(f"❌ [{name}] no channels.json in {network_state['network']['dir']}")
+            network_state.update(groups=[], code=1)
+
+    turn = deque(state)
+    running = {}
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        while True:
+            # Each free slot goes to the next network in turn that has a group ready
+            for _ in range(len(turn)):
+                if len(running) >= parallel:
+                    break
+                name = turn[0]
+                turn.rotate(-1)
+                network_state = state[name]
+                if network_state["running"] or not network_state["groups"]:
+                    continue
+                budget = network_state["network"].get("budget")
+                remaining = None if budget is None else budget - network_state["spent"]
+                if remaining is not None and remaining <= 0:
+                    print(f"💸 [{name}] call budget of {budget} spent; skipping {len(network_state['groups'])} remaining group(s)")
+                    network_state["groups"] = []
+                    continue
+                group = network_state["groups"].pop(0)
+                network_state["running"] = True
+                running[pool.submit(run_group, network_state["network"], group, pipeline_args, workers, remaining)] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                network_state = state[running.pop(future)]
+                code, elapsed, spent = future.result()
+                network_state["running"] = False
+                network_state["code"] = max(network_state["code"], code)
+                network_state["seconds"] += elapsed
+                network_state["spent"] += spent
+
+    for name, network_state in state.items():
+        budget = network_state["network"].get("budget")
+        if budget is not None:
+            print(f"📟 [{name}] {network_state['spent']} of {budget} YouTube API call(s) spent")
+    return {name: (network_state["code"], network_state["seconds"]) for name, network_state in state.items()}
+
+
+def main(argv):
+    pipeline_args = argv[argv.index("--") + 1:] if "--" in argv else []
+    argv = argv[:argv.index("--")] if "--" in argv else argv
+
+    def option(flag):
+        return argv[argv.index(flag) + 1] if flag in argv else None
+
+    command = argv[0] if argv else "run"
+    networks = load_networks()
+    if command == "list":
+        for network in networks:
+            print(f"{network['name']}: {network['dir']}")
+        return 0
+    if command != "run":
+        raise SystemExit(f"Unknown command {command!r}; use run or list")
+
+    only = option("--networks")
+    if only:
+        unknown = set(only.split(",")) - {network["name"] for network in networks}
+        if unknown:
+            raise SystemExit(f"Unknown network(s): {', '.join(sorted(unknown))}")
+        networks = [network for network in networks if network["name"] in only.split(",")]
+    parallel = int(option("--parallel") or MAX_PARALLEL)
+    try:
+        import pipeline
+        pipeline.select_tasks(pipeline_args)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    results = run_networks(networks, pipeline_args, parallel)
+    print("\n🏁 Networks:")
+    for name, (code, elapsed) in results.items():
+        print(f"  {'✅' if code == 0 else '❌'} {name}: exit {code} ({elapsed:.1f}s)")
+    return 0 if all(code == 0 for code, _ in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,130 @@
+"""
+Rate-limited and partitioned reads of Notion databases.
+
+Notion query pagination is cursor-based, so one query can only be walked
+page after page. scan_partitions() splits a database read into independent
+filtered queries (e.g. one per Channel ID), walks them concurrently and merges
+their results into one stream. If any partition fails, the scan raises
+IncompleteScan once the others are done, so callers never mistake a partial read
+for the whole database. Every request goes through NOTION_LIMITER, which
+keeps the whole process under Notion's ~3 requests/second average.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class IncompleteScan(Exception):
+    """Raised by scan_partitions() when a partition's query failed (its rows are missing from the stream)."""
+
+
+# Shared by every Notion caller in the process
+NOTION_LIMITER = RateLimiter(rate=3, burst=3)
+
+
+def notion_request(method, url, limiter=NOTION_LIMITER, **kwargs):
+    """requests.request() under the rate limiter, retrying 429/5xx responses with backoff."""
+    for attempt in range(MAX_RETRIES):
+        limiter.acquire()
+        response = requests.request(method, url, **kwargs)
+        if response.status_code != 429 and response.status_code < 500:
+            return response
+        retry_after = response.headers.get("Retry-After")
+        time.sleep(float(retry_after) if retry_after else 2 ** attempt)
+    return response
+
+
+def query_pages(url, headers, payload, params=None, limiter=NOTION_LIMITER):
+    """Yields every result of one database query, following next_cursor. Raises on HTTP errors."""
+    payload = dict(payload)
+    while True:
+        response = notion_request("POST", url, limiter=limiter, headers=headers, params=params, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        yield from data.get("results", [])
+        if not data.get("next_cursor"):
+            return
+        payload["start_cursor"] = data["next_cursor"]
+
+
+def scan_partitions(url, headers, filters, payload=None, params=None, max_workers=MAX_WORKERS):
+    """
+    Runs one query per filter concurrently and yields their results as one merged stream.
+    Order across partitions is not preserved. A failing partition is reported, and
+    IncompleteScan is raised after the other partitions' results.
+    """
+    results = queue.Queue(maxsize=1000)
+    stop = threading.Event()  # Set when the consumer stops early, so workers don't block forever
+    done = object()
+    failures = []  # (partition filter, error)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def walk(partition_filter):
+        partition_payload = dict(payload or {})
+        if partition_filter:
+            partition_payload["filter"] = partition_filter
+        try:
+            for result in query_pages(url, headers, partition_payload, params=params):
+                if not put(result):
+                    return
+        except Exception as e:
+            print(f"❌ Notion partition query failed ({partition_filter}): {e}")
+            failures.append((partition_filter, e))
+        finally:
+            put(done)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    for partition_filter in filters:
+        pool.submit(walk, partition_filter)
+    pool.shutdown(wait=False)
+
+    remaining = len(filters)
+    try:
+        while remaining:
+            item = results.get()
+            if item is done:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        stop.set()
+    if failures:
+        raise IncompleteScan(f"{len(failures)} of {len(filters)} partition(s) failed, first: {failures[0][1]}")
@@ -0,0 +1,232 @@
+"""
+Write-ahead log for Notion page creates and updates.
+
+Every intended Notion write is first appended (and fsynced) to
+.cache/notion_wal.jsonl under an idempotency key, then applied by background
+workers. If a run dies partway — quota, timeout, crash — the YouTube data it
+already fetched is still in the log: the next run calls replay() and only the
+remaining Notion writes are sent, without touching YouTube again.
+
+Keys make writes idempotent: submitting a key that is already pending or was
+applied recently is a no-op, and callers can ask has(key) to skip the fetch
+that would produce it (e.g. "analytics:<video_id>:<date>"). Delivery is
+at-least-once: a crash between Notion accepting a write and its "applied"
+record being logged means that write is sent again on replay.
+
+Log records (one JSON object per line):
+  {"op": "intent", "key", "method", "url", "payload", "ts"}
+  {"op": "applied" | "failed", "key", "ts"[, "status"]}
+Applied and permanently failed keys are kept for RETENTION_DAYS, then
+compacted away by drain().
+"""
+
+import os
+import json
+import hashlib
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+
+import log
+import notion_scan
+from networks import DATA_DIR
+
+WAL_PATH = os.getenv("NOTION_WAL_PATH") or os.path.join(DATA_DIR, ".cache", "notion_wal.jsonl")
+NOTION_VERSION = "2026-03-11"
+APPLY_WORKERS = 3
+RETENTION_DAYS = 2
+
+_lock = threading.Lock()
+_pending = None   # key -> intent record
+_done = None      # key -> (op, ts)
+_queue = queue.Queue()
+_queued = set()   # keys currently in _queue or being applied
+_workers = []
+_file = None
+_counts = {"applied": 0, "rejected": 0, "retry": 0}  # Since the last drain()
+
+logger = log.get_logger("notion_wal")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _load():
+    global _pending, _done
+    if _pending is not None:
+        return
+    _pending, _done = {}, {}
+    if not os.path.exists(WAL_PATH):
+        return
+    with open(WAL_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a crash mid-write
+            if record.get("op") == "intent":
+                _pending[record["key"]] = record
+                _done.pop(record["key"], None)
+            elif record.get("op") in ("applied", "failed"):
+                _pending.pop(record["key"], None)
+                _done[record["key"]] = (record["op"], record.get("ts", ""))
+
+
+def _append(record):
+    global _file
+    if _file is None:
+        os.makedirs(os.path.dirname(WAL_PATH), exist_ok=True)
+        _file = open(WAL_PATH, "a", encoding="utf-8")
+    _file.write(json.dumps(record, separators=(",", ":")) + "\n")
+    _file.flush()
+    os.fsync(_file.fileno())
+
+
+def _headers():
+    return {
+        "Authorization": f"Bearer {os.getenv('NOTION_TOKEN')}",
+        "Notion-Version": NOTION_VERSION,
+        "Content-Type": "application/json",
+    }
+
+
+def _apply(record):
+    """Sends one logged write. 2xx -> applied, other 4xx -> failed for good, anything else stays pending."""
+    try:
+        response = notion_scan.notion_request(record["method"], record["url"], headers=_headers(),
+                                              json=record["payload"], timeout=30)
+    except Exception as e:
+        _count("retry")
+        log.sampled(logger, "Notion write not applied", log.WARNING,
+                    f"  ⚠️ Notion write {record['key']} not applied (will replay next run): {e}")
+        return
+    if response.status_code < 300:
+        _mark(record["key"], "applied")
+        _count("applied")
+        label = record.get("label")
+        if label:
+            logger.debug(f"  ✅ Notion: {label}")
+    elif response.status_code < 500 and response.status_code != 429:
+        _count("rejected")
+        log.sampled(logger, "Notion write rejected", log.ERROR,
+                    f"  ❌ Notion rejected {record['key']}: {response.status_code} | {response.text[:300]}")
+        _mark(record["key"], "failed", status=response.status_code)
+    else:
+        _count("retry")
+        log.sampled(logger, "Notion write not applied", log.WARNING,
+                    f"  ⚠️ Notion write {record['key']} got {response.status_code} (will replay next run)")
+
+
+def _count(outcome):
+    with _lock:
+        _counts[outcome] += 1
+
+
+def _mark(key, op, **extra):
+    with _lock:
+        _append({"op": op, "key": key, "ts": _now(), **extra})
+        _pending.pop(key, None)
+        _done[key] = (op, _now())
+
+
+def _worker():
+    while True:
+        record = _queue.get()
+        try:
+            if record is None:
+                return
+            _apply(record)
+        finally:
+            with _lock:
+                _queued.discard(record and record["key"])
+            _queue.task_done()
+
+
+def _ensure_workers():
+    if not _workers:
+        for _ in range(APPLY_WORKERS):
+            thread = threading.Thread(target=_worker, daemon=True)
+            thread.start()
+            _workers.append(thread)
+
+
+def update_key(page_id, payload):
+    """Key for a page update whose identity is its content: the same payload is only written once."""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f"update:{page_id}:{digest}"
+
+
+def has(key):
+    """True if the key is pending or was applied/rejected within RETENTION_DAYS."""
+    with _lock:
+        _load()
+        return key in _pending or key in _done
+
+
+def submit(key, method, url, payload, label=None):
+    """
+    Durably logs a Notion write, then queues it for the background workers.
+    Returns False if the key was already pending or done (nothing logged).
+    """
+    with _lock:
+        _load()
+        if key in _pending or key in _done:
+            return False
+        record = {"op": "intent", "key": key, "method": method, "url": url, "payload": payload,
+                  "label": label, "ts": _now()}
+        _append(record)
+        _pending[key] = record
+        _queued.add(key)
+    _ensure_workers()
+    _queue.put(record)
+    return True
+
+
+def replay():
+    """Queues every logged write that was never applied (and isn't already queued). Returns how many."""
+    with _lock:
+        _load()
+        records = [record for key, record in _pending.items() if key not in _queued]
+        _queued.update(record["key"] for record in records)
+    if records:
+        print(f"♻️ Replaying {len(records)} unapplied Notion write(s) from {WAL_PATH}")
+        _ensure_workers()
+        for record in records:
+            _queue.put(record)
+    return len(records)
+
+
+def drain():
+    """Waits for queued writes to finish, then compacts the log. Returns the number still pending."""
+    global _file
+    _queue.join()
+    with _lock:
+        counts = dict(_counts)
+        _counts.update(dict.fromkeys(_counts, 0))
+    if any(counts.values()):
+        logger.info(f"📝 Notion writes: {counts['applied']} applied, {counts['rejected']} rejected, "
+                    f"{counts['retry']} left for replay")
+    log.flush()
+    with _lock:
+        _load()
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)).isoformat(timespec="seconds")
+        for key in [k for k, (_, ts) in _done.items() if ts < cutoff]:
+            del _done[key]
+        if _file is not None:
+            _file.close()
+            _file = None
+        os.makedirs(os.path.dirname(WAL_PATH), exist_ok=True)
+        tmp_path = WAL_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (op, ts) in sorted(_done.items()):
+                f.write(json.dumps({"op": op, "key": key, "ts": ts}, separators=(",", ":")) + "\n")
+            for record in _pending.values():
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, WAL_PATH)
+        remaining = len(_pending)
+    if remaining:
+        print(f"⚠️ {remaining} Notion write(s) still pending in {WAL_PATH}; they'll be replayed next run.")
+    return remaining
@@ -0,0 +1,208 @@
+"""
+Runs the whole daily refresh in one process as a dependency graph of tasks.
+
+update.yml used to start main.py, generate_pages.py, video_tracker.py and
+analytics_updater.py as separate cold processes (and daily_views.py in its own
+workflow), each re-importing the Google client, re-reading tokens and
+rebuilding services. Here they run as tasks in one warm process: independent
+tasks overlap on a thread pool, and all of them share the credential pool
+(credential_pool.py), the run cache and the ETag cache.
+
+A failing task is reported and only the tasks that require its output are
+skipped; everything else still runs. The exit status is non-zero only if a
+critical task (the ones producing committed files) failed.
+
+Usage:
+  python pipeline.py                              # Run every task
+  python pipeline.py --only channel_snapshot,generate_pages
+  python pipeline.py --skip daily_views --workers 2
+"""
+
+import sys
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import call_budget
+
+MAX_WORKERS = 4
+
+
+def _channel_snapshot():
+    import main
+    main.run_channel_snapshot()
+
+
+def _generate_pages():
+    from generate_pages import generate_pages
+    written = generate_pages()
+    print(f"📄 Wrote {len(written)} page(s)." if written else "✅ All pages up to date.")
+
+
+def _video_discovery():
+    import video_tracker
+    video_tracker.run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=video_tracker.DAYS_TO_CHECK_FOR_RECENT)
+
+
+def _reporting_ingest():
+    import reporting_ingest
+    reporting_ingest.run_reporting_ingest()
+
+
+def _video_analytics():
+    import analytics_updater
+    analytics_updater.run_analytics_updater(update_all=False)
+
+
+def _daily_views():
+    import daily_views
+    daily_views.main()
+
+
+def _video_series():
+    import video_series
+    video_series.run_video_series()
+
+
+# requires: must have succeeded first (skipped otherwise)
+# after: ordering only — runs once those finished, whatever their outcome
+TASKS = {
+    "channel_snapshot": {"run": _channel_snapshot, "requires": [], "after": [], "critical": True},
+    "generate_pages": {"run": _generate_pages, "requires": ["channel_snapshot"], "after": [], "critical": True},
+    "video_discovery": {"run": _video_discovery, "requires": [], "after": [], "critical": False},
+    "reporting_ingest": {"run": _reporting_ingest, "requires": [], "after": [], "critical": False},
+    "video_analytics": {"run": _video_analytics, "requires": [], "after": ["video_discovery", "reporting_ingest"], "critical": False},
+    "daily_views": {"run": _daily_views, "requires": [], "after": [], "critical": False},
+    # Shares the metrics store with reporting_ingest; ordered after it to avoid write contention
+    "video_series": {"run": _video_series, "requires": [], "after": ["reporting_ingest"], "critical": False},
+}
+
+
+def _run_task(name, run):
+    started = time.monotonic()
+    print(f"▶️ [{name}] started")
+    try:
+        run()
+        status = "ok"
+    except (Exception, SystemExit) as e:
+        print(f"❌ [{name}] failed: {e!r}")
+        status = "failed"
+    elapsed = time.monotonic() - started
+    print(f"{'✅' if status == 'ok' else '❌'} [{name}] {status} in {elapsed:.1f}s")
+    return status, elapsed
+
+
+def run_pipeline(selected=None, tasks=TASKS, max_workers=MAX_WORKERS, pool=None):
+    """
+    Runs the selected tasks (default: all) respecting requires/after edges.
+    Returns {task name: (status, seconds)} with status "ok", "failed" or "skipped".
+    A long-running caller can pass its own executor as pool, so the task threads
+    (and the per-thread API clients built on them) outlive one call.
+    """
+    selected = [name for name in tasks if selected is None or name in selected]
+    pending = {name: tasks[name] for name in selected}
+    results = {}
+    running = {}
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            progressed = True
+            while progressed:  # Skips can unblock further tasks, so sweep until stable
+                progressed = False
+                for name, task in list(pending.items()):
+                    waits_on = [d for d in task["requires"] + task["after"] if d in selected]
+                    if not all(d in results for d in waits_on):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    failed = [d for d in task["requires"] if d in results and results[d][0] != "ok"]
+                    if failed:
+                        print(f"⏭️ [{name}] skipped — requires {', '.join(failed)}")
+                        results[name] = ("skipped", 0.0)
+                    else:
+                        running[pool.submit(_run_task, name, task["run"])] = name
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle among tasks: {', '.join(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True)
+
+    return results
+
+
+def task_groups(selected, tasks=TASKS):
+    """
+    Splits the selected tasks into groups that can run as separate pipeline
+    processes (see networks.py): tasks linked by a requires edge stay in one group,
+    so a failure still skips its dependents, and each group comes after the groups
+    it waits on. Returns [[task name, ...], ...].
+    """
+    group_of = {name: frozenset([name]) for name in selected}
+    for name in selected:
+        for dep in tasks[name]["requires"]:
+            if dep in group_of and dep not in group_of[name]:
+                merged = group_of[dep] | group_of[name]
+                group_of.update(dict.fromkeys(merged, merged))
+    pending = list(dict.fromkeys(group_of[name] for name in selected))
+
+    ordered, done = [], set()
+    while pending:
+        for group in pending:
+            waits_on = {d for name in group for d in tasks[name]["requires"] + tasks[name]["after"] if d in group_of}
+            if waits_on - group <= done:
+                ordered.append([name for name in selected if name in group])
+                done |= group
+                pending.remove(group)
+                break
+        else:
+            raise ValueError(f"Dependency cycle among tasks: {', '.join(sorted(set().union(*pending)))}")
+    return ordered
+
+
+def select_tasks(argv, tasks=TASKS):
+    """Task names picked by --only/--skip in argv (default: all), in TASKS order. Raises ValueError for unknown names."""
+    def option(flag):
+        return argv[argv.index(flag) + 1] if flag in argv else None
+
+    only = option("--only")
+    skip = set((option("--skip") or "").split(",")) - {""}
+    selected = [name for name in (only.split(",") if only else tasks) if name not in skip]
+    unknown = [name for name in selected if name not in tasks]
+    if unknown:
+        raise ValueError(f"Unknown task(s): {', '.join(unknown)}. Available: {', '.join(tasks)}")
+    return [name for name in tasks if name in selected]
+
+
+def main(argv):
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else MAX_WORKERS
+    try:
+        selected = select_tasks(argv)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    print(f"🚀 Pipeline started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ({len(selected)} tasks, {workers} workers)")
+    results = run_pipeline(selected, max_workers=workers)
+
+    print(f"\n--- Pipeline Summary ---")
+    for name in selected:
+        status, elapsed = results[name]
+        icon = {"ok": "✅", "failed": "❌", "skipped": "⏭️"}[status]
+        print(f"{icon} {name}: {status} ({elapsed:.1f}s)")
+    critical_failed = [n for n in selected if TASKS[n]["critical"] and results[n][0] != "ok"]
+    call_budget.report()
+    print(f"🏁 Pipeline finished at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    return 1 if critical_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
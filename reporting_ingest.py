@@ -0,0 +1,209 @@
+"""
+Bulk ingestion of YouTube Reporting API reports into the local metrics store.
+
+Instead of one Analytics query per video, a scheduled reporting job per channel
+(or one for the content owner, see content_owner.py) makes YouTube generate a
+daily CSV with every video's numbers. This script makes sure the jobs exist,
+lists reports it hasn't ingested yet, streams each CSV and writes per-video
+daily rows into metrics_store. analytics_updater.py then reads per-video
+totals from the store instead of querying Analytics for each video.
+
+Newly created jobs produce their first reports within ~48 hours (with some
+historical backfill), so per-video totals are only trusted for videos
+published after the store's coverage starts.
+
+Set YOUTUBE_REPORTING_URL to point at a local stub that serves jobs, report
+lists and report files.
+
+Usage:
+  python reporting_ingest.py
+"""
+
+import os
+import csv
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import channels
+import content_owner
+import credential_pool
+import metrics_store
+from channels import CHANNELS
+
+REPORTING_URL = os.getenv("YOUTUBE_REPORTING_URL", "https://youtubereporting.googleapis.com/v1").rstrip("/")
+JOB_NAME_PREFIX = "youtubenotion"
+MAX_WORKERS = 4
+
+# channel_basic_a2: per-video views/engagement/subscribers (split by country etc., summed per video here)
+# channel_combined_a2: views and watch time by traffic source, device and playback location
+REPORT_TYPES = ["channel_basic_a2", "channel_combined_a2"]
+
+
+def _session_for(creds):
+    if creds is None:  # Only for local stubs
+        return requests.Session()
+    from google.auth.transport.requests import AuthorizedSession
+    return AuthorizedSession(creds)
+
+
+def _get_json(session, path, params):
+    response = session.get(f"{REPORTING_URL}{path}", params=params, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def ensure_job(session, conn, source, report_type, owner_params):
+    """Returns the job ID for a report type, reusing an existing job or creating one."""
+    job_id = metrics_store.get_job(conn, source, report_type)
+    if job_id:
+        return job_id
+
+    page_token = None
+    while True:
+        data = _get_json(session, "/jobs", {**owner_params, "pageToken": page_token})
+        for job in data.get("jobs", []):
+            if job.get("reportTypeId") == report_type:
+                metrics_store.save_job(conn, source, report_type, job["id"])
+                return job["id"]
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
+
+    response = session.post(f"{REPORTING_URL}/jobs", params=owner_params, timeout=30,
+                            json={"reportTypeId": report_type, "name": f"{JOB_NAME_PREFIX}-{report_type}"})
+    response.raise_for_status()
+    job_id = response.json()["id"]
+    print(f"  🆕 Created {report_type} reporting job {job_id} for {source} (first reports arrive within ~48h)")
+    metrics_store.save_job(conn, source, report_type, job_id)
+    return job_id
+
+
+def list_new_reports(session, conn, job_id, owner_params):
+    """Reports for a job that aren't in the store yet, oldest first (so reissued reports win)."""
+    reports = []
+    page_token = None
+    while True:
+        data = _get_json(session, f"/jobs/{job_id}/reports", {**owner_params, "pageToken": page_token})
+        reports.extend(r for r in data.get("reports", []) if not metrics_store.is_ingested(conn, r["id"]))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
+    return sorted(reports, key=lambda r: (r.get("startTime", ""), r.get("createTime", "")))
+
+
+def _number(row, column):
+    value = row.get(column)
+    try:
+        return float(value) if value not in (None, "") else 0
+    except ValueError:
+        return 0
+
+
+def parse_report_lines(lines, report_type):
+    """
+    Stream-parses CSV lines and sums them per video (and traffic source for channel_combined_a2).
+    Returns (day, rows) in the shape metrics_store.replace_*_day expects.
+    """
+    day = None
+    rows = {}
+    for row in csv.DictReader(lines):
+        video_id = row.get("video_id")
+        if not video_id:
+            continue
+        day = day or datetime.strptime(row["date"], "%Y%m%d").strftime("%Y-%m-%d")
+        views = _number(row, "views")
+        if report_type == "channel_combined_a2":
+            key = (row.get("channel_id", ""), video_id, row.get("traffic_source_type", ""))
+            entry = rows.setdefault(key, {"views": 0, "watch_minutes": 0})
+            entry["views"] += views
+            entry["watch_minutes"] += _number(row, "watch_time_minutes")
+            continue
+        entry = rows.setdefault((row.get("channel_id", ""), video_id), dict.fromkeys(metrics_store.VIDEO_COLUMNS, 0))
+        entry["views"] += views
+        entry["watch_minutes"] += _number(row, "watch_time_minutes")
+        entry["likes"] += _number(row, "likes")
+        entry["comments"] += _number(row, "comments")
+        entry["shares"] += _number(row, "shares")
+        entry["subs_gained"] += _number(row, "subscribers_gained")
+        entry["subs_lost"] += _number(row, "subscribers_lost")
+        entry["view_pct_weighted"] += _number(row, "average_view_duration_percentage") * views
+    return day, rows
+
+
+def ingest_report(session, conn, source, report_type, job_id, report):
+    """Downloads one report file, streams it into the store and marks it ingested. Returns the row count."""
+    with session.get(report["downloadUrl"], stream=True, timeout=120) as response:
+        response.raise_for_status()
+        day, rows = parse_report_lines(response.iter_lines(decode_unicode=True), report_type)
+    if day is None and report.get("startTime"):
+        day = report["startTime"][:10]
+    if day:
+        if report_type == "channel_combined_a2":
+            metrics_store.replace_traffic_day(conn, source, day, rows)
+        else:
+            metrics_store.replace_video_day(conn, source, day, rows)
+    metrics_store.mark_ingested(conn, report, job_id, source, report_type, day, len(rows))
+    conn.commit()
+    return len(rows)
+
+
+def ingest_source(source, creds, owner_params):
+    """Ensures jobs and ingests every new report for one channel / content owner. Returns reports ingested."""
+    conn = metrics_store.connect()
+    session = _session_for(creds)
+    ingested = 0
+    try:
+        for report_type in REPORT_TYPES:
+            job_id = ensure_job(session, conn, source, report_type, owner_params)
+            for report in list_new_reports(session, conn, job_id, owner_params):
+                rows = ingest_report(session, conn, source, report_type, job_id, report)
+                ingested += 1
+                print(f"  ✅ {source}: {report_type} {report.get('startTime', '')[:10]} ({rows} rows)")
+    finally:
+        conn.close()
+    return ingested
+
+
+def get_sources():
+    """(source, creds, owner_params) for the content owner, or for every channel with a token."""
+    if content_owner.ENABLED:
+        creds = content_owner.load_credentials()
+        if creds is None:
+            return []
+        return [(f"contentOwner:{content_owner.CONTENT_OWNER_ID}", creds,
+                 {"onBehalfOfContentOwner": content_owner.CONTENT_OWNER_ID})]
+    sources = []
+    for channel_name, channel_id in CHANNELS.items():
+        if not channels.is_capable(channel_id, channels.ANALYTICS):
+            continue
+        creds = credential_pool.get_credentials(channel_id)
+        if creds:
+            sources.append((channel_id, creds, {}))
+    return sources
+
+
+def run_reporting_ingest(max_workers=MAX_WORKERS):
+    sources = get_sources()
+    if not sources:
+        print("🏁 No channels with usable tokens — nothing to ingest.")
+        return 0
+    print(f"⬇️ Ingesting Reporting API files for {len(sources)} source(s)...")
+    total = 0
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sources))) as pool:
+        futures = {pool.submit(ingest_source, *source): source[0] for source in sources}
+        for future, source in futures.items():
+            try:
+                total += future.result()
+            except Exception as e:
+                print(f"❌ Reporting ingest failed for {source}: {e}")
+                if channels.is_auth_error(e) and not source.startswith("contentOwner:"):
+                    channels.record_outcome(source, channels.ANALYTICS, False, e)
+    channels.save_capabilities()
+    print(f"🏁 Ingested {total} new report file(s).")
+    return total
+
+
+if __name__ == "__main__":
+    run_reporting_ingest()
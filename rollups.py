@@ -0,0 +1,151 @@
+"""
+Vectorized rollups over public/daily-views.json.
+
+The nested {date: {channel: views}} dict is loaded once into a dense
+(dates x channels) NumPy array over a contiguous daily index; days a channel
+has no data for are NaN (and count as 0 in sums). Every rollup below is then a
+few whole-array passes — cumulative sums for rolling windows, reduceat for
+calendar months — instead of loops over the nested dicts.
+
+Writes public/rollups.json with, for the network and each channel:
+  last/previous 7, 28 and 365-day sums, their growth rates and share of the network,
+  the last complete month, the month before and month-over-month growth.
+
+Usage:
+  python rollups.py   # Recompute public/rollups.json from public/daily-views.json
+"""
+
+import os
+import json
+from collections import namedtuple
+
+import numpy as np
+from networks import DATA_DIR
+
+DAILY_VIEWS_PATH = os.path.join(DATA_DIR, "public", "daily-views.json")
+OUTPUT_PATH = os.path.join(DATA_DIR, "public", "rollups.json")
+
+WINDOWS = (7, 28, 365)
+NETWORK = "_network"
+
+# dates: datetime64[D] array, one entry per day from first to last
+# views: float64 (len(dates), len(channels)), NaN where a channel has no value that day
+Series = namedtuple("Series", ["dates", "channels", "views"])
+
+
+def load_series(data):
+    """Builds the dense Series from daily-views data ({"daily": {date: {channel: views, "_total": ...}}})."""
+    daily = data.get("daily", {})
+    channel_names = sorted({name for values in daily.values() for name in values if name != "_total"})
+    if not daily or not channel_names:
+        return Series(np.array([], dtype="datetime64[D]"), channel_names, np.zeros((0, len(channel_names))))
+
+    date_keys = np.array(list(daily), dtype="datetime64[D]")
+    start = date_keys.min()
+    dates = np.arange(start, date_keys.max() + 1)
+    views = np.full((len(dates), len(channel_names)), np.nan)
+
+    column = {name: j for j, name in enumerate(channel_names)}
+    rows, cols, values = [], [], []
+    for row, channel_values in zip((date_keys - start).astype(int), daily.values()):
+        for name, value in channel_values.items():
+            if name != "_total":
+                rows.append(row)
+                cols.append(column[name])
+                values.append(value)
+    views[rows, cols] = values
+    return Series(dates, channel_names, views)
+
+
+def with_network(series):
+    """Appends the network total as a last column (NaN only on days no channel reported)."""
+    present = ~np.isnan(series.views).all(axis=1, keepdims=True)
+    total = np.where(present, np.nansum(series.views, axis=1, keepdims=True), np.nan)
+    return Series(series.dates, series.channels + [NETWORK], np.hstack([series.views, total]))
+
+
+def rolling_sum(views, window):
+    """Trailing window sums for every day (shorter at the start), via one cumulative sum."""
+    cumulative = np.vstack([np.zeros((1, views.shape[1])), np.cumsum(np.nan_to_num(views), axis=0)])
+    ends = np.arange(1, len(views) + 1)
+    return cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+
+
+def growth(current, previous):
+    """current / previous - 1, NaN where previous is 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, current / previous - 1, np.nan)
+
+
+def shares(views):
+    """Each channel column as a fraction of the last (network) column."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(views[:, -1:] > 0, views / views[:, -1:], np.nan)
+
+
+def monthly_totals(series):
+    """Calendar-month sums: (months as datetime64[M], array (months, channels))."""
+    if not len(series.dates):
+        return np.array([], dtype="datetime64[M]"), np.zeros((0, len(series.channels)))
+    months = series.dates.astype("datetime64[M]")
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    return months[starts], np.add.reduceat(np.nan_to_num(series.views), starts, axis=0)
+
+
+def compute_rollups(data, windows=WINDOWS):
+    """Rollups as of the latest date in the data, keyed by channel (plus NETWORK)."""
+    series = with_network(load_series(data))
+    if not len(series.dates):
+        return {"as_of": None, "channels": {}}
+
+    result = {name: {} for name in series.channels}
+    for window in windows:
+        rolled = rolling_sum(series.views, window)
+        last = rolled[-1]
+        previous = rolled[-1 - window] if len(rolled) > window else np.full(len(series.channels), np.nan)
+        change = growth(last, previous)
+        share = shares(rolled[-1:])[0]
+        for j, name in enumerate(series.channels):
+            result[name][f"last_{window}d"] = _number(last[j])
+            result[name][f"previous_{window}d"] = _number(previous[j])
+            result[name][f"growth_{window}d"] = _number(change[j])
+            result[name][f"share_{window}d"] = _number(share[j])
+
+    months, totals = monthly_totals(series)
+    # The current month is partial unless the data ends on its last day
+    complete = len(months) if (series.dates[-1] + 1).astype("datetime64[M]") != months[-1] else len(months) - 1
+    if complete >= 1:
+        latest = totals[complete - 1]
+        before = totals[complete - 2] if complete >= 2 else np.full(len(series.channels), np.nan)
+        month_growth = growth(latest, before)
+        for j, name in enumerate(series.channels):
+            result[name]["month"] = str(months[complete - 1])
+            result[name]["month_views"] = _number(latest[j])
+            result[name]["previous_month_views"] = _number(before[j])
+            result[name]["month_over_month"] = _number(month_growth[j])
+
+    return {"as_of": str(series.dates[-1]), "channels": result}
+
+
+def _number(value):
+    """JSON-friendly scalar: int for whole sums, rounded float for rates, None for NaN."""
+    if np.isnan(value):
+        return None
+    if float(value).is_integer():
+        return int(value)
+    return round(float(value), 6)
+
+
+def write_rollups(data, path=OUTPUT_PATH):
+    import daily_views  # Imported here: daily_views imports this module
+
+    rollups = compute_rollups(data)
+    daily_views.write_atomic(path, rollups)
+    return rollups
+
+
+if __name__ == "__main__":
+    with open(DAILY_VIEWS_PATH, "r") as f:
+        data = json.load(f)
+    rollups = write_rollups(data)
+    print(f"📄 Wrote {OUTPUT_PATH} (as of {rollups['as_of']}, {len(rollups['channels'])} series)")
@@ -0,0 +1,89 @@
+"""
+Zero-quota discovery of recent uploads from YouTube's public Atom feeds.
+
+Every channel has a feed at youtube.com/feeds/videos.xml?channel_id=... listing
+its latest 15 uploads. Daily discovery only looks back a few days, so the feed
+usually covers the whole window and no playlistItems calls are needed. All
+feeds are fetched concurrently in one round.
+
+A channel falls back to the playlist crawl (None result) when its feed could
+not be read, or when the feed is full and its oldest entry is still newer than
+the lookback cutoff (older uploads in the window may have been pushed out).
+
+Set YOUTUBE_FEED_URL to point at a local feed stub, or RSS_DISCOVERY=0 to disable.
+"""
+
+import os
+import requests
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+FEED_URL = os.getenv("YOUTUBE_FEED_URL", "https://www.youtube.com/feeds/videos.xml")
+ENABLED = os.getenv("RSS_DISCOVERY", "1") != "0"
+FEED_SIZE = 15  # YouTube always lists at most the latest 15 uploads
+MAX_WORKERS = 8
+
+NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+}
+
+
+def parse_feed(xml_text):
+    """Atom feed (or WebSub notification) text -> [{"videoId", "channelId", "title", "publishedAt"}], as listed."""
+    root = ET.fromstring(xml_text)
+    videos = []
+    for entry in root.findall("atom:entry", NS):
+        video_id = entry.findtext("yt:videoId", namespaces=NS)
+        published = entry.findtext("atom:published", namespaces=NS)
+        if not video_id or not published:
+            continue
+        videos.append({
+            "videoId": video_id,
+            "channelId": entry.findtext("yt:channelId", namespaces=NS),
+            "title": entry.findtext("atom:title", default="", namespaces=NS),
+            "publishedAt": published,
+        })
+    return videos
+
+
+def fetch_feed(channel_id, timeout=10):
+    """Returns the channel's feed entries, or None if the feed couldn't be fetched or parsed."""
+    try:
+        response = requests.get(FEED_URL, params={"channel_id": channel_id}, timeout=timeout)
+        if response.status_code != 200:
+            print(f"  ⚠️ Feed for {channel_id} returned HTTP {response.status_code}.")
+            return None
+        return parse_feed(response.content)
+    except (requests.exceptions.RequestException, ET.ParseError) as e:
+        print(f"  ⚠️ Could not read feed for {channel_id}: {e}")
+        return None
+
+
+def _published_dt(video):
+    return datetime.fromisoformat(video["publishedAt"].replace("Z", "+00:00"))
+
+
+def recent_from_feed(videos, lookback_days):
+    """Entries inside the lookback window, or None if the feed may not reach back to the cutoff."""
+    cutoff_dt = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+    if len(videos) >= FEED_SIZE and min(_published_dt(v) for v in videos) >= cutoff_dt:
+        return None
+    return [v for v in videos if _published_dt(v) >= cutoff_dt]
+
+
+def discover_recent(channel_ids, lookback_days, max_workers=MAX_WORKERS):
+    """
+    Reads every channel's feed concurrently.
+    Returns {channel_id: [videos in the window]} with None for channels that need the playlist crawl.
+    """
+    channel_ids = list(channel_ids)
+    if not channel_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(channel_ids))) as pool:
+        feeds = dict(zip(channel_ids, pool.map(fetch_feed, channel_ids)))
+    return {
+        channel_id: recent_from_feed(videos, lookback_days) if videos is not None else None
+        for channel_id, videos in feeds.items()
+    }
@@ -0,0 +1,132 @@
+"""
+On-disk API response cache scoped to one workflow run.
+
+update.yml runs main.py, video_tracker.py and analytics_updater.py back to back.
+They hit overlapping endpoints (the uploads playlist, channels.list statistics),
+so every response is stored under .cache/run/<run id>/ keyed by endpoint +
+normalized params, and later steps reuse it instead of refetching.
+
+The run id comes from RUN_CACHE_ID, then GITHUB_RUN_ID (shared by all steps of
+one Actions run), and falls back to one per process for local runs, so a rerun
+fetches fresh data (pipeline.py runs every step in one process, so its steps
+still share). To reuse responses across local invocations, set RUN_CACHE_ID
+yourself, e.g. RUN_CACHE_ID=$(date -u +%F) for one cache per day.
+Entries are written to a temp file and renamed into place, so concurrent
+readers only ever see complete entries. Set RUN_CACHE=0 to disable.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from networks import DATA_DIR
+
+CACHE_ROOT = os.path.join(DATA_DIR, ".cache", "run")
+
+RUN_ID = (os.getenv("RUN_CACHE_ID") or os.getenv("GITHUB_RUN_ID")
+          or f"local-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{os.getpid()}")
+ENABLED = os.getenv("RUN_CACHE", "1") != "0"
+
+# Entries older than this are refetched even within the same run
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+# Run directories untouched for this long are removed on first write
+STALE_RUN_SECONDS = 2 * 24 * 60 * 60
+
+# Params that identify the caller rather than the resource
+IGNORED_PARAMS = {"key"}
+
+_pruned = False
+_prune_lock = threading.Lock()
+_retired = []  # Run ids this process rotated away from, oldest first
+
+
+def run_dir():
+    return os.path.join(CACHE_ROOT, RUN_ID)
+
+
+def cache_key(endpoint, params):
+    """Stable key for an endpoint + params (None values and API keys dropped, order ignored)."""
+    normalized = {
+        k: ",".join(map(str, v)) if isinstance(v, (list, tuple)) else str(v)
+        for k, v in (params or {}).items()
+        if v is not None and k not in IGNORED_PARAMS
+    }
+    raw = json.dumps([endpoint, normalized], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(endpoint, params):
+    return os.path.join(run_dir(), cache_key(endpoint, params) + ".json")
+
+
+def get(endpoint, params, ttl=DEFAULT_TTL_SECONDS):
+    """Returns the cached value, or None if missing/expired/disabled."""
+    if not ENABLED:
+        return None
+    path = _entry_path(endpoint, params)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ttl is not None and time.time() - entry.get("stored_at", 0) > ttl:
+        return None
+    return entry.get("value")
+
+
+def put(endpoint, params, value):
+    if not ENABLED:
+        return
+    _prune_stale_runs()
+    path = _entry_path(endpoint, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"endpoint": endpoint, "stored_at": time.time(), "value": value}, f)
+    os.replace(tmp_path, path)
+
+
+def cached(endpoint, params, fetch, ttl=DEFAULT_TTL_SECONDS):
+    """Returns the cached response for endpoint+params, calling fetch() and storing it on a miss."""
+    value = get(endpoint, params, ttl)
+    if value is not None:
+        return value
+    value = fetch()
+    # Never cache API error payloads (requests-based callers get them as JSON, not exceptions)
+    if value is not None and not (isinstance(value, dict) and "error" in value):
+        put(endpoint, params, value)
+    return value
+
+
+def rotate(run_id):
+    """
+    Switches this process to a new run scope (long-running processes call this
+    between bursts of runs). Directories of the scopes it rotated away from are
+    deleted, except the one just left, which calls in flight may still be writing.
+    """
+    global RUN_ID
+    with _prune_lock:
+        _retired.append(RUN_ID)
+        RUN_ID = run_id
+        expired, _retired[:] = _retired[:-1], _retired[-1:]
+    for name in expired:
+        shutil.rmtree(os.path.join(CACHE_ROOT, name), ignore_errors=True)
+
+
+def _prune_stale_runs():
+    global _pruned
+    with _prune_lock:
+        if _pruned:
+            return
+        _pruned = True
+    if not os.path.isdir(CACHE_ROOT):
+        return
+    now = time.time()
+    for name in os.listdir(CACHE_ROOT):
+        path = os.path.join(CACHE_ROOT, name)
+        if name != RUN_ID and os.path.isdir(path) and now - os.path.getmtime(path) > STALE_RUN_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,285 @@
+"""
+Long-running scheduler: runs the pipeline's jobs on their own intervals in one warm process.
+
+The Actions crons start a cold process per tick (daily at 12:00, daily views at
+12:30, full analytics on Sundays), re-importing, re-reading tokens and
+rebuilding clients every time. Here the process stays up and each job runs on
+its own interval, so cheap jobs like discovery can run often. Modules and
+loaded credentials are kept for the life of the process. Every job's tasks run
+on one long-lived thread pool, so the per-thread API clients (credential_pool)
+built on those threads are reused across runs. Helpers that fan out on their
+own short-lived pools still build clients for those threads each run.
+
+  - Intervals are configurable (SCHEDULE="video_discovery=30m,daily_views=2h")
+    and every next run is jittered by +/-JITTER so jobs don't fire in lockstep.
+  - A job that comes due while it is still running is coalesced: however many
+    ticks it missed, it runs once more right after the current run finishes.
+  - GET /healthz on SCHEDULER_PORT returns each job's last run, outcome and next
+    run (HTTP 503 while any job's latest run failed).
+  - Each job's last run is kept in state/scheduler.json, so a restart (deploy,
+    crash, reboot) picks up where the schedule was instead of running every job
+    at once. Jobs with no recorded run start within the first minute, except
+    ones on an interval of LONG_INTERVAL or more (e.g. the weekly --all sweep),
+    which wait one interval.
+  - Each burst of runs gets a fresh run-cache scope (and closed circuit breakers),
+    so the run cache still dedupes calls between jobs that run together without
+    serving stale data later.
+
+Usage:
+  python scheduler.py                 # Default intervals, health on :8790
+  python scheduler.py --port 9001
+  SCHEDULE="video_discovery=15m,full_analytics=7d" python scheduler.py
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pipeline
+import run_cache
+import content_owner
+import circuit_breaker
+import notion_wal
+from networks import DATA_DIR
+
+PORT = int(os.getenv("SCHEDULER_PORT", "8790"))
+JITTER = 0.1                      # +/- fraction of the interval
+MAX_CONCURRENT_JOBS = 2
+RUN_CACHE_ROTATE_SECONDS = 30 * 60
+TICK_SECONDS = 1
+LONG_INTERVAL = 24 * 60 * 60      # Jobs this slow don't run on a cold start
+
+STATE_PATH = os.path.join(DATA_DIR, "state", "scheduler.json")
+
+
+def _full_analytics():
+    import analytics_updater
+    analytics_updater.run_analytics_updater(update_all=True)
+
+
+TASKS = {
+    **pipeline.TASKS,
+    "full_analytics": {"run": _full_analytics, "requires": [], "after": [], "critical": False},
+}
+
+# Each job is one run_pipeline() call over these tasks
+JOBS = {
+    "channel_snapshot": {"tasks": ["channel_snapshot", "generate_pages"], "every": "6h"},
+    "video_discovery": {"tasks": ["video_discovery"], "every": "1h"},
+    "reporting_ingest": {"tasks": ["reporting_ingest"], "every": "12h"},
+    "video_analytics": {"tasks": ["video_analytics"], "every": "6h"},
+    "daily_views": {"tasks": ["daily_views"], "every": "6h"},
+    "video_series": {"tasks": ["video_series"], "every": "12h"},
+    "full_analytics": {"tasks": ["full_analytics"], "every": "7d"},
+}
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(text):
+    """'90s', '30m', '6h', '7d' (or plain seconds) -> seconds."""
+    text = text.strip().lower()
+    if text[-1:] in UNITS:
+        return float(text[:-1]) * UNITS[text[-1]]
+    return float(text)
+
+
+def parse_schedule(spec, jobs=JOBS):
+    """SCHEDULE spec 'job=interval,...' -> {job: seconds} over the defaults. Interval 0 disables a job."""
+    intervals = {name: parse_interval(job["every"]) for name, job in jobs.items()}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, interval = part.partition("=")
+        if name not in jobs:
+            raise SystemExit(f"Unknown job {name!r} in SCHEDULE. Jobs: {', '.join(jobs)}")
+        intervals[name] = parse_interval(interval)
+    return {name: seconds for name, seconds in intervals.items() if seconds > 0}
+
+
+def _jittered(seconds):
+    return seconds * (1 + random.uniform(-JITTER, JITTER))
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds") if ts else None
+
+
+def load_state(path=STATE_PATH):
+    """{job: {"last_end", "last_status"}} from earlier runs of the daemon."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {path}, starting fresh: {e}")
+        return {}
+
+
+def first_run(now, seconds, last_end):
+    """When a job first runs in this process: one interval after its last recorded run."""
+    spread = random.uniform(0, min(60, seconds * JITTER))  # Due jobs don't all fire at once
+    if last_end is None:
+        return now + (_jittered(seconds) if seconds >= LONG_INTERVAL else spread)
+    return max(now + spread, last_end + _jittered(seconds))
+
+
+class Scheduler:
+    def __init__(self, intervals, jobs=JOBS, tasks=TASKS, state_path=STATE_PATH):
+        self.jobs = jobs
+        self.tasks = tasks
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.started_at = time.time()
+        self.last_rotation = 0.0
+        # Task threads outlive each run, so their per-thread API clients stay warm
+        self.task_pool = ThreadPoolExecutor(max_workers=pipeline.MAX_WORKERS * MAX_CONCURRENT_JOBS,
+                                            thread_name_prefix="task")
+        self.state_path = state_path
+        saved = load_state(state_path)
+        now = time.time()
+        self.state = {
+            name: {
+                "interval": seconds,
+                "next_run": first_run(now, seconds, saved.get(name, {}).get("last_end")),
+                "running": False, "rerun": False, "coalesced": 0, "runs": 0,
+                "last_start": None, "last_end": saved.get(name, {}).get("last_end"),
+                "last_status": saved.get(name, {}).get("last_status"), "last_results": {},
+            }
+            for name, seconds in intervals.items()
+        }
+
+    def _save_state(self):
+        """Writes each job's last run to STATE_PATH (caller holds self.lock)."""
+        saved = load_state(self.state_path)
+        for name, job_state in self.state.items():
+            if job_state["last_end"] is not None:
+                saved[name] = {"last_end": job_state["last_end"], "last_status": job_state["last_status"]}
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _rotate_run_cache(self):
+        """New run-cache scope for each burst of runs; jobs starting together still share one."""
+        now = time.time()
+        if now - self.last_rotation >= RUN_CACHE_ROTATE_SECONDS:
+            run_cache.rotate(f"daemon-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}")
+            content_owner.clear_cache()
+            circuit_breaker.reset()
+            self.last_rotation = now
+
+    def _run(self, name):
+        job_state = self.state[name]
+        print(f"⏰ [{name}] starting scheduled run")
+        try:
+            results = pipeline.run_pipeline(self.jobs[name]["tasks"], tasks=self.tasks, pool=self.task_pool)
+            status = "ok" if all(result[0] == "ok" for result in results.values()) else "failed"
+        except Exception as e:
+            print(f"❌ [{name}] scheduled run crashed: {e!r}")
+            results, status = {}, "failed"
+        with self.lock:
+            now = time.time()
+            job_state.update(running=False, last_end=now, last_status=status, runs=job_state["runs"] + 1,
+                             last_results={task: result[0] for task, result in results.items()})
+            if job_state["rerun"]:
+                job_state["rerun"] = False
+                job_state["next_run"] = now  # Coalesced ticks: one catch-up run, right away
+            else:
+                job_state["next_run"] = now + _jittered(job_state["interval"])
+            self._save_state()
+            print(f"{'✅' if status == 'ok' else '❌'} [{name}] {status}; next run at {_iso(job_state['next_run'])}")
+
+    def run_forever(self):
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS) as pool:
+            while not self.stop.is_set():
+                now = time.time()
+                with self.lock:
+                    for name, job_state in self.state.items():
+                        if job_state["next_run"] > now:
+                            continue
+                        if job_state["running"]:
+                            if not job_state["rerun"]:
+                                print(f"⏭️ [{name}] still running; coalescing into one follow-up run")
+                            job_state["rerun"] = True
+                            job_state["coalesced"] += 1
+                            job_state["next_run"] = now + _jittered(job_state["interval"])
+                            continue
+                        self._rotate_run_cache()
+                        job_state.update(running=True, last_start=now)
+                        pool.submit(self._run, name)
+                self.stop.wait(TICK_SECONDS)
+            print("🛑 Scheduler stopping; waiting for running jobs...")
+        self.task_pool.shutdown(wait=True)
+        notion_wal.drain()
+
+    def health(self):
+        with self.lock:
+            jobs = {
+                name: {
+                    "interval_seconds": job_state["interval"],
+                    "running": job_state["running"],
+                    "runs": job_state["runs"],
+                    "coalesced": job_state["coalesced"],
+                    "last_start": _iso(job_state["last_start"]),
+                    "last_end": _iso(job_state["last_end"]),
+                    "last_status": job_state["last_status"],
+                    "last_results": job_state["last_results"],
+                    "next_run": _iso(job_state["next_run"]),
+                }
+                for name, job_state in self.state.items()
+            }
+        degraded = any(job["last_status"] == "failed" for job in jobs.values())
+        return {"status": "degraded" if degraded else "ok", "started_at": _iso(self.started_at), "jobs": jobs}
+
+
+def serve_health(scheduler, port=PORT):
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/healthz"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            report = scheduler.health()
+            body = json.dumps(report, indent=2).encode("utf-8")
+            self.send_response(200 if report["status"] == "ok" else 503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv):
+    intervals = parse_schedule(os.getenv("SCHEDULE"))
+    port = int(argv[argv.index("--port") + 1]) if "--port" in argv else PORT
+    scheduler = Scheduler(intervals)
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop.set())
+
+    serve_health(scheduler, port)
+    print(f"🚀 Scheduler started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}; health on :{port}/healthz")
+    for name, seconds in intervals.items():
+        print(f"   {name}: every {seconds / 3600:g}h (±{JITTER:.0%}), next run at {_iso(scheduler.state[name]['next_run'])}")
+    notion_wal.replay()
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
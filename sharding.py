@@ -0,0 +1,55 @@
+"""
+Stable hash-partitioning of channels across shards.
+
+Every pipeline script accepts --shard i/N (0 <= i < N) and then only handles
+the channels whose ID hashes to shard i, so a network can be split across
+several processes or a matrix of runners. A channel's shard only depends on
+its ID and N, never on registry order, so adding a channel doesn't move the
+others.
+
+Scripts that write shared outputs (public/data.json, public/daily-views.json)
+write a partial file per shard instead; merge_outputs.py combines them.
+"""
+
+import os
+import hashlib
+
+from networks import DATA_DIR
+
+PARTIALS_DIR = os.path.join(DATA_DIR, "public", "partials")
+
+
+def parse_shard(argv):
+    """Returns (index, count) from '--shard i/N' in argv, or None when not sharded."""
+    if "--shard" not in argv:
+        return None
+    try:
+        index, count = (int(part) for part in argv[argv.index("--shard") + 1].split("/"))
+    except (IndexError, ValueError):
+        raise SystemExit("--shard expects i/N, e.g. --shard 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise SystemExit(f"--shard {index}/{count}: index must be in 0..{count - 1}")
+    return index, count
+
+
+def shard_of(channel_id, count):
+    digest = hashlib.sha256(channel_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def in_shard(channel_id, shard):
+    return shard is None or shard_of(channel_id, shard[1]) == shard[0]
+
+
+def filter_channels(channel_map, shard, get_id=lambda value: value):
+    """Keeps the {name: value} entries whose channel ID falls in the shard (all of them when shard is None)."""
+    return {name: value for name, value in channel_map.items() if in_shard(get_id(value), shard)}
+
+
+def describe(shard):
+    return "all channels" if shard is None else f"shard {shard[0]}/{shard[1]}"
+
+
+def partial_path(kind, shard):
+    """public/partials/<kind>.<i>-of-<N>.json"""
+    return os.path.join(PARTIALS_DIR, f"{kind}.{shard[0]}-of-{shard[1]}.json")
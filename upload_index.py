@@ -0,0 +1,222 @@
+"""
+Local index of upload publish times per channel, kept in state/upload_index.json.
+
+main.py used to page the uploads playlist from the top for every upload-count
+window. Instead, refresh() crawls the playlist incrementally (only until it
+reaches videos the index already knows, or the oldest date asked for) at most
+once per run, and count_uploads() answers any window with a binary search over
+the sorted publish timestamps — no API calls.
+
+Each channel entry tracks `covered_since`..`covered_until`: the index holds
+every upload published in that range, as seen by a top-down crawl (or all
+uploads ever if `complete` is set).
+"""
+
+import os
+import json
+import bisect
+import threading
+from datetime import datetime, timezone
+
+import run_cache
+import http_cache
+from networks import DATA_DIR
+
+INDEX_PATH = os.path.join(DATA_DIR, "state", "upload_index.json")
+
+_lock = threading.Lock()
+_index = None
+_dirty = set()  # Channel IDs changed by this process
+
+
+def _to_ts(value):
+    """ISO timestamp or YYYY-MM-DD (treated as UTC midnight) -> epoch seconds."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if len(value) == 10:
+        value += "T00:00:00+00:00"
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _read_raw():
+    if not os.path.exists(INDEX_PATH):
+        return {}
+    try:
+        with open(INDEX_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {INDEX_PATH}, rebuilding: {e}")
+        return {}
+
+
+def _load():
+    global _index
+    if _index is None:
+        _index = {}
+        for channel_id, entry in _read_raw().items():
+                uploads = sorted((ts, vid) for ts, vid in entry.get("uploads", []))
+                _index[channel_id] = {
+                    "uploads": uploads,
+                    "ids": {vid for _, vid in uploads},
+                    "covered_since": entry.get("covered_since"),
+                    "covered_until": entry.get("covered_until"),
+                    "complete": entry.get("complete", False),
+                    "crawled_run": entry.get("crawled_run"),
+                }
+    return _index
+
+
+def _entry(channel_id):
+    return _load().setdefault(channel_id, {
+        "uploads": [], "ids": set(), "covered_since": None, "covered_until": None,
+        "complete": False, "crawled_run": None,
+    })
+
+
+def add_uploads(channel_id, items):
+    """Adds (video_id, published_iso) pairs seen anywhere (e.g. by video_tracker). Returns how many were new."""
+    added = 0
+    with _lock:
+        entry = _entry(channel_id)
+        for video_id, published in items:
+            if not video_id or not published or video_id in entry["ids"]:
+                continue
+            bisect.insort(entry["uploads"], (_to_ts(published), video_id))
+            entry["ids"].add(video_id)
+            added += 1
+        if added:
+            _dirty.add(channel_id)
+    return added
+
+
+def is_covered(channel_id, since):
+    with _lock:
+        entry = _entry(channel_id)
+        return entry["complete"] or (entry["covered_since"] is not None and entry["covered_since"] <= _to_ts(since))
+
+
+def refresh(youtube, channel_id, since):
+    """
+    Brings the channel's index up to date and complete back to `since`.
+    Pages newest-first and stops as soon as it reaches known, covered uploads
+    (or uploads older than `since`). Skipped entirely if already done this run.
+    Returns the number of playlist pages requested.
+    """
+    since_ts = _to_ts(since)
+    with _lock:
+        entry = _entry(channel_id)
+        if entry["crawled_run"] == run_cache.RUN_ID and (
+                entry["complete"] or (entry["covered_since"] is not None and entry["covered_since"] <= since_ts)):
+            return 0
+        previously_covered = entry["covered_since"] if not entry["complete"] else 0
+        covered_until = entry["covered_until"]
+        known_ids = set(entry["ids"])
+    crawl_started = int(datetime.now(timezone.utc).timestamp())
+
+    uploads_playlist_id = channel_id.replace("UC", "UU", 1)
+    next_page_token = None
+    pages = 0
+    oldest_seen = None
+    reached_known = False
+    reached_end = False
+
+    while True:
+        params = {
+            "part": "snippet,contentDetails",
+            "playlistId": uploads_playlist_id,
+            "maxResults": 50,
+            "pageToken": next_page_token,
+            "fields": http_cache.FIELDS["playlistItems"],
+        }
+        response = run_cache.cached("youtube.playlistItems.list", params,
+                                    lambda: http_cache.execute("youtube.playlistItems.list", params,
+                                                               youtube.playlistItems().list(**params)))
+        pages += 1
+
+        seen = []
+        for item in response.get("items", []):
+            video_id = item.get("contentDetails", {}).get("videoId")
+            published = item.get("contentDetails", {}).get("videoPublishedAt")
+            if not video_id or not published:
+                continue
+            seen.append((video_id, published))
+            ts = _to_ts(published)
+            oldest_seen = ts if oldest_seen is None else min(oldest_seen, ts)
+            if (video_id in known_ids and previously_covered is not None and covered_until is not None
+                    and previously_covered <= ts <= covered_until):
+                reached_known = True  # From here down, the previous crawl already saw everything
+        add_uploads(channel_id, seen)
+
+        next_page_token = response.get("nextPageToken")
+        if not next_page_token:
+            reached_end = True
+            break
+        if oldest_seen is not None and oldest_seen < since_ts:
+            break  # Playlist is reverse-chronological; everything after this is older
+        if reached_known and previously_covered <= since_ts:
+            break  # Rest of the window is already in the index
+
+    with _lock:
+        entry = _entry(channel_id)
+        if reached_end:
+            entry["complete"] = True
+        covered = [c for c in (oldest_seen, previously_covered if reached_known else None) if c is not None]
+        if covered:
+            entry["covered_since"] = min(covered)
+            entry["covered_until"] = crawl_started
+        entry["crawled_run"] = run_cache.RUN_ID
+        _dirty.add(channel_id)
+    return pages
+
+
+def count_uploads(channel_id, start, end):
+    """Number of indexed uploads with start <= published <= end (dates or ISO timestamps)."""
+    with _lock:
+        uploads = _entry(channel_id)["uploads"]
+        lo = bisect.bisect_left(uploads, (_to_ts(start), ""))
+        hi = bisect.bisect_right(uploads, (_to_ts(end), "\uffff"))
+    return max(0, hi - lo)
+
+
+def _merged(saved, entry):
+    """
+    One channel's file entry from what another process saved and this process's
+    entry: uploads are combined, and the coverage is the newer range (extended by
+    the other one where they overlap, since both hold every upload in their range).
+    """
+    uploads = {vid: ts for ts, vid in saved.get("uploads", [])}
+    uploads.update({vid: ts for ts, vid in entry["uploads"]})
+    ranges = sorted((e["covered_until"], e["covered_since"]) for e in (saved, entry)
+                    if e.get("covered_since") is not None and e.get("covered_until") is not None)
+    covered_until, covered_since = ranges[-1] if ranges else (None, None)
+    if len(ranges) == 2 and ranges[0][0] >= covered_since:
+        covered_since = min(covered_since, ranges[0][1])
+    return {
+        "uploads": sorted([ts, vid] for vid, ts in uploads.items()),
+        "covered_since": covered_since,
+        "covered_until": covered_until,
+        "complete": entry["complete"] or saved.get("complete", False),
+        "crawled_run": entry["crawled_run"] or saved.get("crawled_run"),
+    }
+
+
+def save():
+    """
+    Merges the channels this process changed into state/upload_index.json (temp
+    file + rename), so processes refreshing other channels don't lose each other's work.
+    """
+    with _lock:
+        if not _dirty or _index is None:
+            return
+        raw = _read_raw()
+        for channel_id in _dirty:
+            raw[channel_id] = _merged(raw.get(channel_id, {}), _index[channel_id])
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(dict(sorted(raw.items())), f, separators=(",", ":"))
+        os.replace(tmp_path, INDEX_PATH)
+        _dirty.clear()
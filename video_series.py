@@ -0,0 +1,211 @@
+"""
+Daily time series for each channel's top videos.
+
+The only per-video numbers we keep otherwise are lifetime totals in Notion.
+Here, one dimensions=day,video Analytics report per channel (paginated with
+startIndex) covers every video's views over the last WINDOW_DAYS. The TOP_N
+videos by views in that window are kept. Their days are upserted into the
+video_series table of the metrics store, so history builds up across runs
+(HISTORY_DAYS kept). That is one query per channel instead of one per video
+per day.
+
+Writes public/video-series/<channel slug>.json per channel for charts: a
+contiguous date axis and, per top video, arrays of daily views and watch
+minutes aligned to it (0 on days without data), plus an index.json.
+
+In content-owner mode the same report runs through the CMS token, filtered to
+the channel.
+
+Usage:
+  python video_series.py   # Refresh the store and the per-channel JSON files
+"""
+
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import channels
+import circuit_breaker
+import content_owner
+import credential_pool
+import detail_fetcher
+import metrics_store
+import run_cache
+from channels import CHANNELS
+from networks import DATA_DIR
+
+OUTPUT_DIR = os.path.join(DATA_DIR, "public", "video-series")
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+
+TOP_N = int(os.getenv("VIDEO_SERIES_TOP_N", "10"))
+WINDOW_DAYS = 28     # Ranking window (and the days re-fetched each run)
+HISTORY_DAYS = 180   # Days kept in the store and written to the charts
+PAGE_SIZE = 10000
+MAX_WORKERS = 4
+
+# Column order of each row: day, video, then these
+METRICS = "views,estimatedMinutesWatched,likes,subscribersGained"
+
+
+def query_day_video(channel_id, start_date, end_date):
+    """Every [day, video, views, minutes, likes, subs gained] row for a channel over the window."""
+    if content_owner.ENABLED:
+        _, rows = content_owner.query(METRICS, "day,video", start_date, end_date,
+                                      filters=f"channel=={channel_id}", sort="day")
+        return rows
+
+    creds = credential_pool.load_credentials(channel_id)
+    youtube_analytics = credential_pool.service("youtubeAnalytics", "v2", credentials=creds)
+    rows = []
+    start_index = 1
+    while True:
+        params = {
+            "ids": f"channel=={channel_id}",
+            "startDate": start_date,
+            "endDate": end_date,
+            "metrics": METRICS,
+            "dimensions": "day,video",
+            "sort": "day",
+            "maxResults": PAGE_SIZE,
+            "startIndex": start_index,
+        }
+        response = run_cache.cached("youtubeAnalytics.reports.query", params,
+                                    lambda: circuit_breaker.call(channel_id, circuit_breaker.ANALYTICS,
+                                                                 lambda: youtube_analytics.reports().query(**params).execute()))
+        page = response.get("rows", [])
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start_index += PAGE_SIZE
+
+
+def top_videos(rows, n=TOP_N):
+    """Video IDs with the most views over the rows, highest first, with their window totals."""
+    totals = {}
+    for row in rows:
+        totals[row[1]] = totals.get(row[1], 0) + row[2]
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:n]
+    return dict(ranked)
+
+
+def fetch_channel(channel_id, start_date, end_date):
+    """(top {video_id: window views}, store rows for those videos), or None when skipped or failed."""
+    name = channels.channel_name_for_id(channel_id) or channel_id
+    if not channels.is_capable(channel_id, channels.ANALYTICS) or not circuit_breaker.allow(channel_id, circuit_breaker.ANALYTICS):
+        return None
+    try:
+        rows = query_day_video(channel_id, start_date, end_date)
+    except FileNotFoundError:
+        print(f"⚠️ No token found for {name}; skipping its video series.")
+        return None
+    except Exception as e:
+        print(f"❌ day,video report failed for {name}: {e}")
+        if channels.is_auth_error(e):
+            channels.record_outcome(channel_id, channels.ANALYTICS, False, e)
+        return None
+
+    top = top_videos(rows)
+    store_rows = [(row[1], row[0], *row[2:]) for row in rows if row[1] in top]
+    print(f"📈 {name}: {len(rows)} day/video rows, top {len(top)} video(s) kept")
+    return top, store_rows
+
+
+def fetch_titles(ids_by_channel):
+    """{video_id: {"title", "published_at"}} for the top videos (one videos.list call per 50 IDs)."""
+    creds = None
+    if not YOUTUBE_API_KEY:
+        creds = next(filter(None, (credential_pool.get_credentials(c) for c in ids_by_channel)), None)
+    details = detail_fetcher.fetch_details_for_channels(ids_by_channel, api_key=YOUTUBE_API_KEY, creds=creds) or {}
+    return {
+        item["id"]: {"title": item["snippet"].get("title"), "published_at": item["snippet"].get("publishedAt")}
+        for items in details.values() for item in items
+    }
+
+
+def build_chart(channel_name, channel_id, top, series, titles, since_day, end_day):
+    """Per-channel chart document: one date axis and per-video arrays aligned to it."""
+    start = datetime.strptime(since_day, "%Y-%m-%d").date()
+    end = datetime.strptime(end_day, "%Y-%m-%d").date()
+    dates = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    index = {day: i for i, day in enumerate(dates)}
+
+    videos = []
+    for video_id, window_views in top.items():
+        views = [0] * len(dates)
+        minutes = [0] * len(dates)
+        for day, day_views, day_minutes, _likes, _subs in series.get(video_id, []):
+            if day in index:
+                views[index[day]] = day_views
+                minutes[index[day]] = day_minutes
+        videos.append({
+            "video_id": video_id,
+            **titles.get(video_id, {"title": None, "published_at": None}),
+            f"views_{WINDOW_DAYS}d": window_views,
+            "views": views,
+            "watch_minutes": minutes,
+        })
+    # Trim leading days before any top video had data, so new channels don't chart months of zeros
+    first = min((next((i for i, v in enumerate(video["views"]) if v), len(dates)) for video in videos), default=0)
+    for video in videos:
+        video["views"] = video["views"][first:]
+        video["watch_minutes"] = video["watch_minutes"][first:]
+    return {
+        "channel": channel_name,
+        "channel_id": channel_id,
+        "as_of": end_day,
+        "window_days": WINDOW_DAYS,
+        "dates": dates[first:],
+        "videos": videos,
+    }
+
+
+def write_json(path, document):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(document, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def run_video_series():
+    today = datetime.now(timezone.utc).date()
+    end_day = (today - timedelta(days=1)).isoformat()
+    start_day = (today - timedelta(days=WINDOW_DAYS)).isoformat()
+    since_day = (today - timedelta(days=HISTORY_DAYS)).isoformat()
+    print(f"🚀 Video series for the top {TOP_N} videos per channel ({start_day}..{end_day})")
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        fetched = dict(zip(CHANNELS.values(), pool.map(lambda cid: fetch_channel(cid, start_day, end_day), CHANNELS.values())))
+    fetched = {channel_id: result for channel_id, result in fetched.items() if result is not None}
+
+    slugs = {entry["id"]: entry["slug"] for entry in channels.REGISTRY}
+    conn = metrics_store.connect()
+    try:
+        for channel_id, (_, store_rows) in fetched.items():
+            metrics_store.upsert_series(conn, channel_id, store_rows)
+        metrics_store.prune_series(conn, since_day)
+        conn.commit()
+
+        titles = fetch_titles({channel_id: list(top) for channel_id, (top, _) in fetched.items() if top})
+        for channel_id, (top, _) in fetched.items():
+            series = metrics_store.series_for(conn, channel_id, top, since_day)
+            chart = build_chart(channels.channel_name_for_id(channel_id), channel_id, top, series, titles, since_day, end_day)
+            write_json(os.path.join(OUTPUT_DIR, f"{slugs.get(channel_id, channel_id)}.json"), chart)
+    finally:
+        conn.close()
+
+    # Index of the chart files (always written, so the workflow's git add finds the directory)
+    write_json(os.path.join(OUTPUT_DIR, "index.json"), {
+        "as_of": end_day,
+        "channels": {channels.channel_name_for_id(channel_id): f"{slugs.get(channel_id, channel_id)}.json"
+                     for channel_id in fetched},
+    })
+
+    channels.save_capabilities()
+    circuit_breaker.summary()
+    print(f"🏁 Video series written for {len(fetched)}/{len(CHANNELS)} channel(s) to {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    run_video_series()
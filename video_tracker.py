@@ -1,7 +1,5 @@
 import os
 import requests
-from googleapiclient.discovery import build
-import pickle
 from datetime import datetime, timedelta, timezone
 import isodate
 import json
@@ -17,29 +15,31 @@ NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 VIDEO_DB_ID = os.getenv("NOTION_VIDEO_DB_ID")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+# Daily mode lookback; covers weekend gaps and timezone edge cases
+DAYS_TO_CHECK_FOR_RECENT = 3
+
 # Directory with tokens like tokens/token_<channel_id>.pickle
 TOKEN_DIR = "tokens"
 
-# Channel map
-CHANNELS = {
-    "All The Smoke": "UC2ozVs4pg2K3uFLw6-0ayCQ",
-    "KG Certified": "UCa9W_cPwwbDlwBwHOd1YWoQ",
-    "Morning Kombat": "UC9Qy3sHrr5wil-rkYcmcNcw",
-    "All The Smoke Fight": "UCFPoJNd0d4k1H9A6UOlikcg",
-    "Ring Champs": "UCBX_Qx_Hx5QTuEL72YVyn_A",
-    "San Antonio Spurs": "UCEZHE-0CoHqeL1LGFa2EmQw",
-    "Killswitch": "UCbwGkD8-Fbxun7zgzfC5kjg",
-    "The Late Run": "UCcZ6iVdTPU5g4pN3MaIbruw",
-    "Michael Easter": "UC-3foA4PyACqvubjyrlzIcg",
-    "Anik & Florian": "UCDqSRXkx0E58VdH__Y8expQ",
-    "No Such Thing": "UCFRiYABu5iXlkEF5ZCZd6wQ"
-}
+# Channel map (shared registry, see channels.json)
+from channels import CHANNELS
+import run_cache
+import http_cache
+import upload_index
+import detail_fetcher
+import rss_discovery
+import credential_pool
+import sharding
+import notion_wal
+import log
+from networks import DATA_DIR
+
+logger = log.get_logger("video_tracker")
 
 # --- Helper: Script directory for reliable pathing ---
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
-# TOKEN_DIR should be relative to SCRIPT_DIR if it's not an absolute path.
-# If TOKEN_DIR is just "tokens", it implies "tokens" subdirectory next to the script.
-TOKEN_DIR = os.path.join(SCRIPT_DIR, "tokens") # Ensure TOKEN_DIR is robust
+# TOKEN_DIR lives in the network's data directory (the repository by default, see networks.py).
+TOKEN_DIR = os.path.join(DATA_DIR, "tokens") # Ensure TOKEN_DIR is robust
 
 def load_token(channel_id):
     # token_path = os.path.join(TOKEN_DIR, f"token_{channel_id}.pickle") # TOKEN_DIR is now set above
@@ -47,11 +47,10 @@ def load_token(channel_id):
     token_filename = f"token_{channel_id}.pickle"
     token_path = os.path.join(TOKEN_DIR, token_filename)
 
-    if not os.path.exists(token_path):
+    creds = credential_pool.get_credentials(channel_id)
+    if creds is None:
         print(f"⚠️ No token found for {channel_id} at path {token_path}")
-        return None
-    with open(token_path, "rb") as token_file:
-        return pickle.load(token_file)
+    return creds
 
 
 def fetch_channel_videos(creds, channel_id, lookback_days=None, page_size=10, max_total_videos=1000, api_key=None):
@@ -63,9 +62,9 @@ def fetch_channel_videos(creds, channel_id, lookback_days=None, page_size=10, ma
     """
     try:
         if creds:
-            youtube = build("youtube", "v3", credentials=creds)
+            youtube = credential_pool.service("youtube", "v3", credentials=creds)
         else:
-            youtube = build("youtube", "v3", developerKey=api_key)
+            youtube = credential_pool.service("youtube", "v3", developerKey=api_key)
 
         # Use playlistItems.list for all channels (1 unit/call vs 100 for search.list)
         uploads_playlist_id = channel_id.replace("UC", "UU", 1)
@@ -83,14 +82,26 @@ def fetch_channel_videos(creds, channel_id, lookback_days=None, page_size=10, ma
             actual_page_size = min(page_size, max_total_videos - videos_fetched_count)
             if actual_page_size <= 0: break
 
-            playlist_request = youtube.playlistItems().list(
-                part="snippet,contentDetails",
-                playlistId=uploads_playlist_id,
-                maxResults=actual_page_size,
-                pageToken=next_page_token
-            )
-            playlist_response = playlist_request.execute()
-
+            playlist_params = {
+                "part": "snippet,contentDetails",
+                "playlistId": uploads_playlist_id,
+                "maxResults": actual_page_size,
+                "pageToken": next_page_token,
+                "fields": http_cache.FIELDS["playlistItems"],
+            }
+            # Served from the run cache when main.py already paged this playlist,
+            # otherwise revalidated against the stored ETag
+            playlist_response = run_cache.cached("youtube.playlistItems.list", playlist_params,
+                                                 lambda: http_cache.execute("youtube.playlistItems.list", playlist_params,
+                                                                            youtube.playlistItems().list(**playlist_params)))
+
+            # Keep the shared upload index current with every page we see
+            upload_index.add_uploads(channel_id, [
+                (item.get("contentDetails", {}).get("videoId"), item.get("contentDetails", {}).get("videoPublishedAt"))
+                for item in playlist_response.get("items", [])
+            ])
+
+            reached_cutoff = False
             for item in playlist_response.get("items", []):
                 video_id = item.get("contentDetails", {}).get("videoId")
                 published_at = item.get("contentDetails", {}).get("videoPublishedAt")
@@ -103,6 +114,7 @@ def fetch_channel_videos(creds, channel_id, lookback_days=None, page_size=10, ma
                         cutoff_dt = datetime.now(timezone.utc) - timedelta(days=lookback_days)
                         if video_published_dt < cutoff_dt:
                             should_add = False
+                            reached_cutoff = True
 
                     if should_add:
                         all_videos.append({
@@ -113,11 +125,15 @@ def fetch_channel_videos(creds, channel_id, lookback_days=None, page_size=10, ma
                         videos_fetched_count += 1
 
             next_page_token = playlist_response.get("nextPageToken")
-            print(f"    Fetched page: {videos_fetched_count} videos so far for channel {channel_id}.")
+            logger.debug(f"    Fetched page: {videos_fetched_count} videos so far for channel {channel_id}.")
 
             if not next_page_token:
                 print(f"    No more pages to fetch for channel {channel_id}.")
                 break
+            if reached_cutoff:
+                # Playlist is reverse-chronological, so later pages are all older than the lookback
+                print(f"    Reached lookback cutoff for channel {channel_id}.")
+                break
 
         print(f"  Total videos retrieved for channel {channel_id}: {len(all_videos)}")
         return all_videos
@@ -137,9 +153,9 @@ def fetch_video_details(creds, video_ids, api_key=None):
             return []
 
         if creds:
-            youtube = build("youtube", "v3", credentials=creds)
+            youtube = credential_pool.service("youtube", "v3", credentials=creds)
         else:
-            youtube = build("youtube", "v3", developerKey=api_key)
+            youtube = credential_pool.service("youtube", "v3", developerKey=api_key)
         all_video_items = []
         
         # The YouTube API v3 videos().list endpoint can take max 50 IDs at a time.
@@ -147,19 +163,19 @@ def fetch_video_details(creds, video_ids, api_key=None):
         
         for i in range(0, len(video_ids), chunk_size):
             video_ids_chunk = video_ids[i:i + chunk_size]
-            print(f"    Fetching details for video ID chunk: {i//chunk_size + 1} (IDs {i+1} to {min(i+chunk_size, len(video_ids))})") # Added print
+            logger.debug(f"    Fetching details for video ID chunk: {i//chunk_size + 1} (IDs {i+1} to {min(i+chunk_size, len(video_ids))})")
             
             try:
-                request = youtube.videos().list(
-                    part="statistics,snippet,contentDetails",
-                    id=",".join(video_ids_chunk)
-                )
-                response = request.execute()
+                details_params = {"part": "statistics,snippet,contentDetails", "id": ",".join(video_ids_chunk),
+                                  "fields": http_cache.FIELDS["videos"]}
+                response = run_cache.cached("youtube.videos.list", details_params,
+                                            lambda: http_cache.execute("youtube.videos.list", details_params,
+                                                                       youtube.videos().list(**details_params)))
                 all_video_items.extend(response.get("items", []))
             except Exception as chunk_e:
                 # Handle error for a specific chunk, e.g., log it and continue if appropriate
                 # This allows the process to continue with other chunks if one fails.
-                print(f"    ❌ Error fetching details for chunk of video IDs (starting with {video_ids_chunk[0]}...): {chunk_e}")
+                log.sampled(logger, "Video details chunk failed", log.ERROR, f"    ❌ Error fetching details for chunk of video IDs (starting with {video_ids_chunk[0]}...): {chunk_e}")
                 # Optionally, re-raise if any chunk failure should stop the whole process:
                 # raise chunk_e 
                 # For now, we'll let it try other chunks. If quota is hit, outer handler will catch it.
@@ -221,9 +237,9 @@ def get_video_format_details(video_id, thumbnails, duration_seconds):
         # Other status codes or conditions might mean it's not a short or the check isn't conclusive, so we fallback.
 
     except requests.exceptions.Timeout:
-        print(f"  ⚠️ Timeout checking /shorts/ URL for {video_id}. Falling back to secondary format detection.")
+        log.sampled(logger, "Shorts check timeout", log.WARNING, f"  ⚠️ Timeout checking /shorts/ URL for {video_id}. Falling back to secondary format detection.")
     except requests.exceptions.RequestException as e:
-        print(f"  ⚠️ Error checking /shorts/ URL for {video_id}: {e}. Falling back to secondary format detection.")
+        log.sampled(logger, "Shorts check error", log.WARNING, f"  ⚠️ Error checking /shorts/ URL for {video_id}: {e}. Falling back to secondary format detection.")
 
     # Secondary Method (Fallback): Aspect ratio and duration (original method)
     # print(f"  DEBUG Format: {video_id} - Using fallback aspect/duration check.")
@@ -252,13 +268,13 @@ def is_vertical(thumbnails):
     high = thumbnails.get("high", {})
     return high.get("height", 0) > high.get("width", 0)
 
+def create_wal_key(video_id):
+    """One Notion row per video: a create logged under this key is never sent twice (see notion_wal.py)."""
+    return f"create:{video_id}"
+
 def create_notion_video_row(video, channel_name, channel_id):
+    """Logs the new row to the Notion WAL; it's created in the background. Returns True if queued."""
     url = "https://api.notion.com/v1/pages"
-    headers = {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": "2026-03-11",
-        "Content-Type": "application/json"
-    }
     try:
         duration_secs, duration_mins = parse_duration(video["contentDetails"]["duration"])
         format_type = get_video_format_details(video['id'], video["snippet"]["thumbnails"], duration_secs)
@@ -284,13 +300,15 @@ def create_notion_video_row(video, channel_name, channel_id):
             }
         }
 
-        res = requests.post(url, headers=headers, json=payload)
-        if res.status_code != 200:
-            print(f"❌ Failed to create row for {video['snippet']['title']}: {res.status_code} | {res.text}")
-        else:
-            print(f"✅ Added video to Notion: {video['snippet']['title']}")
+        label = f"Added video to Notion: {video['snippet']['title']}"
+        if notion_wal.submit(create_wal_key(video["id"]), "POST", url, payload, label=label):
+            logger.debug(f"📝 Queued Notion row for {video['snippet']['title']}")
+            return True
+        logger.debug(f"⏭️ Notion row for {video['snippet']['title']} is already in the WAL.")
+        return False
     except Exception as e:
-        print(f"❌ Error creating Notion row for {video.get('id', 'unknown')}: {str(e)}")
+        log.sampled(logger, "Notion row not created", log.ERROR, f"❌ Error creating Notion row for {video.get('id', 'unknown')}: {str(e)}")
+        return False
 
 def is_video_in_notion(video_id):
     """Checks if a video with the given video_id already exists in the Notion database."""
@@ -324,11 +342,12 @@ def is_video_in_notion(video_id):
         print(f"❌ Exception querying Notion for video {video_id}: {str(e)}")
         return False
 
-def run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=7):
+def run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=7, shard=None):
     """
     Main function to track videos.
     bulk_mode: If True, attempts to fetch all videos for all channels.
     lookback_days_if_not_bulk: If bulk_mode is False, how many recent days to check.
+    shard: Optional (index, count) — only handle that shard's channels (see sharding.py).
     """
     print(f"🚀 Starting video tracker at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     if bulk_mode:
@@ -336,16 +355,34 @@ def run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=7):
     else:
         print(f"⚙️ Running in RECENT VIDEOS mode - fetching videos from last {lookback_days_if_not_bulk} days.")
 
+    # Rows a previous run fetched but never got into Notion are sent first, from the WAL
+    notion_wal.replay()
+
     videos_added_total = 0
     missing_tokens_channels = []
     quota_issues_channels = []
-    
-    for channel_name, channel_id in CHANNELS.items():
+    pending_details = {}  # channel_id -> video IDs not yet in Notion
+    channel_names = {}
+    detail_creds = None  # Any OAuth token works for videos.list when there's no API key
+
+    # Daily discovery reads the public upload feeds first (no API quota); channels whose
+    # feed can't cover the lookback window fall back to the playlist crawl below
+    channel_map = sharding.filter_channels(CHANNELS, shard)
+    if shard is not None:
+        print(f"🧩 Sharded run: {sharding.describe(shard)} ({len(channel_map)} channels)")
+
+    feed_results = {}
+    if not bulk_mode and rss_discovery.ENABLED:
+        print(f"📡 Reading upload feeds for {len(channel_map)} channels...")
+        feed_results = rss_discovery.discover_recent(channel_map.values(), lookback_days_if_not_bulk)
+
+    for channel_name, channel_id in channel_map.items():
         print(f"\n📊 Processing channel: {channel_name} ({channel_id})")
         
+        feed_videos = feed_results.get(channel_id)
         creds = load_token(channel_id)
         use_api_key = False
-        if not creds:
+        if not creds and feed_videos is None:
             if YOUTUBE_API_KEY:
                 print(f"  ℹ️ No OAuth token for {channel_name}, using public API key for video discovery.")
                 use_api_key = True
@@ -356,10 +393,15 @@ def run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=7):
         try:
             videos_from_channel_response = []
             fetch_key = YOUTUBE_API_KEY if use_api_key else None
-            if bulk_mode:
+            if feed_videos is not None:
+                print(f"  Using upload feed ({len(feed_videos)} videos in window, 0 API units)")
+                upload_index.add_uploads(channel_id, [(v["videoId"], v["publishedAt"]) for v in feed_videos])
+                videos_from_channel_response = feed_videos
+            elif bulk_mode:
                 videos_from_channel_response = fetch_channel_videos(creds, channel_id, lookback_days=None, page_size=50, max_total_videos=2500, api_key=fetch_key)
             else:
-                videos_from_channel_response = fetch_channel_videos(creds, channel_id, lookback_days=lookback_days_if_not_bulk, page_size=10, max_total_videos=50, api_key=fetch_key)
+                # page_size=50 matches main.py's playlist pages, so they come from the run cache
+                videos_from_channel_response = fetch_channel_videos(creds, channel_id, lookback_days=lookback_days_if_not_bulk, page_size=50, max_total_videos=50, api_key=fetch_key)
             
             if videos_from_channel_response is None: # Check for quota issue
                 quota_issues_channels.append(channel_name)
@@ -376,47 +418,65 @@ def run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=7):
             
             video_ids_to_fetch_details = []
             for video_summary in videos_from_channel_response:
-                if not is_video_in_notion(video_summary["videoId"]):
+                if notion_wal.has(create_wal_key(video_summary["videoId"])):
+                    logger.debug(f"⏭️ Video '{video_summary['title']}' ({video_summary['videoId']}) already logged for Notion. Skipping detail fetch.")
+                elif not is_video_in_notion(video_summary["videoId"]):
                     video_ids_to_fetch_details.append(video_summary["videoId"])
                 else:
-                    print(f"⏭️ Video '{video_summary['title']}' ({video_summary['videoId']}) already in Notion. Skipping detail fetch.")
+                    logger.debug(f"⏭️ Video '{video_summary['title']}' ({video_summary['videoId']}) already in Notion. Skipping detail fetch.")
             
             if not video_ids_to_fetch_details:
                 print(f"ℹ️ All potentially new videos for {channel_name} are already in Notion or no new videos to process.")
                 continue
 
-            print(f"⬇️ Fetching details for {len(video_ids_to_fetch_details)} new videos for {channel_name}...")
-            video_details_list = fetch_video_details(creds, video_ids_to_fetch_details, api_key=fetch_key)
+            # Details are fetched network-wide below, packed into full 50-ID batches
+            pending_details[channel_id] = video_ids_to_fetch_details
+            channel_names[channel_id] = channel_name
+            detail_creds = detail_creds or creds
 
-            if video_details_list is None: # Check for quota issue from fetch_video_details
-                quota_issues_channels.append(channel_name)
-                print(f"🟡 Skipping detail fetch for {channel_name} due to YouTube API quota issue.")
-                continue
-            
-            if not video_details_list: # Empty list from details fetch
-                print(f"ℹ️ No details retrieved for new videos from {channel_name} (possibly an error or no videos found).")
-                continue
+        except Exception as e:
+            # General catch-all for unexpected errors per channel
+            print(f"❌ An unexpected error occurred while processing {channel_name}: {str(e)}")
+            # Optionally, add to a list of channels with errors if needed
 
+    details_by_channel = {}
+    if pending_details:
+        details_by_channel = detail_fetcher.fetch_details_for_channels(
+            pending_details, api_key=YOUTUBE_API_KEY, creds=detail_creds)
+        if details_by_channel is None: # Quota hit while fetching details
+            quota_issues_channels.extend(channel_names[cid] for cid in pending_details)
+            print("🟡 Skipping detail-based inserts due to YouTube API quota issue.")
+            details_by_channel = {}
+
+    for channel_id, video_details_list in details_by_channel.items():
+        channel_name = channel_names[channel_id]
+        if not video_details_list: # Empty list from details fetch
+            print(f"ℹ️ No details retrieved for new videos from {channel_name} (possibly an error or no videos found).")
+            continue
+
+        try:
             print(f"➕ Adding {len(video_details_list)} new videos from {channel_name} to Notion...")
             videos_added_channel = 0
             for video_detail in video_details_list:
                 # Final check before adding, though fetch_video_details should only return new ones
                 if not is_video_in_notion(video_detail["id"]):
-                    create_notion_video_row(video_detail, channel_name, channel_id)
-                    videos_added_channel += 1
+                    if create_notion_video_row(video_detail, channel_name, channel_id):
+                        videos_added_channel += 1
                 else:
                     # This case should be rare if the logic above works correctly
-                    print(f"⏭️ Video '{video_detail['snippet']['title']}' ({video_detail['id']}) found in Notion just before adding. Skipping.")
-            
+                    logger.debug(f"⏭️ Video '{video_detail['snippet']['title']}' ({video_detail['id']}) found in Notion just before adding. Skipping.")
+
             if videos_added_channel > 0:
                 print(f"✅ Successfully added {videos_added_channel} videos from {channel_name} to Notion.")
             videos_added_total += videos_added_channel
-                
+
         except Exception as e:
-            # General catch-all for unexpected errors per channel
-            print(f"❌ An unexpected error occurred while processing {channel_name}: {str(e)}")
-            # Optionally, add to a list of channels with errors if needed
-    
+            print(f"❌ An unexpected error occurred while adding videos for {channel_name}: {str(e)}")
+
+    notion_wal.drain()
+    log.report_suppressed()
+    log.flush()
+
     print(f"\n--- Video Tracker Summary ---")
     print(f"✅ Total new videos added to Notion: {videos_added_total}")
     if missing_tokens_channels:
@@ -425,16 +485,17 @@ def run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=7):
         # Remove duplicates from quota_issues_channels before printing
         unique_quota_issues = sorted(list(set(quota_issues_channels)))
         print(f"🟡 YouTube API quota issues encountered for: {', '.join(unique_quota_issues)}")
+    upload_index.save()
     print(f"🏁 Video tracker finished at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 if __name__ == "__main__":
     import sys
     bulk_mode = "--bulk" in sys.argv
-    DAYS_TO_CHECK_FOR_RECENT = 3  # Covers weekend gaps and timezone edge cases
+    shard = sharding.parse_shard(sys.argv)
 
     if bulk_mode:
         print("🌟 BULK IMPORT MODE (--bulk flag). Fetching all videos for all channels. 🌟")
-        run_video_tracker(bulk_mode=True)
+        run_video_tracker(bulk_mode=True, shard=shard)
     else:
         print(f"ℹ️ Daily mode: checking last {DAYS_TO_CHECK_FOR_RECENT} days. Use --bulk for full historical import.")
-        run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=DAYS_TO_CHECK_FOR_RECENT)
+        run_video_tracker(bulk_mode=False, lookback_days_if_not_bulk=DAYS_TO_CHECK_FOR_RECENT, shard=shard)
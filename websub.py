@@ -0,0 +1,307 @@
+"""
+Push-based upload discovery through YouTube's WebSub (PubSubHubbub) hub.
+
+Instead of waiting for the daily crawl, the hub POSTs an Atom notification to
+our callback as soon as a tracked channel uploads. New video IDs are queued,
+fetched in one videos.list batch and inserted into Notion through the Notion
+WAL (see video_tracker.create_notion_video_row), usually within minutes and
+without any polling quota. The daily discovery stays in place as a safety net.
+
+Pieces:
+  - subscribe()/renew_due(): (re)subscribe each tracked channel's topic; leases
+    are tracked in state/websub_subscriptions.json and renewed a day before expiry.
+  - The callback server: answers the hub's verification GETs (echoing
+    hub.challenge for topics we asked for) and accepts notification POSTs,
+    checked against X-Hub-Signature when WEBSUB_SECRET is set.
+  - A worker that batches queued IDs for WEBSUB_BATCH_SECONDS and inserts them.
+
+Configuration (env): WEBSUB_CALLBACK_URL (public URL of this server, required
+to subscribe), WEBSUB_SECRET, WEBSUB_HUB_URL and YOUTUBE_TOPIC_URL (point both
+at a local hub stand-in for end-to-end tests).
+
+Usage:
+  python websub.py serve [--port 8788]   # Callback server + lease renewal + insert worker
+  python websub.py subscribe             # (Re)subscribe every tracked channel once
+  python websub.py unsubscribe
+"""
+
+import os
+import sys
+import hmac
+import json
+import queue
+import hashlib
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+import channels
+import rss_discovery
+import upload_index
+import detail_fetcher
+import credential_pool
+import notion_wal
+import video_tracker
+from networks import DATA_DIR
+
+STATE_PATH = os.path.join(DATA_DIR, "state", "websub_subscriptions.json")
+
+HUB_URL = os.getenv("WEBSUB_HUB_URL", "https://pubsubhubbub.appspot.com/subscribe")
+TOPIC_URL = os.getenv("YOUTUBE_TOPIC_URL", "https://www.youtube.com/xml/feeds/videos.xml")
+CALLBACK_URL = os.getenv("WEBSUB_CALLBACK_URL", "")
+SECRET = os.getenv("WEBSUB_SECRET", "")
+PORT = int(os.getenv("WEBSUB_PORT", "8788"))
+
+LEASE_SECONDS = 5 * 24 * 3600        # Requested lease; the hub may grant less
+RENEW_MARGIN = timedelta(days=1)     # Renew this long before a lease runs out
+RENEW_CHECK_SECONDS = 3600
+BATCH_SECONDS = float(os.getenv("WEBSUB_BATCH_SECONDS", "10"))
+
+_lock = threading.Lock()
+_subscriptions = None  # channel_id -> {"mode", "requested_at", "expires_at"}
+_queue = queue.Queue()
+
+
+def topic_for(channel_id):
+    return f"{TOPIC_URL}?channel_id={channel_id}"
+
+
+def channel_for_topic(topic):
+    channel_id = parse_qs(urlsplit(topic or "").query).get("channel_id", [None])[0]
+    return channel_id if channel_id in channels.CHANNELS.values() else None
+
+
+# --- Subscription state ---
+
+def _load():
+    global _subscriptions
+    if _subscriptions is None:
+        try:
+            with open(STATE_PATH, "r") as f:
+                _subscriptions = json.load(f)
+        except (FileNotFoundError, ValueError):
+            _subscriptions = {}
+    return _subscriptions
+
+
+def _save():
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(dict(sorted(_subscriptions.items())), f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def subscribe(channel_id, mode="subscribe"):
+    """Asks the hub to (un)subscribe our callback to a channel's topic. Returns True if the hub accepted."""
+    if not CALLBACK_URL:
+        print("❌ WEBSUB_CALLBACK_URL is not set; the hub needs a public callback URL.")
+        return False
+    data = {
+        "hub.callback": CALLBACK_URL,
+        "hub.topic": topic_for(channel_id),
+        "hub.mode": mode,
+        "hub.verify": "async",
+        "hub.lease_seconds": str(LEASE_SECONDS),
+    }
+    if SECRET:
+        data["hub.secret"] = SECRET
+    try:
+        response = requests.post(HUB_URL, data=data, timeout=30)
+    except requests.exceptions.RequestException as e:
+        print(f"  ⚠️ WebSub {mode} for {channel_id} failed: {e}")
+        return False
+    if response.status_code not in (202, 204):
+        print(f"  ⚠️ WebSub {mode} for {channel_id} returned HTTP {response.status_code}: {response.text[:200]}")
+        return False
+    with _lock:
+        entry = _load().setdefault(channel_id, {})
+        entry.update({"mode": mode, "requested_at": datetime.now(timezone.utc).isoformat(timespec="seconds")})
+        _save()
+    return True
+
+
+def renew_due(now=None):
+    """Subscribes every tracked channel with no lease, or one that expires within RENEW_MARGIN. Returns how many."""
+    now = now or datetime.now(timezone.utc)
+    with _lock:
+        subscriptions = dict(_load())
+    renewed = 0
+    for channel_name, channel_id in channels.CHANNELS.items():
+        expires_at = subscriptions.get(channel_id, {}).get("expires_at")
+        if expires_at and datetime.fromisoformat(expires_at) - RENEW_MARGIN > now:
+            continue
+        if subscribe(channel_id):
+            print(f"  🔔 Subscription requested for {channel_name}")
+            renewed += 1
+    return renewed
+
+
+def verify(query):
+    """Hub verification GET. Returns the challenge to echo, or None to refuse."""
+    mode = query.get("hub.mode", [""])[0]
+    challenge = query.get("hub.challenge", [None])[0]
+    channel_id = channel_for_topic(query.get("hub.topic", [""])[0])
+    if not challenge or not channel_id:
+        return None
+    with _lock:
+        entry = _load().get(channel_id)
+        # Only confirm what we actually asked for (an unrequested subscribe is refused)
+        if entry is None or entry.get("mode") != mode:
+            return None
+        if mode == "subscribe":
+            lease = int(query.get("hub.lease_seconds", [LEASE_SECONDS])[0])
+            entry["expires_at"] = (datetime.now(timezone.utc) + timedelta(seconds=lease)).isoformat(timespec="seconds")
+        else:
+            entry.pop("expires_at", None)
+        _save()
+    print(f"  ✅ WebSub {mode} verified for {channel_id}")
+    return challenge
+
+
+# --- Notifications ---
+
+def signature_ok(body, header):
+    """X-Hub-Signature: sha1=<hex HMAC of the body with our secret> (always True without a secret)."""
+    if not SECRET:
+        return True
+    method, _, digest = (header or "").partition("=")
+    if method not in ("sha1", "sha256"):
+        return False
+    expected = hmac.new(SECRET.encode("utf-8"), body, getattr(hashlib, method)).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+def handle_notification(body):
+    """Queues the tracked, not-yet-seen uploads from an Atom notification. Returns how many were queued."""
+    try:
+        entries = rss_discovery.parse_feed(body)
+    except ET.ParseError as e:
+        print(f"  ⚠️ Unparseable WebSub notification: {e}")
+        return 0
+    queued = 0
+    for entry in entries:
+        channel_id = entry.get("channelId")
+        if channel_id not in channels.CHANNELS.values():
+            continue
+        # The hub also notifies on title/description edits; already-known uploads are skipped here
+        if upload_index.add_uploads(channel_id, [(entry["videoId"], entry["publishedAt"])]):
+            _queue.put((channel_id, entry["videoId"]))
+            queued += 1
+    return queued
+
+
+def insert_videos(ids_by_channel):
+    """Fetches details for {channel_id: [video_id]} in one videos.list round and logs the Notion inserts."""
+    ids_by_channel = {
+        channel_id: [v for v in video_ids
+                     if not notion_wal.has(video_tracker.create_wal_key(v)) and not video_tracker.is_video_in_notion(v)]
+        for channel_id, video_ids in ids_by_channel.items()
+    }
+    ids_by_channel = {channel_id: ids for channel_id, ids in ids_by_channel.items() if ids}
+    if not ids_by_channel:
+        return 0
+    creds = None
+    if not video_tracker.YOUTUBE_API_KEY:
+        creds = next(filter(None, (credential_pool.get_credentials(c) for c in ids_by_channel)), None)
+    details = detail_fetcher.fetch_details_for_channels(ids_by_channel, api_key=video_tracker.YOUTUBE_API_KEY, creds=creds)
+    if details is None:
+        print("🟡 Quota hit while fetching pushed videos; the daily discovery will pick them up.")
+        return 0
+    added = 0
+    for channel_id, items in details.items():
+        channel_name = channels.channel_name_for_id(channel_id)
+        for item in items:
+            added += bool(video_tracker.create_notion_video_row(item, channel_name, channel_id))
+    notion_wal.drain()
+    upload_index.save()
+    return added
+
+
+def _insert_worker():
+    while True:
+        channel_id, video_id = _queue.get()
+        batch = {channel_id: [video_id]}
+        deadline = time.monotonic() + BATCH_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                channel_id, video_id = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.setdefault(channel_id, []).append(video_id)
+        try:
+            added = insert_videos(batch)
+            print(f"➕ WebSub: {added} new video(s) queued for Notion from {len(batch)} channel(s)")
+        except Exception as e:
+            print(f"❌ WebSub insert failed for {batch}: {e!r}")
+
+
+def _renew_loop():
+    while True:
+        try:
+            renew_due()
+        except Exception as e:
+            print(f"❌ WebSub renewal failed: {e!r}")
+        time.sleep(RENEW_CHECK_SECONDS)
+
+
+class CallbackHandler(BaseHTTPRequestHandler):
+    server_version = "websub-callback"
+
+    def do_GET(self):
+        challenge = verify(parse_qs(urlsplit(self.path).query))
+        if challenge is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = challenge.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        # Per the spec, a bad signature is still acknowledged with 2xx, but the content is ignored
+        if signature_ok(body, self.headers.get("X-Hub-Signature")):
+            handle_notification(body)
+        else:
+            print("⚠️ WebSub notification with a bad signature ignored.")
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=PORT):
+    notion_wal.replay()
+    threading.Thread(target=_insert_worker, daemon=True).start()
+    threading.Thread(target=_renew_loop, daemon=True).start()
+    server = ThreadingHTTPServer(("0.0.0.0", port), CallbackHandler)
+    print(f"📡 WebSub callback listening on :{port} (public URL {CALLBACK_URL or 'not set'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        notion_wal.drain()
+        upload_index.save()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if command == "serve":
+        serve(int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else PORT)
+    elif command in ("subscribe", "unsubscribe"):
+        accepted = sum(subscribe(channel_id, mode=command) for channel_id in channels.CHANNELS.values())
+        print(f"🏁 {command}: hub accepted {accepted}/{len(channels.CHANNELS)} channel(s)")
+    else:
+        raise SystemExit(f"Unknown command {command!r}; use serve, subscribe or unsubscribe")
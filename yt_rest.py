@@ -0,0 +1,158 @@
+"""
+Thin REST client for the few YouTube endpoints we call.
+
+googleapiclient's build() downloads/parses a discovery document per service and
+pulls in a large import tree — a noticeable share of a short cron process. The
+pipeline only uses four methods, so credential_pool.service() hands out these
+clients instead:
+
+  youtubeAnalytics v2: reports().query(...)
+  youtube v3:          channels().list(...), playlistItems().list(...), videos().list(...)
+
+They mirror the discovery clients' call shape — service.videos().list(**params)
+returns a request with .headers and .execute() — and raise an HttpError with the
+same .resp.status and str() format, so callers and http_cache.execute() work
+with either. Each service keeps one pooled HTTP session; google.auth is only
+imported when an OAuth service is created.
+
+Set YT_REST=0 to go back to discovery-based clients.
+"""
+
+import os
+import json
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import call_budget
+
+ENABLED = os.getenv("YT_REST", "1") != "0"
+POOL_SIZE = 8
+TIMEOUT = 60
+
+ENDPOINTS = {
+    ("youtubeAnalytics", "v2"): {
+        "base": "https://youtubeanalytics.googleapis.com/v2/",
+        "methods": {("reports", "query"): "reports"},
+    },
+    ("youtube", "v3"): {
+        "base": "https://www.googleapis.com/youtube/v3/",
+        "methods": {
+            ("channels", "list"): "channels",
+            ("playlistItems", "list"): "playlistItems",
+            ("videos", "list"): "videos",
+        },
+    },
+}
+
+
+class HttpError(Exception):
+    """Non-2xx response. str() matches googleapiclient's HttpError so existing message checks keep working."""
+
+    class _Resp(dict):
+        def __init__(self, response):
+            super().__init__(response.headers)
+            self.status = response.status_code
+            self.reason = response.reason
+
+    def __init__(self, response, uri):
+        self.resp = self._Resp(response)
+        self.content = response.content
+        self.uri = uri
+        self.reason, self.error_details = self._parse(response)
+        super().__init__(str(self))
+
+    @staticmethod
+    def _parse(response):
+        try:
+            error = response.json().get("error", {})
+        except ValueError:
+            return response.reason, ""
+        if not isinstance(error, dict):
+            return str(error), ""
+        return error.get("message", response.reason), error.get("errors", "")
+
+    @property
+    def status_code(self):
+        return self.resp.status
+
+    def __str__(self):
+        if self.error_details:
+            return f'<HttpError {self.resp.status} when requesting {self.uri} returned "{self.reason}". Details: "{self.error_details}">'
+        return f'<HttpError {self.resp.status} when requesting {self.uri} returned "{self.reason}">'
+
+
+def supports(api, version):
+    return ENABLED and (api, version) in ENDPOINTS
+
+
+def _param(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return ",".join(map(str, value))
+    return value
+
+
+class Request:
+    def __init__(self, service, url, params):
+        self._service = service
+        self.uri = url
+        self.params = params
+        self.headers = {}
+
+    def execute(self):
+        """Returns the parsed JSON body; raises HttpError for any non-2xx status (including 304)."""
+        call_budget.spend()
+        response = self._service.session.get(self.uri, params=self.params, headers=self.headers, timeout=TIMEOUT)
+        if not 200 <= response.status_code < 300:
+            raise HttpError(response, response.url)
+        return json.loads(response.content) if response.content else {}
+
+
+class _Resource:
+    def __init__(self, service, resource):
+        self._service = service
+        self._resource = resource
+
+    def _method(self, name, params):
+        path = self._service.methods.get((self._resource, name))
+        if path is None:
+            raise AttributeError(f"yt_rest does not implement {self._resource}().{name}()")
+        params = {k: _param(v) for k, v in params.items() if v is not None}
+        if self._service.developer_key:
+            params["key"] = self._service.developer_key
+        return Request(self._service, self._service.base + path, params)
+
+    def list(self, **params):
+        return self._method("list", params)
+
+    def query(self, **params):
+        return self._method("query", params)
+
+
+class Service:
+    def __init__(self, api, version, credentials=None, developerKey=None):
+        endpoint = ENDPOINTS[(api, version)]
+        self.base = endpoint["base"]
+        self.methods = endpoint["methods"]
+        self.developer_key = None if credentials is not None else developerKey
+        if credentials is not None:
+            from google.auth.transport.requests import AuthorizedSession
+            self.session = AuthorizedSession(credentials)
+        else:
+            self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+
+    def __getattr__(self, resource):
+        if resource.startswith("_"):
+            raise AttributeError(resource)
+        if not any(r == resource for r, _ in self.methods):
+            raise AttributeError(f"yt_rest does not implement {resource}()")
+        return lambda: _Resource(self, resource)
+
+
+def build(api, version, credentials=None, developerKey=None, cache_discovery=None):
+    """Same call shape as googleapiclient.discovery.build for the supported APIs (there's no discovery to cache)."""
+    return Service(api, version, credentials=credentials, developerKey=developerKey)